@@ -14,299 +14,83 @@
 
 # 10Base-T1S High Level Analyzer
 from saleae.analyzers import HighLevelAnalyzer, AnalyzerFrame, StringSetting, NumberSetting, ChoicesSetting
-from enum import Enum
-from tc6 import Tc6ControlCommandHeader, Tc6Header, Tc6State, Tc6DataFooter, Tc6TransmitDataHeader
-
-def create_control_transaction_frame(header: Tc6ControlCommandHeader, data: bytearray, protected, start_time, end_time):
-    if header.wnr:
-        text = "Control Write Transaction: "
-    else:
-        text = "Control Read Transaction: "
-    text += f"MMS={header.mms} ADDR={hex(header.addr)} LEN={header.len} "
-    text += "DATA=0x"
-    for i in range(len(data) // 4):
-        if protected and i % 2:
-            pass # drop data protection bytes
-        else:
-            text += f"{data[i * 4:i * 4 + 4].hex()}_"
-    text = text[:-1] # remove trailing underscore
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_data_transaction_frame(header: Tc6TransmitDataHeader, footer: Tc6DataFooter, txdata: bytearray, rxdata: bytearray, start_time, end_time):
-    text = f"Data Transaction: "
-    if header.dv:
-        text += f"TX Chunk Data=0x{txdata[:4].hex()}... "
-    if footer.dv:
-        text += f"RX Chunk Data=0x{rxdata[:4].hex()}..."
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_discard_data_frame(data, start_time, end_time):
-    text = f"Chunk Data Discard: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_header_echo_frame(data, start_time, end_time):
-    header = Tc6ControlCommandHeader.from_bytes(data)
-    text = f"Control Header Echo: "
-    text += f"DNC={header.dnc} HDRB={header.hdrb} WNR={header.wnr} AID={header.aid} MMS={header.mms} ADDR={hex(header.addr)} LEN={header.len} P={header.p}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_control_data_echo_frame(data, start_time, end_time):
-    text = f"Data Echo: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_control_data_frame(data, start_time, end_time):
-    text = f"Register Read Data: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_data_chunk_frame(data, start_time, end_time):
-    text = f"RX Data Chunk: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_rx_footer_frame(footer, start_time, end_time):
-    text = "Footer:"
-    text += f"EXST={footer.exst} HDRB={footer.hdrb} SYNC={footer.sync} RCA={footer.rca} VS={footer.vs} DV={footer.dv} SV={footer.sv} SWO={footer.swo} "
-    text += f"FD={footer.fd} EV={footer.ev} EBO={footer.ebo} RTSA={footer.rtsa} RTSP={footer.rtsp} TXC={footer.txc} PARITY={footer.parity}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_tx_control_data_frame(data, start_time, end_time):
-    text = f"Register Write Data: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_tx_control_dummy_bytes_frame(data, start_time, end_time):
-    text = f"Dummy Data: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_tx_data_chunk_frame(data, start_time, end_time):
-    text = f"TX Data Chunk: 0x{data.hex()}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_control_header_frame(header, start_time, end_time):
-    text = f"Control Header: "
-    text += f"DNC={header.dnc} HDRB={header.hdrb} WNR={header.wnr} AID={header.aid} MMS={header.mms} ADDR={hex(header.addr)} LEN={header.len} P={header.p}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-def create_data_header_frame(header, start_time, end_time):
-    text = f"Data Header: "
-    text += f"DNC={header.dnc} SEQ={header.seq} NORX={hex(header.norx)} VS={header.vs} DV={header.dv} SV={header.sv} SWO={header.swo} EV={header.ev} EBO={header.ebo} TSC={header.tsc} P={header.p}"
-    return AnalyzerFrame('analyzer_frame', start_time, end_time, {'labelText': text})
-
-class Trace(Enum):
-    TRANSACTION = 0
-    RX = 1
-    TX = 2
-    ETHERNET_FRAME = 3
+from tc6_decoder import Tc6Decoder, RESULT_TYPES, COMPACT_RESULT_TYPES
+from tc6_instrument import DecoderStats
+from tc6_pcapng import PcapngWriter
+from tc6_timing import TimingStats
+
+# Seconds between instrumentation and timing dumps, Logic has no end of
+# capture notification
+INSTRUMENTATION_DUMP_INTERVAL = 5.0
+
+# PcapngWriter of the last analyzer by file path. Logic creates a new
+# analyzer when the settings change or a capture starts again without
+# notifying the previous one, its writer is closed by the next analyzer
+# writing the same file or when it is garbage collected.
+pcapng_writers = {}
+
+def close_pcapng(writer):
+    """Closes the PcapngWriter of an analyzer, errors are printed to the
+    Logic console"""
+    if writer is None:
+        return
+    try:
+        writer.close()
+    except Exception as e:
+        print(f"PCAPNG export to {writer.path} failed: {e}")
 
 class Hla(HighLevelAnalyzer):
     block_payload_size_setting = ChoicesSetting(choices=('auto-detect', '64', '32'))
     control_data_protection_setting = ChoicesSetting(choices=('auto-detect', 'enabled', 'disabled'))
-    trace_setting = ChoicesSetting(choices=('transactions', 'tx', 'rx'))
+    trace_setting = ChoicesSetting(choices=('transactions', 'tx', 'rx', 'ethernet', 'link', 'combined'))
+    filter_setting = StringSetting()
+    instrumentation_file_setting = StringSetting()
+    label_setting = ChoicesSetting(choices=('full', 'compact'))
+    link_stats_window_setting = NumberSetting(min_value=0, max_value=60000)
+    timing_file_setting = StringSetting()
+    register_map_setting = StringSetting()
+    pcapng_file_setting = StringSetting()
 
-    result_types = {
-        'analyzer_frame': {
-            'format': '{{data.labelText}}'
-        }
-    }
+    result_types = RESULT_TYPES
 
     def __init__(self):
         """High level analyzer intitialization
         """
-        self.state = Tc6State.CHIP_DESELECT
-        self.header_start = 0
-        self.header_end = 0
-        self.header_echo_end = None
-        self.transaction_start = 0
-        self.transaction_end = 0
-        self.txbuf = bytearray()
-        self.rxbuf = bytearray()
-
-        if self.block_payload_size_setting in ["auto-detect", "64"]:
-            self.chunk_size = 64
-        elif self.block_payload_size_setting == "32":
-            self.chunk_size = 32
-
-        if "enabled" == self.control_data_protection_setting:
-            self.ctrl_rw_data_protection = True
-        else:
-            # we assume default setting in the device for auto-detect as initial value
-            self.ctrl_rw_data_protection = False
-
-        if self.trace_setting == "transactions":
-            self.trace = Trace.TRANSACTION
-        elif self.trace_setting == "rx":
-            self.trace = Trace.RX
-        elif self.trace_setting == "tx":
-            self.trace = Trace.TX
+        if self.label_setting == 'compact':
+            self.result_types = COMPACT_RESULT_TYPES
+        self.decoder = Tc6Decoder.from_settings(self.block_payload_size_setting, self.control_data_protection_setting, self.trace_setting, self.filter_setting, self.register_map_setting)
+        if self.decoder.link_stats and self.link_stats_window_setting:
+            # milliseconds
+            self.decoder.link_stats.window = self.link_stats_window_setting / 1000
+        if self.instrumentation_file_setting:
+            self.decoder.instrument(DecoderStats(self.instrumentation_file_setting, INSTRUMENTATION_DUMP_INTERVAL))
+        if self.timing_file_setting:
+            self.decoder.timing = TimingStats(self.timing_file_setting, INSTRUMENTATION_DUMP_INTERVAL, self.decoder.register_map.names)
+        if self.pcapng_file_setting:
+            close_pcapng(pcapng_writers.pop(self.pcapng_file_setting, None))
+            # partial batches are written periodically, the capture has no end
+            self.decoder.pcapng = PcapngWriter(self.pcapng_file_setting, flush_interval=INSTRUMENTATION_DUMP_INTERVAL)
+            pcapng_writers[self.pcapng_file_setting] = self.decoder.pcapng
+
+    def __del__(self):
+        if not hasattr(self, "decoder"):
+            # the settings were invalid
+            return
+        writer = self.decoder.pcapng
+        if writer is not None and pcapng_writers.get(writer.path) is writer:
+            del pcapng_writers[writer.path]
+        close_pcapng(writer)
 
     def decode(self, frame: AnalyzerFrame):
         return_frame = None
-        if frame.type == "disable":
-            self.state = Tc6State.CHIP_DESELECT
-
+        if frame.type == "result":
+            return_frame = self.decoder.result(frame.data["mosi"], frame.data["miso"], frame.start_time, frame.end_time)
         elif frame.type == "enable":
-            self.txbuf.clear()
-            self.rxbuf.clear()
-            self.state = Tc6State.HEADER_START
-
-        elif frame.type == "result":
-            self.txbuf.extend(frame.data["mosi"])
-            self.rxbuf.extend(frame.data["miso"])
-
-            if self.state == Tc6State.HEADER_START:
-                self.transaction_start = frame.start_time
-                self.header_start = frame.start_time
-                self.state = Tc6State.HEADER
-
-            elif self.state == Tc6State.HEADER:
-                if len(self.txbuf) == 4:
-                    self.header = Tc6Header.from_bytes(self.txbuf)
-                    self.header_end = frame.end_time
-                    if isinstance(self.header, Tc6ControlCommandHeader):
-                        if self.header.wnr:
-                            self.state = Tc6State.CTRL_WRITE_HEADER_ECHO
-                        else:
-                            self.state = Tc6State.CTRL_READ_HEADER_ECHO
-                        if self.trace == Trace.RX:
-                            return_frame = create_rx_discard_data_frame(self.rxbuf, self.header_start, self.header_end)
-                        elif self.trace == Trace.TX:
-                            return_frame = create_control_header_frame(self.header, self.header_start, self.header_end)
-                        self.rxbuf.clear() # remove rx dummy bytes from buffer
-                    else:
-                        if self.trace == Trace.TX:
-                            return_frame = create_data_header_frame(self.header, self.header_start, self.header_end)
-                        self.state = Tc6State.DATA_TRANSACTION
-                    self.txbuf.clear() # remove header from buffer
-
-            elif self.state == Tc6State.CTRL_WRITE_HEADER_ECHO:
-                if len(self.txbuf) == 1:
-                    self.header_echo_start = frame.start_time
-                elif len(self.txbuf) == 4:
-                    self.header_echo_end = frame.end_time
-                    if self.trace == Trace.RX:
-                        return_frame = create_rx_header_echo_frame(self.rxbuf, self.header_echo_start, self.header_echo_end)
-                    self.rxbuf.clear()
-                    if (self.header.len + 1) * 4 * (2 if self.ctrl_rw_data_protection else 1) == 4:
-                        self.txdata = bytearray(self.txbuf)
-                        self.txbuf.clear()
-                        self.rx_control_data_echo_start = None
-                        if self.trace == Trace.TX:
-                            return_frame = create_tx_control_data_frame(self.txdata, self.header_echo_start, frame.end_time)
-                        self.state = Tc6State.CTRL_WRITE_DUMMY_BYTES
-                    else:
-                        self.state = Tc6State.CTRL_WRITE_DATA_ECHO
-
-            elif self.state == Tc6State.CTRL_WRITE_DATA_ECHO:
-                if len(self.rxbuf) == 1:
-                    self.rx_control_data_echo_start = frame.start_time
-                if len(self.txbuf) == (self.header.len + 1) * 4 * (2 if self.ctrl_rw_data_protection else 1):
-                    self.txdata = bytearray(self.txbuf)
-                    if self.trace == Trace.TX:
-                        return_frame = create_tx_control_data_frame(self.txdata, self.header_echo_start, frame.end_time)
-                    self.txbuf.clear()
-                    self.state = Tc6State.CTRL_WRITE_DUMMY_BYTES
-
-            elif self.state == Tc6State.CTRL_WRITE_DUMMY_BYTES:
-                if (len(self.txbuf) == 1):
-                    self.tx_dummy_bytes_start = frame.start_time
-                    if (self.rx_control_data_echo_start == None):
-                        # if data echo start aligns with dummy bytes start we detect this if start time is None
-                        self.rx_control_data_echo_start = frame.start_time
-                if len(self.txbuf) == 4:
-                    self.transaction_end = frame.end_time
-                    # TODO: we only support single register write here so we would miss updates when multiple registers are written by addess auto increment
-                    self.check_transaction_parameter_change()
-                    if self.trace == Trace.TRANSACTION:
-                        return_frame = create_control_transaction_frame(self.header, self.txdata, self.ctrl_rw_data_protection, self.transaction_start, self.transaction_end)
-                    elif self.trace == Trace.RX:
-                        return_frame = create_rx_control_data_echo_frame(self.rxbuf, self.rx_control_data_echo_start, self.transaction_end)
-                    elif self.trace == Trace.TX:
-                        return_frame = create_tx_control_dummy_bytes_frame(self.txbuf, self.tx_dummy_bytes_start, frame.end_time)
-                    self.txbuf.clear()
-                    self.rxbuf.clear()
-                    self.state = Tc6State.HEADER_START
-
-            elif self.state == Tc6State.CTRL_READ_HEADER_ECHO:
-                if len(self.txbuf) == 1:
-                    self.tx_dummy_bytes_start = frame.start_time
-                    self.header_echo_start = frame.start_time
-                if len(self.txbuf) == 4:
-                    if self.trace == Trace.RX:
-                        return_frame = create_rx_header_echo_frame(self.rxbuf, self.header_echo_start, frame.end_time)
-                    self.rxbuf.clear()
-                    self.state = Tc6State.CTRL_READ_DATA
-
-            elif self.state == Tc6State.CTRL_READ_DATA:
-                if len(self.rxbuf) == 1:
-                    self.rx_control_data_start = frame.start_time
-                if len(self.rxbuf) == (self.header.len + 1) * 4 * (2 if self.ctrl_rw_data_protection else 1):
-                    self.transaction_end = frame.end_time
-                    if self.trace == Trace.TRANSACTION:
-                        return_frame = create_control_transaction_frame(self.header, self.rxbuf, self.ctrl_rw_data_protection, self.transaction_start, self.transaction_end)
-                    elif self.trace == Trace.TX:
-                        return_frame = create_tx_control_dummy_bytes_frame(self.txbuf, self.tx_dummy_bytes_start, frame.end_time)
-                    elif self.trace == Trace.RX:
-                        return_frame = create_rx_control_data_frame(self.rxbuf, self.rx_control_data_start, frame.end_time)
-                    self.txbuf.clear()
-                    self.rxbuf.clear()
-                    self.state = Tc6State.HEADER_START
-
-            elif self.state == Tc6State.DATA_TRANSACTION:
-                if len(self.txbuf) == 1:
-                    self.tx_data_start = frame.start_time
-                if len(self.rxbuf) == self.chunk_size:
-                    self.rxdata = bytearray(self.rxbuf)
-                    if self.trace == Trace.RX:
-                        return_frame = create_rx_data_chunk_frame(self.rxdata, self.transaction_start, frame.end_time)
-                    self.rxbuf.clear()
-                    self.state = Tc6State.FOOTER
-
-            elif self.state == Tc6State.FOOTER:
-                if len(self.rxbuf) == 1:
-                    self.footer_start = frame.start_time
-                if len(self.txbuf) == self.chunk_size:
-                    self.transaction_end = frame.end_time
-                    self.footer = Tc6DataFooter.from_bytes(self.rxbuf)
-                    if self.trace == Trace.TRANSACTION:
-                        return_frame = create_data_transaction_frame(self.header, self.footer, self.txbuf, self.rxdata, self.transaction_start, self.transaction_end)
-                    elif self.trace == Trace.TX:
-                        return_frame = create_tx_data_chunk_frame(self.txbuf, self.tx_data_start, frame.end_time)
-                    elif self.trace == Trace.RX:
-                        return_frame = create_rx_footer_frame(self.footer, self.footer_start, frame.end_time)
-                    self.txbuf.clear()
-                    self.rxbuf.clear()
-                    self.state = Tc6State.HEADER_START
-
+            self.decoder.enable(frame.start_time)
+        elif frame.type == "disable":
+            self.decoder.disable(frame.start_time)
 
         if return_frame:
-            return return_frame
-
-    def check_transaction_parameter_change(self):
-        """Adjusts decoding parameters if
-        Call this function after a register write transaction is complete.
-
-        The register write transaction will be anayzed to detect writes to
-        CONFIG 0 register, specifially writes to
-        - PROTE (Control data read/write protection enable)
-        - CPS (Chunk Payload Size)
-        fields are checked to see if these parameters are changed, and if they are
-        the decoder will be updated accordignly.
-        """
-        # Let's see if there is a change in control data protection mode
-        if self.header.mms == 0 and self.header.addr == 0x4:
-            reg = int.from_bytes(self.txdata[:4], byteorder="big")
-            if self.control_data_protection_setting == "auto-detect":
-                if (reg & 0x00000020):
-                    if not self.ctrl_rw_data_protection:
-                        print("Control Data R/W protection changed to enabled")
-                    self.ctrl_rw_data_protection = True
-                else:
-                    if self.ctrl_rw_data_protection:
-                        print("Control Data R/W protection changed to disabled")
-                    self.ctrl_rw_data_protection = False
-            if self.block_payload_size_setting == "auto-detect":
-                block_payload_size = reg & 0x00000007
-                if block_payload_size == 0b101:
-                    self.chunk_size = 32
-                elif block_payload_size == 0b110:
-                    self.chunk_size = 64
-                print(f"Block payload size set to {self.chunk_size}")
-
+            if isinstance(return_frame, list):
+                return [AnalyzerFrame(*f) for f in return_frame]
+            return AnalyzerFrame(*return_frame)
@@ -0,0 +1,144 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Decoder benchmark
+#
+# Drives Hla.decode with synthetic traffic for every trace mode, using the
+# saleae stand-in next to this file, and reports the decoding cost per SPI
+# byte, the rate of emitted frames and the peak memory use. Frame times are
+# passed as GraphTime like Logic does, so code that only works with float
+# times fails here too.
+#
+# Example:
+#   python bench/bench_decode.py --transactions 20000 --json results.json
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from saleae.analyzers import AnalyzerFrame
+from saleae.data import GraphTime
+from HighLevelAnalyzer import Hla
+from tc6_instrument import DecoderStats
+from tc6_synth import Tc6TrafficGenerator
+
+TRACES = ("transactions", "tx", "rx", "ethernet", "link", "combined")
+
+def spi_frames(events, float_times=False):
+    """Converts SPI events into the frames of the Logic SPI analyzer
+
+    Args:
+        events: SPI events with float times
+        float_times: Keep the float times instead of GraphTime
+    """
+    frames = []
+    for event_type, start_time, end_time, mosi, miso in events:
+        if not float_times:
+            start_time = GraphTime(start_time)
+            end_time = GraphTime(end_time)
+        if event_type == "result":
+            frames.append(AnalyzerFrame("result", start_time, end_time, {"mosi": mosi, "miso": miso}))
+        else:
+            frames.append(AnalyzerFrame(event_type, start_time, end_time, {}))
+    return frames
+
+def create_analyzer(trace, args):
+    Hla.trace_setting = trace
+    Hla.block_payload_size_setting = args.block_payload_size
+    Hla.control_data_protection_setting = args.control_data_protection
+    Hla.filter_setting = args.filter
+    Hla.instrumentation_file_setting = ""
+    Hla.label_setting = "full"
+    Hla.link_stats_window_setting = 0
+    Hla.timing_file_setting = ""
+    Hla.register_map_setting = ""
+    Hla.pcapng_file_setting = ""
+    hla = Hla()
+    hla.decoder.log = lambda message: None
+    if args.instrument:
+        hla.decoder.instrument(DecoderStats())
+    return hla
+
+def run(hla, frames):
+    emitted = 0
+    decode = hla.decode
+    for frame in frames:
+        result = decode(frame)
+        if result is not None:
+            emitted += len(result) if isinstance(result, list) else 1
+    return emitted
+
+def bench_trace(trace, frames, spi_bytes, args):
+    best = None
+    for _ in range(args.repeat):
+        hla = create_analyzer(trace, args)
+        start = time.perf_counter()
+        emitted = run(hla, frames)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # separate run, tracing allocations slows down decoding
+    hla = create_analyzer(trace, args)
+    tracemalloc.start()
+    run(hla, frames)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "trace": trace,
+        "spi_bytes": spi_bytes,
+        "frames_emitted": emitted,
+        "seconds": best,
+        "ns_per_byte": best * 1e9 / spi_bytes,
+        "frames_per_second": emitted / best,
+        "peak_memory_bytes": peak_memory,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Hla.decode on synthetic TC6 traffic")
+    parser.add_argument("--transactions", type=int, default=20000, help="number of generated transactions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per trace, the fastest is reported")
+    parser.add_argument("--trace", choices=TRACES, action="append", help="trace mode(s) to run (default: all)")
+    parser.add_argument("--block-payload-size", choices=("auto-detect", "64", "32"), default="auto-detect")
+    parser.add_argument("--control-data-protection", choices=("auto-detect", "enabled", "disabled"), default="auto-detect")
+    parser.add_argument("--filter", default="", help="transaction filter expression")
+    parser.add_argument("--instrument", action="store_true", help="run with decoder instrumentation enabled")
+    parser.add_argument("--float-times", action="store_true", help="pass float times as the offline tools do instead of GraphTime")
+    parser.add_argument("--json", help="write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    frames = spi_frames(Tc6TrafficGenerator(args.seed).scenario(args.transactions), args.float_times)
+    spi_bytes = sum(len(frame.data["mosi"]) for frame in frames if frame.type == "result")
+
+    results = []
+    print(f"{'trace':<14}{'ns/byte':>10}{'frames/s':>14}{'frames':>10}{'peak KiB':>12}")
+    for trace in args.trace or TRACES:
+        result = bench_trace(trace, frames, spi_bytes, args)
+        results.append(result)
+        print(f"{trace:<14}{result['ns_per_byte']:>10.1f}{result['frames_per_second']:>14.0f}"
+              f"{result['frames_emitted']:>10}{result['peak_memory_bytes'] / 1024:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"transactions": args.transactions, "seed": args.seed, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
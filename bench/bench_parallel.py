@@ -0,0 +1,110 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Parallel decoder benchmark
+#
+# Writes synthetic traffic as a Logic 2 CSV export, decodes it with the
+# sequential decoder and with ParallelDecoder for each job count, and reports
+# the wall time and the speedup over the sequential decoder. The frames of
+# every parallel run are checked against the sequential ones. The speedup is
+# bounded by the number of CPUs, with one CPU the pool only adds overhead.
+#
+# Example:
+#   python bench/bench_parallel.py --transactions 50000 --jobs 1 2 4 8
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from tc6_capture import read_csv
+from tc6_decoder import Tc6Decoder
+from tc6_parallel import ParallelDecoder, csv_segments
+from tc6_store import TransactionStore
+from tc6_synth import Tc6TrafficGenerator, write_csv
+
+TRACES = ("transactions", "tx", "rx", "ethernet", "combined")
+
+def settings_of(args):
+    return (args.block_payload_size, args.control_data_protection, args.trace, args.filter, "")
+
+def decode_sequential(path, args):
+    decoder = Tc6Decoder.from_settings(*settings_of(args))
+    decoder.log = lambda message: None
+    if args.store:
+        decoder.store = TransactionStore()
+    return list(decoder.feed(read_csv(path))), decoder.store
+
+def decode_parallel(path, jobs, args):
+    decoder = ParallelDecoder(settings_of(args), jobs, store=TransactionStore() if args.store else None)
+    decoder.log = lambda message: None
+    frames = list(decoder.decode(csv_segments(path, decoder.segments)))
+    return frames, decoder.store, decoder.redecoded_segments
+
+def records(store):
+    return [store.record(i) for i in range(len(store))]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parallel decoder on synthetic TC6 traffic")
+    parser.add_argument("--transactions", type=int, default=20000, help="number of generated transactions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per job count, the fastest is reported")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()], help="job counts to run")
+    parser.add_argument("--trace", choices=TRACES, default="transactions")
+    parser.add_argument("--block-payload-size", choices=("auto-detect", "64", "32"), default="auto-detect")
+    parser.add_argument("--control-data-protection", choices=("auto-detect", "enabled", "disabled"), default="auto-detect")
+    parser.add_argument("--filter", default="", help="transaction filter expression")
+    parser.add_argument("--store", action="store_true", help="record the transactions in a TransactionStore")
+    parser.add_argument("--json", help="write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture.csv")
+        write_csv(Tc6TrafficGenerator(args.seed).scenario(args.transactions), path)
+
+        sequential = None
+        for _ in range(args.repeat):
+            elapsed, (expected, expected_store) = timed(decode_sequential, path, args)
+            sequential = elapsed if sequential is None else min(sequential, elapsed)
+
+        results = [{"jobs": 0, "seconds": sequential, "speedup": 1.0, "redecoded_segments": 0}]
+        print(f"{'jobs':<10}{'seconds':>10}{'speedup':>10}{'redecoded':>11}")
+        print(f"{'sequential':<10}{sequential:>10.3f}{1.0:>10.2f}{0:>11}")
+        for jobs in sorted(set(args.jobs)):
+            best = None
+            for _ in range(args.repeat):
+                elapsed, (frames, store, redecoded) = timed(decode_parallel, path, jobs, args)
+                if frames != expected:
+                    sys.exit(f"frames decoded with {jobs} jobs differ from the sequential decoder")
+                if args.store and records(store) != records(expected_store):
+                    sys.exit(f"transactions stored with {jobs} jobs differ from the sequential decoder")
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({"jobs": jobs, "seconds": best, "speedup": sequential / best, "redecoded_segments": redecoded})
+            print(f"{jobs:<10}{best:>10.3f}{sequential / best:>10.2f}{redecoded:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"transactions": args.transactions, "seed": args.seed, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
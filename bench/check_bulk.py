@@ -0,0 +1,115 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Bulk decoder check
+#
+# Compares every column of the vectorized decoders in tc6_bulk.py with the
+# scalar reference classes in tc6.py on random words and on words with a
+# single bit set (or cleared), passed as uint32 array and as big-endian byte
+# buffer. Requires NumPy. Exits with status 1 on the first mismatch.
+#
+# Example:
+#   python bench/check_bulk.py --words 100000
+import argparse
+import inspect
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from tc6 import Tc6ControlCommandHeader, Tc6DataFooter, Tc6TransmitDataHeader
+from tc6_bulk import check_parity, decode_control_headers, decode_data_headers, decode_footers
+
+DECODERS = (
+    ("decode_footers", decode_footers, Tc6DataFooter, Tc6DataFooter.decode_footer),
+    ("decode_data_headers", decode_data_headers, Tc6TransmitDataHeader, Tc6TransmitDataHeader.decode_header),
+    ("decode_control_headers", decode_control_headers, Tc6ControlCommandHeader, Tc6ControlCommandHeader.decode_header),
+)
+
+def parity_ok(word):
+    """Reference odd parity of a header or footer word"""
+    return bin(word).count("1") % 2 == 1
+
+def field_names(cls):
+    """Returns the attribute names of a tc6.py class in decode order"""
+    return [name for name in inspect.signature(cls.__init__).parameters if name != "self"]
+
+def test_words(count, seed):
+    """Returns the words to check: edge cases followed by random words"""
+    r = random.Random(seed)
+    words = [0, 0xffffffff]
+    words += [1 << bit for bit in range(32)]
+    words += [0xffffffff ^ (1 << bit) for bit in range(32)]
+    words += [r.getrandbits(32) for _ in range(count)]
+    return words
+
+def compare(name, columns, expected, words):
+    """Returns a mismatch description or None"""
+    if set(columns) != set(expected):
+        return f"{name}: columns {sorted(columns)} differ from {sorted(expected)}"
+    for field, values in expected.items():
+        column = columns[field]
+        if len(column) != len(words):
+            return f"{name}: column {field} has {len(column)} values for {len(words)} words"
+        mismatch = np.flatnonzero(column != np.array(values, dtype=column.dtype))
+        if mismatch.size:
+            i = mismatch[0]
+            return f"{name}: {field} of 0x{words[i]:08x} is {column[i]}, expected {values[i]}"
+    return None
+
+def check(words):
+    """Checks all bulk decoders on words
+
+    Returns:
+        List of mismatch descriptions, empty if all columns agree
+    """
+    inputs = (
+        ("uint32", np.array(words, dtype=np.uint32)),
+        ("bytes", b"".join(word.to_bytes(4, byteorder="big") for word in words)),
+    )
+    failures = []
+    expected_parity = [parity_ok(word) for word in words]
+    for input_name, data in inputs:
+        failure = compare(f"check_parity({input_name})", {"parity_ok": check_parity(data)}, {"parity_ok": expected_parity}, words)
+        if failure:
+            failures.append(failure)
+        for name, decode, cls, reference in DECODERS:
+            rows = [reference(word) for word in words]
+            expected = {field: [row[i] for row in rows] for i, field in enumerate(field_names(cls))}
+            expected["parity_ok"] = expected_parity
+            failure = compare(f"{name}({input_name})", decode(data), expected, words)
+            if failure:
+                failures.append(failure)
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check tc6_bulk.py against the scalar decoders of tc6.py")
+    parser.add_argument("--words", type=int, default=100000, help="number of random words")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    words = test_words(args.words, args.seed)
+    failures = check(words)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        return 1
+    print(f"{len(words)} words: bulk and scalar decoding agree")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Local stand-in for the saleae package of the Logic 2 runtime, see analyzers.py
@@ -0,0 +1,52 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Minimal stand-in for saleae.analyzers to run the High Level Analyzer outside
+# of Logic 2. Only the parts used by HighLevelAnalyzer.py are provided.
+#
+# Logic replaces the setting class attributes of an analyzer by the selected
+# values before instantiating it, set them the same way:
+#   Hla.trace_setting = "rx"
+#   hla = Hla()
+
+class AnalyzerFrame():
+    __slots__ = ("type", "start_time", "end_time", "data")
+
+    def __init__(self, type, start_time, end_time, data=None):
+        self.type = type
+        self.start_time = start_time
+        self.end_time = end_time
+        self.data = data if data is not None else {}
+
+    def __repr__(self):
+        return f"AnalyzerFrame({self.type!r}, {self.start_time!r}, {self.end_time!r}, {self.data!r})"
+
+class HighLevelAnalyzer():
+    result_types = {}
+
+    def decode(self, frame):
+        raise NotImplementedError()
+
+class StringSetting():
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+class NumberSetting():
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+class ChoicesSetting():
+    def __init__(self, choices, **kwargs):
+        self.choices = choices
+        self.kwargs = kwargs
@@ -0,0 +1,132 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Minimal stand-in for the time types of saleae.data
+#
+# Logic passes frame times as GraphTime, a point in time that can not be
+# converted to float. Only the difference of two times, a GraphTimeDelta, is
+# a number of seconds:
+#   GraphTime - GraphTime -> GraphTimeDelta
+#   GraphTime +/- GraphTimeDelta -> GraphTime
+#   float(GraphTimeDelta) -> seconds
+# The stand-in follows these rules so code that treats times as float fails
+# outside of Logic as it does in Logic.
+
+class GraphTimeDelta():
+    __slots__ = ("_seconds",)
+
+    def __init__(self, second=0.0, millisecond=0.0, microsecond=0.0, nanosecond=0.0):
+        self._seconds = second + millisecond * 1e-3 + microsecond * 1e-6 + nanosecond * 1e-9
+
+    def __float__(self):
+        return float(self._seconds)
+
+    def __add__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return GraphTimeDelta(self._seconds + other._seconds)
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return GraphTimeDelta(self._seconds - other._seconds)
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return GraphTimeDelta(self._seconds * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return GraphTimeDelta(-self._seconds)
+
+    def __eq__(self, other):
+        return isinstance(other, GraphTimeDelta) and self._seconds == other._seconds
+
+    def __lt__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return self._seconds < other._seconds
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return self._seconds <= other._seconds
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return self._seconds > other._seconds
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return self._seconds >= other._seconds
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._seconds)
+
+    def __repr__(self):
+        return f"GraphTimeDelta(second={self._seconds!r})"
+
+class GraphTime():
+    __slots__ = ("_seconds",)
+
+    def __init__(self, seconds=0.0):
+        """Time seconds after the start of the capture, the stand-in only"""
+        self._seconds = seconds
+
+    def __add__(self, other):
+        if isinstance(other, GraphTimeDelta):
+            return GraphTime(self._seconds + other._seconds)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, GraphTime):
+            return GraphTimeDelta(self._seconds - other._seconds)
+        if isinstance(other, GraphTimeDelta):
+            return GraphTime(self._seconds - other._seconds)
+        return NotImplemented
+
+    def __eq__(self, other):
+        return isinstance(other, GraphTime) and self._seconds == other._seconds
+
+    def __lt__(self, other):
+        if isinstance(other, GraphTime):
+            return self._seconds < other._seconds
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, GraphTime):
+            return self._seconds <= other._seconds
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, GraphTime):
+            return self._seconds > other._seconds
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, GraphTime):
+            return self._seconds >= other._seconds
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._seconds)
+
+    def __repr__(self):
+        return f"GraphTime({self._seconds!r})"
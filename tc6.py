@@ -13,6 +13,10 @@
 # limitations under the License.
 
 from enum import Enum
+from functools import lru_cache
+
+# Number of distinct header/footer words kept decoded per type
+DECODE_CACHE_SIZE = 1024
 
 class Tc6State(Enum):
     CHIP_DESELECT = 0
@@ -30,24 +34,77 @@ class Tc6State(Enum):
     DATA_TRANSACTION = 10
     FOOTER = 11
 
+# Parity of every 16-bit value, a word is checked with two lookups
+PARITY_TABLE = bytearray(0x10000)
+for _i in range(1, 0x10000):
+    PARITY_TABLE[_i] = PARITY_TABLE[_i >> 1] ^ (_i & 1)
+del _i
+
+def parity_ok(word):
+    """Checks the odd parity of a header or footer word"""
+    return PARITY_TABLE[word >> 16] ^ PARITY_TABLE[word & 0xffff] == 1
+
+def word_from_bytes(word):
+    if isinstance(word, int):
+        return word
+    if isinstance(word, (bytes, bytearray, memoryview)):
+        return int.from_bytes(word, byteorder="big")
+    raise TypeError()
+
+class Tc6Word():
+    """Immutable decoded TC6 header or footer
+
+    Instances are shared between all occurrences of the same 32-bit word, see
+    decode_cache_info().
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def fields(self):
+        """Returns the decoded fields as dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = " ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"<{type(self).__name__} {fields}>"
+
 class Tc6Header():
     DNC_MASK = 0x80000000
     @classmethod
     def from_bytes(cls, header):
-        if isinstance(header, (bytes, bytearray)):
-            header = int.from_bytes(header, byteorder="big")
-        elif isinstance(header, int):
-            pass
-        else:
-            raise TypeError()
-
+        header = word_from_bytes(header)
         if header & cls.DNC_MASK:
-            hdr = Tc6TransmitDataHeader.from_bytes(header)
+            hdr = _decode_transmit_data_header(header)
         else:
-            hdr = Tc6ControlCommandHeader.from_bytes(header)
+            hdr = _decode_control_command_header(header)
         return hdr
 
-class Tc6DataFooter():
+def plausible_header(word):
+    """Checks if a word can be a header sent by the host
+
+    Used to find the start of the next transaction after a protocol violation:
+    the parity must be valid, reserved bits of a data header and HDRB of a
+    control header must be zero.
+    """
+    if not parity_ok(word):
+        return False
+    if word & Tc6Header.DNC_MASK:
+        return not word & Tc6TransmitDataHeader.RSVD_MASK
+    return not word & Tc6ControlCommandHeader.HDRB_MASK
+
+class Tc6DataFooter(Tc6Word):
     EXST_MASK = 0x80000000
     HDRB_MASK = 0x40000000
     SYNC_MASK = 0x20000000
@@ -69,36 +126,14 @@ class Tc6DataFooter():
     TXC_POS = 1
     PARITY_MASK = 0x00000001
 
+    __slots__ = ("exst", "hdrb", "sync", "rca", "vs", "dv", "sv", "swo", "fd", "ev", "ebo", "rtsa", "rtsp", "txc", "parity")
+
     def __init__(self, exst, hdrb, sync, rca, vs, dv, sv, swo, fd, ev, ebo, rtsa, rtsp, txc, parity):
-        self.exst = exst
-        self.hdrb = hdrb
-        self.sync = sync
-        self.rca = rca
-        self.vs = vs
-        self.dv  = dv
-        self.sv = sv
-        self.swo = swo
-        self.fd = fd
-        self.ev = ev
-        self.ebo = ebo
-        self.rtsa = rtsa
-        self.rtsp = rtsp
-        self.txc = txc
-        self.parity = parity
+        super().__init__(exst, hdrb, sync, rca, vs, dv, sv, swo, fd, ev, ebo, rtsa, rtsp, txc, parity)
 
     @classmethod
     def from_bytes(cls, footer):
-        try:
-            if isinstance(footer, (bytes, bytearray)):
-                footer = int.from_bytes(footer, byteorder="big")
-            elif isinstance(footer, int):
-                pass
-            else:
-                raise TypeError()
-            values = cls.decode_footer(footer)
-        except ValueError:
-            pass
-        return cls(*values)
+        return _decode_data_footer(word_from_bytes(footer))
 
     @classmethod
     def decode_footer(cls, footer):
@@ -117,10 +152,9 @@ class Tc6DataFooter():
         rtsp = True if footer & cls.RTSP_MASK else False
         txc = (footer & cls.TXC_MASK) >> cls.TXC_POS
         parity = True if footer & cls.PARITY_MASK else False
-        # TODO: parity check
         return (exst, hdrb, sync, rca, vs, dv, sv, swo, fd, ev, ebo, rtsa, rtsp, txc, parity)
 
-class Tc6TransmitDataHeader():
+class Tc6TransmitDataHeader(Tc6Word):
     DNC_MASK = 0x80000000
     SEQ_MASK = 0x40000000
     NORX_MASK = 0x20000000
@@ -132,6 +166,7 @@ class Tc6TransmitDataHeader():
     SV_MASK = 0x00100000
     SWO_MASK = 0x000f0000
     SWO_POS = 16
+    RSVD3_MASK = 0x00008000
     EV_MASK = 0x00004000
     EBO_MASK = 0x00003f00
     EBO_POS = 8
@@ -140,33 +175,16 @@ class Tc6TransmitDataHeader():
     RSVD2_MASK = 0x0000003e
     RSVD2_POS = 1
     PARITY_MASK = 0x00000001
+    RSVD_MASK = RSVD1_MASK | RSVD3_MASK | RSVD2_MASK
+
+    __slots__ = ("dnc", "seq", "norx", "vs", "dv", "sv", "swo", "ev", "ebo", "tsc", "p")
 
     def __init__(self, dnc, seq, norx, vs, dv, sv, swo, ev, ebo, tsc, p):
-        self.dnc = dnc
-        self.seq = seq
-        self.norx = norx
-        self.vs = vs
-        self.dv = dv
-        self.sv = sv
-        self.swo = swo
-        self.ev = ev
-        self.ebo = ebo
-        self.tsc = tsc
-        self.p = p
+        super().__init__(dnc, seq, norx, vs, dv, sv, swo, ev, ebo, tsc, p)
 
     @classmethod
     def from_bytes(cls, header):
-        try:
-            if isinstance(header, (bytes, bytearray)):
-                header = int.from_bytes(header, byteorder="big")
-            elif isinstance(header, int):
-                pass
-            else:
-                raise TypeError()
-            values = cls.decode_header(header)
-        except ValueError:
-            pass
-        return cls(*values)
+        return _decode_transmit_data_header(word_from_bytes(header))
 
     @classmethod
     def decode_header(cls, header):
@@ -181,10 +199,9 @@ class Tc6TransmitDataHeader():
         ebo = (header & cls.EBO_MASK) >> cls.EBO_POS
         tsc = (header & cls.TSC_MASK) >> cls.TSC_POS
         p = True if header & cls.PARITY_MASK else False
-        # TODO: parity check
         return (dnc, seq, norx, vs, dv, sv, swo, ev, ebo, tsc, p)
 
-class Tc6ControlCommandHeader():
+class Tc6ControlCommandHeader(Tc6Word):
     DNC_MASK = 0x80000000
     HDRB_MASK = 0x40000000
     WNR_MASK = 0x20000000
@@ -197,29 +214,14 @@ class Tc6ControlCommandHeader():
     LEN_POS = 1
     PARITY_MASK = 0x00000001
 
+    __slots__ = ("dnc", "wnr", "hdrb", "aid", "mms", "addr", "len", "p")
+
     def __init__(self, dnc, wnr, hdrb, aid, mms, addr, len, p):
-        self.dnc = dnc
-        self.wnr = wnr
-        self.hdrb = hdrb
-        self.aid = aid
-        self.mms = mms
-        self.addr = addr
-        self.len = len
-        self.p = p
+        super().__init__(dnc, wnr, hdrb, aid, mms, addr, len, p)
 
     @classmethod
     def from_bytes(cls, header):
-        try:
-            if isinstance(header, (bytes, bytearray)):
-                header = int.from_bytes(header, byteorder="big")
-            elif isinstance(header, int):
-                pass
-            else:
-                raise TypeError()
-            values = cls.decode_header(header)
-        except ValueError:
-            pass
-        return cls(*values)
+        return _decode_control_command_header(word_from_bytes(header))
 
     @classmethod
     def decode_header(cls, header):
@@ -231,5 +233,41 @@ class Tc6ControlCommandHeader():
         addr = (header & cls.ADDR_MASK) >> cls.ADDR_POS
         len = (header & cls.LEN_MASK) >> cls.LEN_POS
         p = True if header & cls.PARITY_MASK else False
-        # TODO: parity check
         return (dnc, wnr, hdrb, aid, mms, addr, len, p)
+
+# In steady-state traffic the same few header and footer words repeat, so
+# decoded words are interned in bounded LRU caches keyed on the raw word.
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_data_footer(footer):
+    return Tc6DataFooter(*Tc6DataFooter.decode_footer(footer))
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_transmit_data_header(header):
+    return Tc6TransmitDataHeader(*Tc6TransmitDataHeader.decode_header(header))
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_control_command_header(header):
+    return Tc6ControlCommandHeader(*Tc6ControlCommandHeader.decode_header(header))
+
+DECODE_CACHES = {
+    "footer": _decode_data_footer,
+    "data_header": _decode_transmit_data_header,
+    "control_header": _decode_control_command_header,
+}
+
+def decode_cache_info():
+    """Returns the hit/miss counters of the decode caches
+
+    Returns:
+        Dict of cache name to dict with 'hits', 'misses', 'size' and 'maxsize'
+    """
+    info = {}
+    for name, cache in DECODE_CACHES.items():
+        hits, misses, maxsize, size = cache.cache_info()
+        info[name] = {"hits": hits, "misses": misses, "size": size, "maxsize": maxsize}
+    return info
+
+def clear_decode_caches():
+    """Drops all interned words and resets the cache counters"""
+    for cache in DECODE_CACHES.values():
+        cache.cache_clear()
@@ -0,0 +1,162 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Vectorized bulk decoding of TC6 headers and footers for offline analysis
+#
+# Requires NumPy, which is not available inside Saleae Logic, so this module is
+# not imported by the High Level Analyzer. The field layout is taken from the
+# scalar classes in tc6.py, which remain the reference implementation.
+#
+# Example:
+#   footers = decode_footers(rx_footer_bytes)
+#   starved = footers["txc"] == 0
+import numpy as np
+from tc6 import Tc6ControlCommandHeader, Tc6DataFooter, Tc6TransmitDataHeader
+
+# (field name, mask, position) in the order of the scalar decode functions,
+# a position of None marks a boolean flag
+FOOTER_FIELDS = (
+    ("exst", Tc6DataFooter.EXST_MASK, None),
+    ("hdrb", Tc6DataFooter.HDRB_MASK, None),
+    ("sync", Tc6DataFooter.SYNC_MASK, None),
+    ("rca", Tc6DataFooter.RCA_MASK, Tc6DataFooter.RCA_POS),
+    ("vs", Tc6DataFooter.VS_MASK, Tc6DataFooter.VS_POS),
+    ("dv", Tc6DataFooter.DV_MASK, None),
+    ("sv", Tc6DataFooter.SV_MASK, None),
+    ("swo", Tc6DataFooter.SWO_MASK, Tc6DataFooter.SWO_POS),
+    ("fd", Tc6DataFooter.FD_MASK, None),
+    ("ev", Tc6DataFooter.EV_MASK, None),
+    ("ebo", Tc6DataFooter.EBO_MASK, Tc6DataFooter.EBO_POS),
+    ("rtsa", Tc6DataFooter.RTSA_MASK, None),
+    ("rtsp", Tc6DataFooter.RTSP_MASK, None),
+    ("txc", Tc6DataFooter.TXC_MASK, Tc6DataFooter.TXC_POS),
+    ("parity", Tc6DataFooter.PARITY_MASK, None),
+)
+
+DATA_HEADER_FIELDS = (
+    ("dnc", Tc6TransmitDataHeader.DNC_MASK, None),
+    ("seq", Tc6TransmitDataHeader.SEQ_MASK, None),
+    ("norx", Tc6TransmitDataHeader.NORX_MASK, None),
+    ("vs", Tc6TransmitDataHeader.VS_MASK, Tc6TransmitDataHeader.VS_POS),
+    ("dv", Tc6TransmitDataHeader.DV_MASK, None),
+    ("sv", Tc6TransmitDataHeader.SV_MASK, None),
+    ("swo", Tc6TransmitDataHeader.SWO_MASK, Tc6TransmitDataHeader.SWO_POS),
+    ("ev", Tc6TransmitDataHeader.EV_MASK, None),
+    ("ebo", Tc6TransmitDataHeader.EBO_MASK, Tc6TransmitDataHeader.EBO_POS),
+    ("tsc", Tc6TransmitDataHeader.TSC_MASK, Tc6TransmitDataHeader.TSC_POS),
+    ("p", Tc6TransmitDataHeader.PARITY_MASK, None),
+)
+
+CONTROL_HEADER_FIELDS = (
+    ("dnc", Tc6ControlCommandHeader.DNC_MASK, None),
+    ("wnr", Tc6ControlCommandHeader.WNR_MASK, None),
+    ("hdrb", Tc6ControlCommandHeader.HDRB_MASK, None),
+    ("aid", Tc6ControlCommandHeader.AID_MASK, None),
+    ("mms", Tc6ControlCommandHeader.MMS_MASK, Tc6ControlCommandHeader.MMS_POS),
+    ("addr", Tc6ControlCommandHeader.ADDR_MASK, Tc6ControlCommandHeader.ADDR_POS),
+    ("len", Tc6ControlCommandHeader.LEN_MASK, Tc6ControlCommandHeader.LEN_POS),
+    ("p", Tc6ControlCommandHeader.PARITY_MASK, None),
+)
+
+def as_words(data):
+    """Converts TC6 words into a uint32 array
+
+    Args:
+        data: uint32 array, sequence of ints or big-endian byte buffer with a
+              length that is a multiple of 4
+
+    Returns:
+        Array of native endian uint32 words
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(data, dtype=">u4").astype(np.uint32)
+    return np.asarray(data, dtype=np.uint32)
+
+def check_parity(words):
+    """Checks the odd parity of TC6 headers and footers
+
+    Args:
+        words: uint32 array of headers or footers including the parity bit
+
+    Returns:
+        Boolean array, True where the parity is valid
+    """
+    x = as_words(words)
+    x = x ^ (x >> 16)
+    x ^= x >> 8
+    x ^= x >> 4
+    x ^= x >> 2
+    x ^= x >> 1
+    return (x & 1).astype(bool)
+
+def _decode(words, fields):
+    words = as_words(words)
+    columns = {}
+    for name, mask, pos in fields:
+        if pos is None:
+            columns[name] = (words & mask) != 0
+        else:
+            value = (words & mask) >> pos
+            columns[name] = value.astype(np.uint8 if (mask >> pos) <= 0xff else np.uint16)
+    columns["parity_ok"] = check_parity(words)
+    return columns
+
+def decode_footers(words):
+    """Decodes data chunk footers
+
+    Args:
+        words: uint32 array or big-endian byte buffer of footers
+
+    Returns:
+        Dict of field name to column array using the Tc6DataFooter attribute
+        names, plus 'parity_ok'
+    """
+    return _decode(words, FOOTER_FIELDS)
+
+def decode_data_headers(words):
+    """Decodes data chunk transmit headers
+
+    Args:
+        words: uint32 array or big-endian byte buffer of headers
+
+    Returns:
+        Dict of field name to column array using the Tc6TransmitDataHeader
+        attribute names, plus 'parity_ok'
+    """
+    return _decode(words, DATA_HEADER_FIELDS)
+
+def decode_control_headers(words):
+    """Decodes control command headers
+
+    Args:
+        words: uint32 array or big-endian byte buffer of headers
+
+    Returns:
+        Dict of field name to column array using the Tc6ControlCommandHeader
+        attribute names, plus 'parity_ok'
+    """
+    return _decode(words, CONTROL_HEADER_FIELDS)
+
+def split_headers(words):
+    """Separates data and control headers by the DNC flag
+
+    Args:
+        words: uint32 array or big-endian byte buffer of headers
+
+    Returns:
+        (data header mask, control header mask) boolean arrays
+    """
+    words = as_words(words)
+    data = (words & Tc6TransmitDataHeader.DNC_MASK) != 0
+    return data, ~data
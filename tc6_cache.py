@@ -0,0 +1,268 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Persistent decode cache
+#
+# The decoded frames of a capture are stored in a cache directory, keyed by
+# the decoder settings (including the register map) and the first bytes of
+# the capture. A CSV capture is decoded in segments ending at chip select
+# deassertions (about CHECKPOINT_SIZE bytes each). After every segment a checkpoint is recorded:
+# the file offset, the SHA-256 digest of all capture bytes up to the offset,
+# the position in the frame file and the decoder state (Tc6Decoder.checkpoint()).
+# Detection of the decoding parameters continues across segments like in a
+# single pass, no checkpoint is recorded while it holds events.
+#
+# Decoding the same capture again only hashes the file: the frames of all
+# segments up to the last checkpoint whose digest still matches are read
+# from the cache, the decoder state is restored and decoding resumes at the
+# checkpoint offset. A capture exported again with more data at the end
+# reuses its unchanged prefix. Binary exports are only reused as a whole.
+#
+# Entry files:
+#   <key>.index   pickled dict with the checkpoints
+#   <key>.frames  pickled (frames, log messages) record of every segment
+#
+# The least recently used entries are removed when the directory exceeds
+# its size limit.
+#
+# Example:
+#   cache = DecodeCache(".tc6cache")
+#   for frame in cache.decode_csv(decoder, settings, "capture.csv"):
+#       ...
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+from tc6_capture import read_binary, read_csv, split_csv
+
+# Increment when the decoder output changes, entries of other versions
+# are not used
+CACHE_VERSION = 3
+CHECKPOINT_SIZE = 4 * 1024 * 1024
+KEY_PREFIX_SIZE = 64 * 1024
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+HASH_READ_SIZE = 1024 * 1024
+
+# offset and digest of the capture prefix, end of the segment record in the
+# frame file and decoder state. The state of the final checkpoint at the end
+# of the capture may be in the middle of a transaction, it is only used if
+# the capture did not change.
+Checkpoint = namedtuple('Checkpoint', ['offset', 'digest', 'frames_end', 'state', 'final'])
+
+def _hash_range(f, hasher, start, end):
+    f.seek(start)
+    while start < end:
+        data = f.read(min(HASH_READ_SIZE, end - start))
+        if not data:
+            break
+        hasher.update(data)
+        start += len(data)
+
+class DecodeCache():
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, checkpoint_size=CHECKPOINT_SIZE):
+        """Decode cache initialization
+
+        Args:
+            directory: Cache directory, created if missing
+            max_size: Size limit of the directory in bytes
+            checkpoint_size: Capture bytes between checkpoints
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.checkpoint_size = checkpoint_size
+        self.reused_bytes = 0
+        self.decoded_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind, settings, data):
+        hasher = hashlib.sha256(repr((CACHE_VERSION, kind, tuple(settings))).encode())
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".index", base + ".frames"
+
+    def load_index(self, key):
+        index_path, frames_path = self.paths(key)
+        try:
+            with open(index_path, "rb") as f:
+                index = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return []
+        if not os.path.exists(frames_path) or index.get("version") != CACHE_VERSION:
+            return []
+        return index["checkpoints"]
+
+    def save_index(self, key, checkpoints):
+        index_path, _ = self.paths(key)
+        with open(index_path + ".tmp", "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "checkpoints": checkpoints}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(index_path + ".tmp", index_path)
+
+    def replay(self, f, frames_end, decoder):
+        """Yields the cached frames up to frames_end and logs the messages"""
+        f.seek(0)
+        while f.tell() < frames_end:
+            frames, messages = pickle.load(f)
+            for message in messages:
+                decoder.log(message)
+            yield from frames
+
+    def decode_segment(self, decoder, events, f, end=True):
+        """Decodes the events of one segment and appends its record
+
+        Args:
+            decoder: Tc6Decoder
+            events: SPI events of the segment
+            f: Frame file
+            end: The segment ends the capture, detection ends with it
+        """
+        messages = []
+        log = decoder.log
+        def record_log(message):
+            messages.append(message)
+            log(message)
+        decoder.log = record_log
+        try:
+            frames = list(decoder.feed(events, end))
+        finally:
+            decoder.log = log
+        pickle.dump((frames, messages), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return frames
+
+    def decode_csv(self, decoder, settings, path):
+        """Decodes a CSV capture, reusing the cached frames of its unchanged
+        prefix
+
+        Args:
+            decoder: Tc6Decoder created from settings, not used yet
+            settings: Decoder setting strings, part of the cache key
+            path: Path of the CSV file
+
+        Yields:
+            Decoded frames
+        """
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            key = self.key("csv", settings, f.read(KEY_PREFIX_SIZE))
+        _, frames_path = self.paths(key)
+
+        # longest prefix with matching checkpoints
+        checkpoints = []
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            position = 0
+            for checkpoint in self.load_index(key):
+                if checkpoint.offset > size or (checkpoint.final and checkpoint.offset != size):
+                    break
+                candidate = hasher.copy()
+                _hash_range(f, candidate, position, checkpoint.offset)
+                if candidate.hexdigest() != checkpoint.digest:
+                    break
+                hasher = candidate
+                position = checkpoint.offset
+                checkpoints.append(checkpoint)
+
+        resume = checkpoints[-1] if checkpoints else None
+        if resume is None and os.path.exists(frames_path):
+            os.remove(frames_path)
+        self.save_index(key, checkpoints)
+        with open(frames_path, "a+b") as frames_file:
+            if resume is not None:
+                self.reused_bytes += resume.offset
+                yield from self.replay(frames_file, resume.frames_end, decoder)
+                decoder.restore(resume.state)
+                frames_file.truncate(resume.frames_end)
+            frames_file.seek(0, os.SEEK_END)
+
+            segments = [(start, end) for start, end in split_csv(path, max(1, size // self.checkpoint_size))
+                        if resume is None or start >= resume.offset]
+            if resume is not None and resume.offset < size and (not segments or segments[0][0] > resume.offset):
+                segments.insert(0, (resume.offset, segments[0][0] if segments else size))
+            with open(path, "rb") as f:
+                for start, end in segments:
+                    yield from self.decode_segment(decoder, read_csv(path, start, end), frames_file, end == size)
+                    _hash_range(f, hasher, position, end)
+                    self.decoded_bytes += end - position
+                    position = end
+                    if decoder.detector is None or not decoder.detector.active:
+                        # the events held by detection continue into the
+                        # next segment, its frames are in the next record
+                        checkpoints.append(Checkpoint(end, hasher.hexdigest(), frames_file.tell(), decoder.checkpoint(), end == size))
+        self.save_index(key, checkpoints)
+        self.evict(key)
+
+    def decode_binary(self, decoder, settings, paths, cpol=0, cpha=0):
+        """Decodes a binary export, reusing the cached frames if the channel
+        files did not change
+
+        Args:
+            decoder: Tc6Decoder created from settings, not used yet
+            settings: Decoder setting strings, part of the cache key
+            paths: clk, mosi, miso and cs file paths
+
+        Yields:
+            Decoded frames
+        """
+        hasher = hashlib.sha256(repr((cpol, cpha)).encode())
+        size = 0
+        for path in paths:
+            with open(path, "rb") as f:
+                file_size = os.path.getsize(path)
+                _hash_range(f, hasher, 0, file_size)
+                size += file_size
+        key = self.key("binary", settings, hasher.digest())
+        _, frames_path = self.paths(key)
+        checkpoints = self.load_index(key)
+        if checkpoints:
+            # the modification time orders the entries for eviction
+            os.utime(self.paths(key)[0])
+            with open(frames_path, "rb") as f:
+                yield from self.replay(f, checkpoints[-1].frames_end, decoder)
+            decoder.restore(checkpoints[-1].state)
+            self.reused_bytes += size
+        else:
+            with open(frames_path, "wb") as f:
+                yield from self.decode_segment(decoder, read_binary(*paths, cpol, cpha), f)
+                checkpoints.append(Checkpoint(size, hasher.hexdigest(), f.tell(), decoder.checkpoint(), True))
+            self.decoded_bytes += size
+            self.save_index(key, checkpoints)
+        self.evict(key)
+
+    def evict(self, keep=None):
+        """Removes the least recently used entries until the directory is
+        within its size limit
+
+        Args:
+            keep: Key of an entry that is never removed
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in (".index", ".frames"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            for path in self.paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
@@ -0,0 +1,322 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Readers for exported Saleae SPI captures
+#
+# All readers are generators yielding SPI events as
+# (type, start_time, end_time, mosi, miso) tuples, type being one of 'enable',
+# 'disable' or 'result', so captures of any size are streamed with constant
+# memory into Tc6Decoder.feed().
+import csv
+import heapq
+import io
+import os
+import struct
+from array import array
+
+SALEAE_BINARY_ID = b"<SALEAE>"
+SALEAE_BINARY_DIGITAL = 0
+BINARY_READ_SIZE = 8192 # transitions read from disk at once
+# columns of the Logic 2 data table export, as written by tc6_synth.py
+LOGIC2_COLUMNS = ("name", "type", "start_time", "duration", "mosi", "miso")
+
+def _parse_value(value):
+    value = value.strip().strip('"')
+    if not value:
+        return b""
+    if value[:2] in ("0x", "0X"):
+        value = value[2:]
+        return bytes.fromhex(value if len(value) % 2 == 0 else "0" + value)
+    return int(value).to_bytes(1, byteorder="big")
+
+def read_csv(path, start=None, end=None):
+    """Streams a SPI analyzer export in CSV format
+
+    Supports the Logic 2 data table export (name, type, start_time, duration,
+    mosi, miso columns) and the Logic 1 export (Time [s], Packet ID, MOSI, MISO
+    columns) where chip select changes are derived from the packet ID.
+
+    Args:
+        path: Path of the CSV file
+        start: File offset of the first row to read, see split_csv()
+        end: File offset after the last row to read
+
+    Yields:
+        SPI events
+    """
+    with open(path, "rb") as f:
+        columns = _csv_columns(f.readline())
+        if start is not None:
+            f.seek(start)
+        reader = csv.reader(_csv_lines(f, end))
+        if "type" in columns:
+            yield from _read_logic2_csv(reader, columns)
+        elif "packet id" in columns:
+            yield from _read_logic1_csv(reader, columns)
+        else:
+            raise ValueError(f"{path}: unknown SPI export format")
+
+def _csv_columns(line):
+    return [c.strip().strip('"').lower() for c in next(csv.reader([line.decode()]))]
+
+def _csv_lines(f, end=None):
+    if end is None:
+        return io.TextIOWrapper(f, newline="")
+    # segments are small enough to be read at once
+    return io.StringIO(f.read(end - f.tell()).decode(), newline="")
+
+def split_csv(path, count):
+    """Splits a CSV export at chip select deassertions
+
+    Args:
+        path: Path of the CSV file
+        count: Number of segments
+
+    Returns:
+        List of (start, end) file offsets for read_csv(), at most count
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        columns = _csv_columns(f.readline())
+        data_start = f.tell()
+        if "type" in columns:
+            type_col = columns.index("type")
+            # a segment ends with a disable row
+            is_boundary = lambda previous, row: previous[type_col].strip('"') == "disable"
+        elif "packet id" in columns:
+            packet_col = columns.index("packet id")
+            # a segment starts with a new packet
+            is_boundary = lambda previous, row: previous[packet_col] != row[packet_col]
+        else:
+            raise ValueError(f"{path}: unknown SPI export format")
+
+        offsets = [data_start]
+        for i in range(1, count):
+            target = data_start + (size - data_start) * i // count
+            if target <= offsets[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline() # partial row, or the end of the previous one
+            offset = f.tell()
+            previous = None
+            while True:
+                line = f.readline()
+                if not line:
+                    offset = None
+                    break
+                row = next(csv.reader([line.decode()]), None)
+                if not row:
+                    offset += len(line)
+                    continue
+                if previous is not None and is_boundary(previous, row):
+                    break
+                previous = row
+                offset += len(line)
+            if offset is None:
+                break
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+def logic2_row_parser(columns=LOGIC2_COLUMNS):
+    """Returns a function converting a row of a Logic 2 CSV export into a SPI
+    event
+
+    Args:
+        columns: Lower case column names of the header line
+    """
+    type_col = columns.index("type")
+    start_col = columns.index("start_time")
+    duration_col = columns.index("duration")
+    mosi_col = columns.index("mosi")
+    miso_col = columns.index("miso")
+    def parse(row):
+        start_time = float(row[start_col])
+        end_time = start_time + float(row[duration_col])
+        event_type = row[type_col].strip('"')
+        if event_type == "result":
+            return (event_type, start_time, end_time, _parse_value(row[mosi_col]), _parse_value(row[miso_col]))
+        return (event_type, start_time, end_time, None, None)
+    return parse
+
+def _read_logic2_csv(reader, columns):
+    parse = logic2_row_parser(columns)
+    for row in reader:
+        if row:
+            yield parse(row)
+
+def _read_logic1_csv(reader, columns):
+    time_col = next(i for i, c in enumerate(columns) if c.startswith("time"))
+    packet_col = columns.index("packet id")
+    mosi_col = columns.index("mosi")
+    miso_col = columns.index("miso")
+    packet_id = None
+    time = None
+    for row in reader:
+        if not row:
+            continue
+        time = float(row[time_col])
+        if row[packet_col] != packet_id:
+            if packet_id is not None:
+                yield ("disable", time, time, None, None)
+            packet_id = row[packet_col]
+            yield ("enable", time, time, None, None)
+        yield ("result", time, time, _parse_value(row[mosi_col]), _parse_value(row[miso_col]))
+    if packet_id is not None:
+        yield ("disable", time, time, None, None)
+
+def _read_binary_header(f, path):
+    identifier, version, data_type = struct.unpack("<8sii", f.read(16))
+    if identifier != SALEAE_BINARY_ID or version != 0 or data_type != SALEAE_BINARY_DIGITAL:
+        raise ValueError(f"{path}: not a Logic 2 digital binary export (version 0)")
+    initial_state, begin_time, end_time, num_transitions = struct.unpack("<IddQ", f.read(28))
+    return initial_state, num_transitions
+
+BINARY_HEADER_SIZE = 44
+
+def _find_transition(f, num_transitions, time):
+    """Returns the index of the first transition after time"""
+    low = 0
+    high = num_transitions
+    while low < high:
+        mid = (low + high) // 2
+        f.seek(BINARY_HEADER_SIZE + mid * 8)
+        if struct.unpack("<d", f.read(8))[0] <= time:
+            low = mid + 1
+        else:
+            high = mid
+    f.seek(BINARY_HEADER_SIZE + low * 8)
+    return low
+
+def _read_transitions(f, num_transitions, channel):
+    while num_transitions:
+        count = min(num_transitions, BINARY_READ_SIZE)
+        for (time,) in struct.iter_unpack("<d", f.read(count * 8)):
+            yield (time, channel)
+        num_transitions -= count
+
+def read_binary(clk, mosi, miso, cs, cpol=0, cpha=0, start_time=None, end_time=None):
+    """Streams a Logic 2 digital binary export through a SPI decoder
+
+    Every channel is exported into its own file (digital_<n>.bin). The
+    transitions of the four SPI signals are merged in time order and sampled
+    on the SPI data capture edge, MSB first with 8 bits per transfer and an
+    active low chip select.
+
+    Args:
+        clk: Path of the SPI clock channel file
+        mosi: Path of the MOSI channel file
+        miso: Path of the MISO channel file
+        cs: Path of the chip select channel file
+        cpol: SPI clock polarity
+        cpha: SPI clock phase
+        start_time: Only transitions after this time are read, see
+                    split_binary()
+        end_time: Only transitions up to this time are read
+
+    Yields:
+        SPI events
+    """
+    CLK, MOSI, MISO, CS = range(4)
+    files = [open(path, "rb") for path in (clk, mosi, miso, cs)]
+    try:
+        level = []
+        transitions = []
+        for channel, f in enumerate(files):
+            initial_state, num_transitions = _read_binary_header(f, f.name)
+            if start_time is not None:
+                skipped = _find_transition(f, num_transitions, start_time)
+                initial_state ^= skipped & 1
+                num_transitions -= skipped
+            level.append(initial_state & 1)
+            transitions.append(_read_transitions(f, num_transitions, channel))
+
+        sample_on_rising_edge = cpol == cpha
+        selected = level[CS] == 0
+        bit_count = 0
+        mosi_value = 0
+        miso_value = 0
+        transfer_start = None
+        for time, channel in heapq.merge(*transitions):
+            if end_time is not None and time > end_time:
+                break
+            level[channel] ^= 1
+            if channel == CLK:
+                if selected and level[CLK] == sample_on_rising_edge:
+                    if bit_count == 0:
+                        transfer_start = time
+                    mosi_value = (mosi_value << 1) | level[MOSI]
+                    miso_value = (miso_value << 1) | level[MISO]
+                    bit_count += 1
+                    if bit_count == 8:
+                        yield ("result", transfer_start, time, bytes((mosi_value,)), bytes((miso_value,)))
+                        bit_count = 0
+                        mosi_value = 0
+                        miso_value = 0
+            elif channel == CS:
+                selected = level[CS] == 0
+                bit_count = 0 # incomplete transfers are dropped
+                mosi_value = 0
+                miso_value = 0
+                yield ("enable" if selected else "disable", time, time, None, None)
+    finally:
+        for f in files:
+            f.close()
+
+def split_binary(cs, count):
+    """Splits a binary export at chip select deassertions
+
+    Args:
+        cs: Path of the chip select channel file
+        count: Number of segments
+
+    Returns:
+        List of (start_time, end_time) for read_binary(), at most count, None
+        for the start of the first and the end of the last segment
+    """
+    with open(cs, "rb") as f:
+        initial_state, num_transitions = _read_binary_header(f, cs)
+        times = array("d")
+        times.fromfile(f, num_transitions)
+    # level after transition i is initial_state ^ ((i + 1) & 1), chip select
+    # is deasserted (high) after every second transition
+    first = 1 if initial_state & 1 else 0
+    deasserts = times[first::2]
+    bounds = [None]
+    for i in range(1, count):
+        time = deasserts[len(deasserts) * i // count] if deasserts else None
+        if time is not None and (bounds[-1] is None or time > bounds[-1]):
+            bounds.append(time)
+    bounds.append(None)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def binary_paths(directory, clk=0, mosi=1, miso=2, cs=3):
+    """Returns the clk, mosi, miso and cs file paths of an export directory"""
+    path = lambda channel: os.path.join(directory, f"digital_{channel}.bin")
+    return path(clk), path(mosi), path(miso), path(cs)
+
+def read_binary_dir(directory, clk=0, mosi=1, miso=2, cs=3, cpol=0, cpha=0):
+    """Streams a Logic 2 digital binary export directory
+
+    Args:
+        directory: Export directory containing digital_<n>.bin files
+        clk, mosi, miso, cs: Channel numbers of the SPI signals
+        cpol: SPI clock polarity
+        cpha: SPI clock phase
+
+    Yields:
+        SPI events
+    """
+    return read_binary(*binary_paths(directory, clk, mosi, miso, cs), cpol, cpha)
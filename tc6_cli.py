@@ -0,0 +1,224 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Offline TC6 decoder for exported Saleae SPI captures
+#
+# Example:
+#   python tc6_cli.py capture.csv -o transactions.csv
+#   python tc6_cli.py --format binary export_dir --clk 0 --mosi 1 --miso 2 --cs 3
+import argparse
+import csv
+import os
+import sys
+import time
+from tc6 import decode_cache_info
+from tc6_cache import DEFAULT_MAX_SIZE, DecodeCache
+from tc6_capture import binary_paths, read_binary_dir, read_csv
+from tc6_decoder import Tc6Decoder, RESULT_TYPES, COMPACT_RESULT_TYPES, create_link_stats_frame, format_label
+from tc6_filter import FilterError
+from tc6_instrument import DecoderStats
+from tc6_linkstats import DEFAULT_WINDOW, SUMMARY_FIELDS, LinkStats
+from tc6_parallel import ParallelDecoder, binary_segments, csv_segments
+from tc6_pcapng import PcapngWriter
+from tc6_regmap import DEFAULT_REGISTER_MAP, RegisterMapError
+from tc6_store import TransactionStore
+from tc6_timing import TimingStats
+
+def create_parser():
+    parser = argparse.ArgumentParser(description="Decode an exported SPI capture of the 10BASE-T1x MAC-PHY serial interface (TC6)")
+    parser.add_argument("input", help="SPI analyzer CSV export or Logic 2 binary export directory")
+    parser.add_argument("-o", "--output", help="output CSV file (default: stdout)")
+    parser.add_argument("--format", choices=("auto", "csv", "binary"), default="auto", help="input format")
+    parser.add_argument("--trace", choices=("transactions", "tx", "rx", "ethernet", "link", "combined"), default="transactions")
+    parser.add_argument("--block-payload-size", choices=("auto-detect", "64", "32"), default="auto-detect")
+    parser.add_argument("--control-data-protection", choices=("auto-detect", "enabled", "disabled"), default="auto-detect")
+    parser.add_argument("--filter", default="", help="only decode transactions matching the filter expression (see tc6_filter.py)")
+    parser.add_argument("--label", choices=("full", "compact"), default="full", help="label format")
+    parser.add_argument("--register-map", default=DEFAULT_REGISTER_MAP, metavar="NAME|FILE", help="register names and fields of control transactions: oa-tc6, lan865x or a JSON file (see tc6_regmap.py)")
+    parser.add_argument("--registers", metavar="FILE", help="write the register change log as CSV")
+    parser.add_argument("--link-stats", metavar="FILE", help="write link statistics windows as CSV")
+    parser.add_argument("--link-window", type=float, default=DEFAULT_WINDOW * 1000, metavar="MS", help="link statistics window length")
+    parser.add_argument("--timing", metavar="FILE", help="write SPI timing histograms as JSON (see tc6_timing.py)")
+    parser.add_argument("--cache", metavar="DIR", help="reuse the frames of earlier runs on the same capture (see tc6_cache.py)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_SIZE // (1024 * 1024), metavar="MB", help="size limit of the cache directory")
+    parser.add_argument("--pcapng", metavar="FILE", help="write the TX and RX Ethernet frames as PCAPNG (see tc6_pcapng.py)")
+    parser.add_argument("--store", metavar="FILE", help="write all transactions as binary transaction store (see tc6_store.py)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="decode on a pool of worker processes (see tc6_parallel.py)")
+    parser.add_argument("--cache-stats", action="store_true", help="report header/footer decode cache hits and misses")
+    parser.add_argument("--stats", metavar="FILE", help="write decoder instrumentation counters as JSON")
+    parser.add_argument("--stats-interval", type=float, metavar="SECONDS", help="also write the counters periodically")
+    binary = parser.add_argument_group("binary export")
+    binary.add_argument("--clk", type=int, default=0, help="SPI clock channel")
+    binary.add_argument("--mosi", type=int, default=1, help="MOSI channel")
+    binary.add_argument("--miso", type=int, default=2, help="MISO channel")
+    binary.add_argument("--cs", type=int, default=3, help="chip select channel")
+    binary.add_argument("--cpol", type=int, choices=(0, 1), default=0, help="SPI clock polarity")
+    binary.add_argument("--cpha", type=int, choices=(0, 1), default=0, help="SPI clock phase")
+    return parser
+
+def open_capture(args):
+    fmt = args.format
+    if fmt == "auto":
+        fmt = "binary" if os.path.isdir(args.input) else "csv"
+    if fmt == "binary":
+        return read_binary_dir(args.input, args.clk, args.mosi, args.miso, args.cs, args.cpol, args.cpha)
+    return read_csv(args.input)
+
+def open_cached(args, decoder, cache):
+    fmt = args.format
+    if fmt == "auto":
+        fmt = "binary" if os.path.isdir(args.input) else "csv"
+    register_map = args.register_map
+    if os.path.isfile(register_map):
+        # labels change with the contents of a register map file
+        info = os.stat(register_map)
+        register_map = f"{os.path.abspath(register_map)}:{info.st_size}:{info.st_mtime_ns}"
+    settings = (args.block_payload_size, args.control_data_protection, args.trace, args.filter, register_map)
+    if fmt == "binary":
+        paths = binary_paths(args.input, args.clk, args.mosi, args.miso, args.cs)
+        return cache.decode_binary(decoder, settings, paths, args.cpol, args.cpha)
+    return cache.decode_csv(decoder, settings, args.input)
+
+def open_segments(args, decoder):
+    fmt = args.format
+    if fmt == "auto":
+        fmt = "binary" if os.path.isdir(args.input) else "csv"
+    if fmt == "binary":
+        return binary_segments(args.input, decoder.segments, args.clk, args.mosi, args.miso, args.cs, args.cpol, args.cpha)
+    return csv_segments(args.input, decoder.segments)
+
+def write_register_log(registers, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("time", "mms", "addr", "name", "value"))
+        changes = []
+        for mms, addr in registers.registers():
+            name = registers.name(mms, addr) or ""
+            for t, value in registers.changes(mms, addr):
+                changes.append((t, mms, f"0x{addr:04x}", name, f"0x{value:08x}"))
+        writer.writerows(sorted(changes))
+
+def main(argv=None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    spi_frames = 0
+    def counted(events):
+        nonlocal spi_frames
+        for event in events:
+            spi_frames += 1
+            yield event
+
+    try:
+        decoder = Tc6Decoder.from_settings(args.block_payload_size, args.control_data_protection, args.trace, args.filter, args.register_map)
+    except FilterError as e:
+        parser.error(f"--filter: {e}")
+    except RegisterMapError as e:
+        parser.error(f"--register-map: {e}")
+    if args.cache:
+        # these need every transaction of the capture to be decoded
+        for option, value in (("--jobs", args.jobs > 1), ("--stats", args.stats), ("--timing", args.timing),
+                              ("--store", args.store), ("--link-stats", args.link_stats), ("--pcapng", args.pcapng)):
+            if value:
+                parser.error(f"{option} is not supported with --cache")
+    if args.jobs > 1:
+        if args.stats:
+            parser.error("--stats is not supported with --jobs")
+        if args.timing:
+            parser.error("--timing is not supported with --jobs")
+        if args.pcapng:
+            parser.error("--pcapng is not supported with --jobs")
+        if args.link_stats or args.trace == "link":
+            parser.error("link statistics are not supported with --jobs")
+        decoder = ParallelDecoder((args.block_payload_size, args.control_data_protection, args.trace, args.filter, args.register_map), args.jobs,
+                                  store=TransactionStore() if args.store else None)
+        frames = decoder.decode(open_segments(args, decoder))
+    else:
+        if args.store:
+            decoder.store = TransactionStore()
+        if args.timing:
+            decoder.timing = TimingStats(args.timing, names=decoder.register_map.names)
+        if args.link_stats or decoder.link_stats:
+            decoder.link_stats = LinkStats(args.link_window / 1000)
+        if args.pcapng:
+            decoder.pcapng = PcapngWriter(args.pcapng)
+        if args.cache:
+            cache = DecodeCache(args.cache, args.cache_size * 1024 * 1024)
+            frames = open_cached(args, decoder, cache)
+        else:
+            frames = decoder.feed(counted(open_capture(args)))
+    decoder.log = lambda message: print(message, file=sys.stderr)
+    if args.stats:
+        decoder.instrument(DecoderStats(args.stats, args.stats_interval))
+
+    link_stats = None
+    if args.link_stats:
+        link_stats = open(args.link_stats, "w", newline="")
+        link_writer = csv.DictWriter(link_stats, SUMMARY_FIELDS)
+        link_writer.writeheader()
+        decoder.link_stats.sink = link_writer.writerow
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(("type", "start_time", "end_time", "label"))
+        result_types = COMPACT_RESULT_TYPES if args.label == "compact" else RESULT_TYPES
+        decoded_frames = 0
+        start = time.perf_counter()
+        for frame in frames:
+            writer.writerow((frame.type, frame.start_time, frame.end_time, format_label(frame, result_types)))
+            decoded_frames += 1
+        if args.jobs == 1 and decoder.link_stats:
+            # the last window is closed at the end of the capture
+            for summary in decoder.link_stats.flush():
+                if decoder.trace_link_stats:
+                    frame = create_link_stats_frame(summary, decoder.clock)
+                    writer.writerow((frame.type, frame.start_time, frame.end_time, format_label(frame, result_types)))
+                    decoded_frames += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if link_stats:
+            link_stats.close()
+        if args.pcapng:
+            decoder.pcapng.close()
+
+    if args.stats:
+        decoder.stats.dump()
+    if args.registers:
+        write_register_log(decoder.registers, args.registers)
+    if args.store:
+        decoder.store.save(args.store)
+    if args.timing:
+        decoder.timing.dump()
+        for line in decoder.timing.report():
+            print(line, file=sys.stderr)
+    if args.pcapng:
+        print(f"{decoder.pcapng.frames} Ethernet frames exported, {decoder.pcapng.dropped_frames} dropped by the MAC-PHY", file=sys.stderr)
+
+    if args.jobs > 1:
+        print(f"{decoded_frames} frames decoded in {elapsed:.3f} s with {args.jobs} jobs", file=sys.stderr)
+    elif args.cache:
+        print(f"{decoded_frames} frames in {elapsed:.3f} s, {cache.reused_bytes} capture bytes reused from the cache, {cache.decoded_bytes} decoded", file=sys.stderr)
+    else:
+        rate = spi_frames / elapsed if elapsed else 0.0
+        print(f"{spi_frames} SPI frames decoded into {decoded_frames} frames in {elapsed:.3f} s ({rate:.0f} frames/s)", file=sys.stderr)
+    if args.cache_stats:
+        for name, info in decode_cache_info().items():
+            print(f"{name} cache: {info['hits']} hits, {info['misses']} misses, {info['size']}/{info['maxsize']} entries", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
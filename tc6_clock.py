@@ -0,0 +1,58 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Capture time conversion
+#
+# The offline tools pass capture times as float seconds, Logic passes
+# GraphTime, which can not be converted to float. Only the difference of two
+# GraphTimes (a GraphTimeDelta) is a number of seconds. Statistics that
+# compute with times (link statistics windows, timing histograms, PCAPNG
+# timestamps) take float seconds from a CaptureClock:
+#   - float times are passed through unchanged
+#   - GraphTimes are converted to seconds since the first GraphTime seen,
+#     the origin, and back to GraphTime by adding a GraphTimeDelta to it
+#
+# Example:
+#   clock = CaptureClock()
+#   seconds = clock.seconds(frame.start_time)
+#   start_time = clock.time(seconds)
+
+class CaptureClock():
+    def __init__(self):
+        self.origin = None
+        self.delta = None
+
+    def seconds(self, time):
+        """Returns a capture time as float seconds"""
+        if isinstance(time, (int, float)):
+            return time
+        if self.origin is None:
+            self.origin = time
+            self.delta = type(time - time)
+        return float(time - self.origin)
+
+    def time(self, seconds):
+        """Returns the capture time of seconds returned by seconds()"""
+        if self.origin is None:
+            return seconds
+        return self.origin + self.delta(second=seconds)
+
+    def state(self):
+        """Returns the origin, see restore()"""
+        return self.origin
+
+    def restore(self, origin):
+        """Continues converting times from the origin of a state()"""
+        self.origin = origin
+        self.delta = type(origin - origin) if origin is not None else None
@@ -0,0 +1,931 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# 10Base-T1S MAC-PHY serial interface (TC6) decoding engine
+#
+# The engine is independent of the Saleae Logic runtime so it can be driven
+# by the High Level Analyzer as well as by offline tools.
+import re
+from collections import deque, namedtuple
+from enum import Enum
+from tc6 import Tc6ControlCommandHeader, Tc6Header, Tc6State, Tc6DataFooter, Tc6TransmitDataHeader, parity_ok, plausible_header
+from tc6_clock import CaptureClock
+from tc6_detect import ConfigurationDetector
+from tc6_ethernet import EthernetFrameAssembler, EthernetHeader, decode_ethernet_header, format_mac
+from tc6_filter import compile_filter
+from tc6_linkstats import LinkStats
+from tc6_regmap import DEFAULT_REGISTER_MAP, load_register_map
+from tc6_registers import CONFIG0, RegisterShadow
+from tc6_store import CONTROL_READ, CONTROL_WRITE, DATA
+
+# Decoder output, field compatible with saleae.analyzers.AnalyzerFrame
+Frame = namedtuple('Frame', ['type', 'start_time', 'end_time', 'data'])
+
+# Frames carry the decoded fields as typed data, labels are only built from
+# these templates when a frame is displayed. Frame types are prefixed by the
+# trace view they belong to (transactions, tx, rx). Values shown in hex have
+# a preformatted *_hex field next to the typed field.
+RESULT_TYPES = {
+    'control_write': {
+        'format': 'Control Write Transaction: MMS={{data.mms}} ADDR={{data.addr_hex}} LEN={{data.len}} DATA={{data.data}} {{data.register}}'
+    },
+    'control_read': {
+        'format': 'Control Read Transaction: MMS={{data.mms}} ADDR={{data.addr_hex}} LEN={{data.len}} DATA={{data.data}} {{data.register}}'
+    },
+    'data_transaction': {
+        'format': 'Data Transaction: TX DV={{data.tx_dv}} Data={{data.tx_data}} RX DV={{data.rx_dv}} Data={{data.rx_data}}'
+    },
+    'tx_control_header': {
+        'format': 'Control Header: DNC={{data.dnc}} HDRB={{data.hdrb}} WNR={{data.wnr}} AID={{data.aid}} MMS={{data.mms}} ADDR={{data.addr_hex}} LEN={{data.len}} P={{data.p}} {{data.register}}'
+    },
+    'tx_data_header': {
+        'format': 'Data Header: DNC={{data.dnc}} SEQ={{data.seq}} NORX={{data.norx}} VS={{data.vs}} DV={{data.dv}} SV={{data.sv}} SWO={{data.swo}} EV={{data.ev}} EBO={{data.ebo}} TSC={{data.tsc}} P={{data.p}}'
+    },
+    'tx_register_write_data': {
+        'format': 'Register Write Data: {{data.data}}'
+    },
+    'tx_dummy_data': {
+        'format': 'Dummy Data: {{data.data}}'
+    },
+    'tx_data_chunk': {
+        'format': 'TX Data Chunk: {{data.data}}'
+    },
+    'rx_discard': {
+        'format': 'Chunk Data Discard: {{data.data}}'
+    },
+    'rx_header_echo': {
+        'format': 'Control Header Echo: DNC={{data.dnc}} HDRB={{data.hdrb}} WNR={{data.wnr}} AID={{data.aid}} MMS={{data.mms}} ADDR={{data.addr_hex}} LEN={{data.len}} P={{data.p}} {{data.register}}'
+    },
+    'rx_data_echo': {
+        'format': 'Data Echo: {{data.data}}'
+    },
+    'rx_register_read_data': {
+        'format': 'Register Read Data: {{data.data}}'
+    },
+    'rx_data_chunk': {
+        'format': 'RX Data Chunk: {{data.data}}'
+    },
+    'rx_footer': {
+        'format': 'Footer: EXST={{data.exst}} HDRB={{data.hdrb}} SYNC={{data.sync}} RCA={{data.rca}} VS={{data.vs}} DV={{data.dv}} SV={{data.sv}} SWO={{data.swo}} FD={{data.fd}} EV={{data.ev}} EBO={{data.ebo}} RTSA={{data.rtsa}} RTSP={{data.rtsp}} TXC={{data.txc}} PARITY={{data.parity}}'
+    },
+    'link_stats': {
+        'format': 'Link Statistics: TX={{data.tx_goodput}} bit/s RX={{data.rx_goodput}} bit/s EFFICIENCY={{data.payload_efficiency}}% TX_EFF={{data.tx_efficiency}}% RX_EFF={{data.rx_efficiency}}% STARVATION={{data.starvation_time}} s ({{data.starvation_count}}) RCA_MAX={{data.rca_max}} RCA_MEAN={{data.rca_mean}} EXST={{data.exst}} RTSA={{data.rtsa}} RTSP={{data.rtsp}}'
+    },
+    'dropped_transaction': {
+        'format': 'Dropped Transaction: {{data.reason}} HEADER={{data.header}} ECHO={{data.echo}}'
+    },
+    'ethernet_frame': {
+        'format': '{{data.direction}} Ethernet Frame: DST={{data.dst}} SRC={{data.src}} VID={{data.vid}} PCP={{data.pcp}} TYPE={{data.ethertype_hex}} LEN={{data.length}} DROPPED={{data.dropped}}'
+    },
+}
+
+# Labels with the key fields only
+COMPACT_FORMATS = {
+    'control_write': 'WR {{data.mms}}:{{data.addr_hex}} {{data.data}}',
+    'control_read': 'RD {{data.mms}}:{{data.addr_hex}} {{data.data}}',
+    'data_transaction': 'DATA TX={{data.tx_dv}} RX={{data.rx_dv}} TXC={{data.txc}} RCA={{data.rca}}',
+    'tx_control_header': 'HDR {{data.mms}}:{{data.addr_hex}}',
+    'tx_data_header': 'HDR DV={{data.dv}}',
+    'tx_register_write_data': 'WR {{data.data}}',
+    'tx_dummy_data': 'DUMMY',
+    'tx_data_chunk': 'TX CHUNK',
+    'rx_discard': 'DISCARD',
+    'rx_header_echo': 'ECHO {{data.mms}}:{{data.addr_hex}}',
+    'rx_data_echo': 'ECHO {{data.data}}',
+    'rx_register_read_data': 'RD {{data.data}}',
+    'rx_data_chunk': 'RX CHUNK',
+    'rx_footer': 'FTR TXC={{data.txc}} RCA={{data.rca}} EXST={{data.exst}}',
+    'dropped_transaction': 'DROPPED {{data.reason}}',
+    'ethernet_frame': '{{data.direction}} {{data.length}}B TYPE={{data.ethertype_hex}}',
+    'link_stats': 'TX={{data.tx_goodput}} RX={{data.rx_goodput}} EFF={{data.payload_efficiency}}%',
+}
+
+COMPACT_RESULT_TYPES = {frame_type: {'format': text} for frame_type, text in COMPACT_FORMATS.items()}
+
+TEMPLATE_FIELD = re.compile(r"{{data\.(\w+)}}")
+
+def format_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + value.hex()
+    return str(value)
+
+def format_label(frame, result_types=RESULT_TYPES):
+    """Renders the label of a frame outside of Logic"""
+    data = frame.data
+    return TEMPLATE_FIELD.sub(lambda m: format_value(data.get(m.group(1), "")), result_types[frame.type]['format'])
+
+def strip_protection(data, protected):
+    """Returns control data without the protection (complement) words"""
+    if not protected:
+        return bytes(data)
+    return b"".join(data[i:i + 4] for i in range(0, len(data), 8))
+
+def protection_ok(data):
+    """Checks that every word of protected control data is followed by its
+    complement"""
+    for i in range(0, len(data) - 7, 8):
+        if int.from_bytes(data[i:i + 4], byteorder="big") ^ int.from_bytes(data[i + 4:i + 8], byteorder="big") != 0xffffffff:
+            return False
+    return True
+
+def create_control_transaction_frame(header: Tc6ControlCommandHeader, data: bytearray, protected, start_time, end_time, register_map):
+    data = strip_protection(data, protected)
+    return Frame('control_write' if header.wnr else 'control_read', start_time, end_time,
+                 {'mms': header.mms, 'addr': header.addr, 'addr_hex': hex(header.addr), 'len': header.len, 'data': data,
+                  'register': register_map.describe(header.mms, header.addr, data, not header.aid)})
+
+def create_data_transaction_frame(header: Tc6TransmitDataHeader, footer: Tc6DataFooter, txdata: bytearray, rxdata: bytearray, start_time, end_time):
+    return Frame('data_transaction', start_time, end_time, {
+        'tx_dv': header.dv, 'tx_sv': header.sv, 'tx_ev': header.ev,
+        'rx_dv': footer.dv, 'rx_sv': footer.sv, 'rx_ev': footer.ev,
+        'exst': footer.exst, 'rca': footer.rca, 'txc': footer.txc,
+        'tx_data': bytes(txdata) if header.dv else b"",
+        'rx_data': bytes(rxdata) if footer.dv else b"",
+    })
+
+def create_rx_discard_data_frame(data, start_time, end_time):
+    return Frame('rx_discard', start_time, end_time, {'data': bytes(data)})
+
+def create_rx_header_echo_frame(data, start_time, end_time, register_map):
+    return create_control_header_frame(Tc6ControlCommandHeader.from_bytes(data), start_time, end_time, register_map, 'rx_header_echo')
+
+def create_rx_control_data_echo_frame(data, start_time, end_time):
+    return Frame('rx_data_echo', start_time, end_time, {'data': bytes(data)})
+
+def create_rx_control_data_frame(data, start_time, end_time):
+    return Frame('rx_register_read_data', start_time, end_time, {'data': bytes(data)})
+
+def create_rx_data_chunk_frame(data, start_time, end_time):
+    return Frame('rx_data_chunk', start_time, end_time, {'data': bytes(data)})
+
+def create_rx_footer_frame(footer, start_time, end_time):
+    return Frame('rx_footer', start_time, end_time, footer.fields())
+
+def create_tx_control_data_frame(data, start_time, end_time):
+    return Frame('tx_register_write_data', start_time, end_time, {'data': bytes(data)})
+
+def create_tx_control_dummy_bytes_frame(data, start_time, end_time):
+    return Frame('tx_dummy_data', start_time, end_time, {'data': bytes(data)})
+
+def create_tx_data_chunk_frame(data, start_time, end_time):
+    return Frame('tx_data_chunk', start_time, end_time, {'data': bytes(data)})
+
+def create_control_header_frame(header, start_time, end_time, register_map, frame_type='tx_control_header'):
+    fields = header.fields()
+    fields['addr_hex'] = hex(header.addr)
+    fields['register'] = register_map.name(header.mms, header.addr) or ""
+    return Frame(frame_type, start_time, end_time, fields)
+
+def create_data_header_frame(header, start_time, end_time):
+    return Frame('tx_data_header', start_time, end_time, header.fields())
+
+def create_dropped_transaction_frame(reason, header, echo, start_time, end_time):
+    return Frame('dropped_transaction', start_time, end_time, {'reason': reason, 'header': bytes(header), 'echo': bytes(echo) if echo is not None else ""})
+
+def create_ethernet_frame(direction, frame):
+    header = decode_ethernet_header(frame.data) or EthernetHeader(b"", b"", None, None, 0)
+    vlan = header.vid is not None
+    # VID and PCP are empty for untagged frames, 0 is a priority tag
+    return Frame('ethernet_frame', frame.start_time, frame.end_time, {
+        'direction': direction,
+        'dst': format_mac(header.dst),
+        'src': format_mac(header.src),
+        'vlan': vlan,
+        'vid': header.vid if vlan else "",
+        'pcp': header.pcp if vlan else "",
+        'ethertype': header.ethertype,
+        'ethertype_hex': f"0x{header.ethertype:04x}",
+        'length': len(frame.data),
+        'dropped': frame.dropped,
+        'data': frame.data,
+    })
+
+def create_link_stats_frame(summary, clock=None):
+    if clock is None:
+        return Frame('link_stats', summary['window_start'], summary['window_end'], summary)
+    return Frame('link_stats', clock.time(summary['window_start']), clock.time(summary['window_end']), summary)
+
+class Trace(Enum):
+    TRANSACTION = 0
+    RX = 1
+    TX = 2
+    ETHERNET_FRAME = 3
+    LINK_STATS = 4
+
+# Views decoded in a single pass by the combined trace
+COMBINED_TRACES = (Trace.TRANSACTION, Trace.TX, Trace.RX)
+
+# Largest transaction between two header starts: header, header echo and
+# 128 protected control data words
+MAX_TRANSACTION_SIZE = 4 + 4 + 128 * 4 * 2
+
+class Tc6Decoder():
+    def __init__(self, trace=Trace.TRANSACTION, chunk_size=None, ctrl_rw_data_protection=None, transaction_filter=None, register_map=None):
+        """TC6 decoder initialization
+
+        Args:
+            trace: Trace output generated by the decoder, or an iterable of
+                   traces to generate several views in one decoding pass
+            chunk_size: Block payload size (64 or 32), None to auto-detect
+            ctrl_rw_data_protection: Control data protection, None to auto-detect
+            transaction_filter: Predicate from tc6_filter.compile_filter(),
+                                only matching transactions produce frames
+            register_map: RegisterMap naming the registers of control
+                          transactions, default the OA-TC6 standard registers
+        """
+        self.traces = frozenset([trace] if isinstance(trace, Trace) else trace)
+        self.trace_transaction = Trace.TRANSACTION in self.traces
+        self.trace_tx = Trace.TX in self.traces
+        self.trace_rx = Trace.RX in self.traces
+        self.trace_ethernet = Trace.ETHERNET_FRAME in self.traces
+        self.trace_link_stats = Trace.LINK_STATS in self.traces
+        # dropped transactions are shown in every view of the transactions
+        self.trace_errors = self.trace_transaction or self.trace_tx or self.trace_rx or self.trace_ethernet
+        self.header_start = 0
+        self.header_end = 0
+        self.header_echo_end = None
+        self.transaction_start = 0
+        self.transaction_end = 0
+        # start time of the second byte of the transaction, from which the
+        # header is searched again if the transaction is dropped
+        self.restart_time = 0
+
+        # Transaction bytes are collected in preallocated buffers. The state
+        # handler is only called when the position reaches the end of the
+        # current phase (boundary), phase_start is the start time of its first byte.
+        self.txbuf = bytearray(MAX_TRANSACTION_SIZE)
+        self.rxbuf = bytearray(MAX_TRANSACTION_SIZE)
+        self.txview = memoryview(self.txbuf)
+        self.rxview = memoryview(self.rxbuf)
+        self.pos = 0
+        self.boundary = 4
+        self.phase_begin = 0
+        self.phase_start = None
+        self.data_len = 0
+
+        # Start times of the bytes in the header search window (ERROR state)
+        self.sync_times = deque(maxlen=4)
+
+        self.handlers = {
+            Tc6State.HEADER_START: self.decode_header,
+            Tc6State.HEADER: self.decode_header,
+            Tc6State.CTRL_WRITE_HEADER_ECHO: self.decode_ctrl_write_header_echo,
+            Tc6State.CTRL_WRITE_DATA_ECHO: self.decode_ctrl_write_data_echo,
+            Tc6State.CTRL_WRITE_DUMMY_BYTES: self.decode_ctrl_write_dummy_bytes,
+            Tc6State.CTRL_READ_HEADER_ECHO: self.decode_ctrl_read_header_echo,
+            Tc6State.CTRL_READ_DATA: self.decode_ctrl_read_data,
+            Tc6State.DATA_TRANSACTION: self.decode_data_transaction,
+            Tc6State.FOOTER: self.decode_footer,
+        }
+
+        # Without filter frames are created immediately. With filter the frame
+        # factories and their arguments are queued until the transaction is
+        # complete, so labels of non-matching transactions are never built.
+        self.transaction_filter = transaction_filter
+        self.pending = []
+        self.emit = self.emit_frame if transaction_filter is None else self.queue_frame
+
+        if self.trace_ethernet:
+            self.tx_frames = EthernetFrameAssembler()
+            self.rx_frames = EthernetFrameAssembler()
+
+        # values of all registers read or written
+        self.register_map = register_map if register_map is not None else load_register_map()
+        self.registers = RegisterShadow(self.register_map.names)
+
+        self.auto_chunk_size = chunk_size is None
+        # we assume default setting in the device for auto-detect as initial value
+        self.chunk_size = 64 if chunk_size is None else chunk_size
+
+        self.auto_ctrl_rw_data_protection = ctrl_rw_data_protection is None
+        self.ctrl_rw_data_protection = bool(ctrl_rw_data_protection)
+
+        # decoding parameter change notifications
+        self.log = print
+        self.stats = None
+        # optional TransactionStore recording all transactions
+        self.store = None
+        # converts capture times for the statistics computing in seconds
+        self.clock = CaptureClock()
+        # link statistics, summary frames are only emitted by the link trace
+        self.link_stats = LinkStats() if self.trace_link_stats else None
+        # optional TimingStats collecting timing histograms
+        self.timing = None
+        # optional PcapngWriter exporting the Ethernet frames
+        self.pcapng = None
+
+        # The capture may start in the middle of a transaction, search the
+        # first header until chip select is asserted
+        self.state = Tc6State.ERROR
+        self.boundary = 0
+        # searching a header after a protocol violation, until the next chip
+        # select assertion or decoded transaction
+        self.recovering = True
+
+        # auto-detected settings are inferred from the first transactions,
+        # the SPI events are passed to the detector while these are set
+        self.transaction_count = 0
+        self.detector = None
+        self.detect_results = False
+        self.detect_chip_select = False
+        if self.auto_chunk_size or self.auto_ctrl_rw_data_protection:
+            self.detector = ConfigurationDetector(self)
+
+    @classmethod
+    def from_settings(cls, block_payload_size_setting, control_data_protection_setting, trace_setting, filter_setting="", register_map_setting=""):
+        """Creates a decoder from the analyzer setting strings
+
+        Args:
+            block_payload_size_setting: 'auto-detect', '64' or '32'
+            control_data_protection_setting: 'auto-detect', 'enabled' or 'disabled'
+            trace_setting: 'transactions', 'tx', 'rx', 'ethernet', 'link' or 'combined'
+            filter_setting: Filter expression, see tc6_filter.py
+            register_map_setting: Built-in register map name or JSON file,
+                                  see tc6_regmap.py
+
+        Raises:
+            FilterError: Invalid filter expression
+            RegisterMapError: Unknown or invalid register map
+        """
+        if block_payload_size_setting == "32":
+            chunk_size = 32
+        elif block_payload_size_setting == "64":
+            chunk_size = 64
+        else:
+            chunk_size = None
+
+        if control_data_protection_setting == "enabled":
+            ctrl_rw_data_protection = True
+        elif control_data_protection_setting == "disabled":
+            ctrl_rw_data_protection = False
+        else:
+            ctrl_rw_data_protection = None
+
+        if trace_setting == "rx":
+            trace = Trace.RX
+        elif trace_setting == "tx":
+            trace = Trace.TX
+        elif trace_setting == "ethernet":
+            trace = Trace.ETHERNET_FRAME
+        elif trace_setting == "link":
+            trace = Trace.LINK_STATS
+        elif trace_setting == "combined":
+            trace = COMBINED_TRACES
+        else:
+            trace = Trace.TRANSACTION
+
+        return cls(trace, chunk_size, ctrl_rw_data_protection, compile_filter(filter_setting),
+                   load_register_map(register_map_setting or DEFAULT_REGISTER_MAP))
+
+    def instrument(self, stats):
+        """Enables instrumentation of the decoder
+
+        Args:
+            stats: DecoderStats instance collecting the counters
+        """
+        self.stats = stats
+        stats.attach(self)
+
+    def checkpoint(self):
+        """Returns the decoding state between two chip select assertions as
+        picklable dict, see restore(). Events held by an active detection
+        are not part of the state, check detector.active before."""
+        state = {
+            "state": self.state,
+            "chunk_size": self.chunk_size,
+            "ctrl_rw_data_protection": self.ctrl_rw_data_protection,
+            "transaction_count": self.transaction_count,
+            "clock": self.clock.state(),
+            "registers": self.registers.state(),
+        }
+        if self.detector is not None:
+            state["detector"] = self.detector.state()
+        if self.trace_ethernet:
+            state["ethernet"] = (self.tx_frames.state(), self.rx_frames.state())
+        if self.link_stats is not None:
+            state["link_stats"] = self.link_stats.state()
+        return state
+
+    def restore(self, state):
+        """Continues decoding from a checkpoint() of a decoder with the same
+        settings"""
+        self.state = state["state"]
+        self.chunk_size = state["chunk_size"]
+        self.ctrl_rw_data_protection = state["ctrl_rw_data_protection"]
+        self.transaction_count = state["transaction_count"]
+        self.clock.restore(state["clock"])
+        if self.detector is not None:
+            self.detector.restore(state["detector"])
+        self.registers.restore(state["registers"])
+        if self.trace_ethernet:
+            self.tx_frames.restore(state["ethernet"][0])
+            self.rx_frames.restore(state["ethernet"][1])
+        if self.link_stats is not None:
+            self.link_stats.restore(state["link_stats"])
+
+    def feed(self, events, end=True):
+        """Decodes a stream of SPI events
+
+        Args:
+            events: Iterable of (type, start_time, end_time, mosi, miso) tuples
+                    with type being 'enable', 'disable' or 'result'
+            end: The events end the capture, events held for detection are
+                 decoded, False to continue with the next feed()
+
+        Yields:
+            Decoded frames
+        """
+        for event_type, start_time, end_time, mosi, miso in events:
+            if event_type == "result":
+                frames = self.result(mosi, miso, start_time, end_time)
+                if frames:
+                    if isinstance(frames, list):
+                        yield from frames
+                    else:
+                        yield frames
+            elif event_type == "enable":
+                self.enable(start_time)
+            elif event_type == "disable":
+                self.disable(start_time)
+        if end and self.detector is not None:
+            # end of the capture before detection completed
+            yield from self.detector.end()
+
+    def disable(self, start_time):
+        """Chip select deasserted"""
+        if self.detect_chip_select:
+            self.detector.disable(start_time)
+        else:
+            self.chip_deselect(start_time)
+
+    def enable(self, start_time):
+        """Chip select asserted"""
+        if self.detect_chip_select:
+            self.detector.enable(start_time)
+        else:
+            self.chip_select(start_time)
+
+    def chip_deselect(self, start_time):
+        """Decodes a chip select deassertion"""
+        if self.pos and self.detector is not None and self.state not in (Tc6State.CHIP_DESELECT, Tc6State.ERROR):
+            # transaction cut off, the settings may have changed
+            self.detector.error(self.transaction_count)
+        self.state = Tc6State.CHIP_DESELECT
+        if self.timing is not None:
+            self.timing.chip_deselect(self.clock.seconds(start_time))
+
+    def chip_select(self, start_time):
+        """Decodes a chip select assertion"""
+        self.pending.clear()
+        self.recovering = False
+        if self.timing is not None:
+            self.timing.chip_select(self.clock.seconds(start_time))
+        self.next_transaction()
+
+    def next_transaction(self):
+        self.state = Tc6State.HEADER_START
+        self.pos = 0
+        self.boundary = 4
+        self.phase_begin = 0
+        self.phase_start = None
+
+    def end_transaction(self, frames):
+        """Completes a transaction, returns the frames to emit"""
+        self.next_transaction()
+        self.transaction_count += 1
+        self.recovering = False
+        if self.transaction_filter is None:
+            return frames
+        pending = self.pending
+        self.pending = []
+        if not self.transaction_matches():
+            return frames
+        for factory, args in pending:
+            frames.append(factory(*args))
+        return frames
+
+    def transaction_matches(self):
+        """Applies the filter to the current transaction"""
+        if self.header.dnc:
+            return self.transaction_filter(self.header, self.footer, self.header_word, self.footer_word)
+        return self.transaction_filter(self.header, None, self.header_word, None)
+
+    def emit_frame(self, frames, factory, *args):
+        frames.append(factory(*args))
+
+    def queue_frame(self, frames, factory, *args):
+        self.pending.append((factory, args))
+
+    def next_phase(self, state, boundary):
+        self.state = state
+        self.phase_begin = self.boundary
+        self.boundary = boundary
+        self.phase_start = None
+
+    def result(self, mosi, miso, start_time, end_time):
+        """Decodes one SPI transfer
+
+        Transfers of any size are accepted, a transfer spanning several
+        protocol phases is split at the phase boundaries.
+
+        Args:
+            mosi: Bytes sent by the host
+            miso: Bytes received by the host
+            start_time: Start time of the transfer
+            end_time: End time of the transfer
+
+        Returns:
+            Decoded frame, list of decoded frames or None
+        """
+        if self.detect_results:
+            # the detector holds the transfer or passes it back with
+            # detect_results cleared
+            return self.detector.result(mosi, miso, start_time, end_time)
+        if self.state == Tc6State.CHIP_DESELECT:
+            # chip select assertion not captured, the transaction still
+            # starts with the first byte after deassertion
+            if self.stats:
+                self.stats.event("missing_chip_select")
+            self.chip_select(start_time)
+        if self.phase_start is None:
+            self.phase_start = start_time
+
+        pos = self.pos
+        if len(mosi) == 1 and pos + 1 < self.boundary:
+            # single byte inside of a phase (the boundary is 0 in the ERROR state)
+            if pos == 1:
+                self.restart_time = start_time
+            self.txbuf[pos] = mosi[0]
+            self.rxbuf[pos] = miso[0]
+            self.pos = pos + 1
+            return None
+
+        frames = []
+        self.decode_bytes(mosi, miso, start_time, end_time, frames)
+        if not frames:
+            return None
+        return frames[0] if len(frames) == 1 else frames
+
+    def decode_bytes(self, mosi, miso, start_time, end_time, frames):
+        """Splits bytes at the phase boundaries and calls the state handlers"""
+        count = len(mosi)
+        offset = 0
+        while offset < count:
+            if self.state == Tc6State.ERROR:
+                offset = self.resync(mosi, miso, offset, start_time, end_time, frames)
+                continue
+            if self.phase_start is None:
+                self.phase_start = start_time
+            n = min(count - offset, self.boundary - self.pos)
+            if self.pos <= 1 < self.pos + n:
+                self.restart_time = start_time
+            self.txview[self.pos:self.pos + n] = mosi[offset:offset + n]
+            self.rxview[self.pos:self.pos + n] = miso[offset:offset + n]
+            self.pos += n
+            offset += n
+            if self.pos == self.boundary:
+                frames += self.handlers[self.state](end_time)
+
+    def enter_error(self, reason, end_time, restart=False):
+        """Enters the ERROR state after a protocol violation
+
+        The transaction in progress is dropped and decoding resumes at the
+        next plausible header.
+
+        Args:
+            reason: Event name counted by the instrumentation
+            end_time: End time of the current transfer
+            restart: Search a header again from the second byte of the
+                     dropped transaction (starting at restart_time), False
+                     to only search the following bytes
+
+        Returns:
+            List of frames decoded from the searched bytes
+        """
+        if self.stats:
+            self.stats.event(reason)
+        if self.detector is not None:
+            self.detector.error(self.transaction_count)
+        self.pending.clear()
+        frames = []
+        if restart:
+            txdata = bytes(self.txview[1:self.pos])
+            rxdata = bytes(self.rxview[1:self.pos])
+        self.state = Tc6State.ERROR
+        self.recovering = True
+        self.pos = 0
+        self.boundary = 0
+        self.phase_begin = 0
+        self.phase_start = None
+        self.sync_times.clear()
+        if restart:
+            self.decode_bytes(txdata, rxdata, self.restart_time, end_time, frames)
+        return frames
+
+    def drop_transaction(self, reason, end_time, echo=False):
+        """Drops the transaction in progress after a header parity error or a
+        header echo mismatch, see enter_error()
+
+        A dropped_transaction frame from the header to the second byte, where
+        the header search starts again, is emitted if the header matches the
+        filter. Headers found while searching after
+        an earlier violation are dropped without a frame, so a glitch is shown
+        once and not for every candidate header.
+
+        Args:
+            reason: Event name counted by the instrumentation
+            end_time: End time of the current transfer
+            echo: The header echo was received
+
+        Returns:
+            List of frames
+        """
+        frames = []
+        if self.trace_errors and not self.recovering:
+            if self.transaction_filter is None or self.transaction_filter(Tc6Header.from_bytes(self.header_word), None, self.header_word, None):
+                frames.append(create_dropped_transaction_frame(reason, self.txview[0:4], self.rxview[4:8] if echo else None,
+                                                               self.transaction_start, self.restart_time))
+        return frames + self.enter_error(reason, end_time, restart=True)
+
+    def resync(self, mosi, miso, offset, start_time, end_time, frames):
+        """Searches the next plausible header in the ERROR state
+
+        The last four bytes are kept in the buffers, the search window moves
+        by one byte until it contains a header, which is then decoded.
+
+        Returns:
+            Offset of the first byte after the header, or the end of the data
+        """
+        txbuf = self.txbuf
+        rxbuf = self.rxbuf
+        sync_times = self.sync_times
+        for offset in range(offset, len(mosi)):
+            if self.pos == 4:
+                txbuf[0:3] = txbuf[1:4]
+                rxbuf[0:3] = rxbuf[1:4]
+                self.pos = 3
+            txbuf[self.pos] = mosi[offset]
+            rxbuf[self.pos] = miso[offset]
+            sync_times.append(start_time)
+            self.pos += 1
+            if self.pos == 4 and plausible_header(int.from_bytes(txbuf[0:4], byteorder="big")):
+                if self.stats:
+                    self.stats.event("resync")
+                self.state = Tc6State.HEADER
+                self.boundary = 4
+                self.phase_start = sync_times[0]
+                self.restart_time = sync_times[1]
+                frames += self.handlers[self.state](end_time)
+                return offset + 1
+        return len(mosi)
+
+    # State handlers, called when the current phase is complete. Each handler
+    # returns the list of frames of all enabled traces.
+
+    def decode_header(self, end_time):
+        frames = []
+        self.transaction_start = self.phase_start
+        self.header_start = self.phase_start
+        self.header_end = end_time
+        self.header_word = int.from_bytes(self.txview[0:4], byteorder="big")
+        if not parity_ok(self.header_word):
+            return self.drop_transaction("header_parity_error", end_time)
+        self.header = Tc6Header.from_bytes(self.header_word)
+        if isinstance(self.header, Tc6ControlCommandHeader):
+            self.data_len = (self.header.len + 1) * 4 * (2 if self.ctrl_rw_data_protection else 1)
+            if self.header.wnr:
+                self.next_phase(Tc6State.CTRL_WRITE_HEADER_ECHO, 8)
+            else:
+                self.next_phase(Tc6State.CTRL_READ_HEADER_ECHO, 8)
+            if self.trace_tx:
+                self.emit(frames, create_control_header_frame, self.header, self.header_start, self.header_end, self.register_map)
+            if self.trace_rx:
+                self.emit(frames, create_rx_discard_data_frame, self.rxview[0:4], self.header_start, self.header_end)
+        else:
+            self.data_len = self.chunk_size
+            if self.trace_tx:
+                self.emit(frames, create_data_header_frame, self.header, self.header_start, self.header_end)
+            self.next_phase(Tc6State.DATA_TRANSACTION, self.data_len)
+        return frames
+
+    def check_header_echo(self):
+        """Checks that the MAC-PHY echoed the control header, HDRB is set in
+        the echo if the MAC-PHY rejected the header"""
+        echo = int.from_bytes(self.rxview[4:8], byteorder="big")
+        return (echo | Tc6ControlCommandHeader.HDRB_MASK) == (self.header_word | Tc6ControlCommandHeader.HDRB_MASK)
+
+    def decode_ctrl_write_header_echo(self, end_time):
+        if not self.check_header_echo():
+            return self.drop_transaction("header_echo_mismatch", end_time, echo=True)
+        frames = []
+        self.header_echo_start = self.phase_start
+        self.header_echo_end = end_time
+        if self.data_len == 4:
+            self.txdata = self.txview[4:8]
+            self.rx_control_data_echo_start = None
+            if self.trace_tx:
+                self.emit(frames, create_tx_control_data_frame, self.txdata, self.header_echo_start, end_time)
+            self.next_phase(Tc6State.CTRL_WRITE_DUMMY_BYTES, 12)
+        else:
+            self.next_phase(Tc6State.CTRL_WRITE_DATA_ECHO, 4 + self.data_len)
+        if self.trace_rx:
+            self.emit(frames, create_rx_header_echo_frame, self.rxview[4:8], self.header_echo_start, self.header_echo_end, self.register_map)
+        return frames
+
+    def decode_ctrl_write_data_echo(self, end_time):
+        frames = []
+        self.rx_control_data_echo_start = self.phase_start
+        self.txdata = self.txview[4:4 + self.data_len]
+        if self.trace_tx:
+            self.emit(frames, create_tx_control_data_frame, self.txdata, self.header_echo_start, end_time)
+        self.next_phase(Tc6State.CTRL_WRITE_DUMMY_BYTES, 8 + self.data_len)
+        return frames
+
+    def decode_ctrl_write_dummy_bytes(self, end_time):
+        frames = []
+        self.tx_dummy_bytes_start = self.phase_start
+        if self.rx_control_data_echo_start is None:
+            # data echo starts with the dummy bytes for single word writes
+            self.rx_control_data_echo_start = self.phase_start
+        self.transaction_end = end_time
+        if self.trace_transaction:
+            self.emit(frames, create_control_transaction_frame, self.header, self.txdata, self.ctrl_rw_data_protection, self.transaction_start, self.transaction_end, self.register_map)
+        if self.trace_tx:
+            self.emit(frames, create_tx_control_dummy_bytes_frame, self.txview[4 + self.data_len:8 + self.data_len], self.tx_dummy_bytes_start, end_time)
+        if self.trace_rx:
+            self.emit(frames, create_rx_control_data_echo_frame, self.rxview[8:8 + self.data_len], self.rx_control_data_echo_start, self.transaction_end)
+        if self.store is not None:
+            self.record_control_transaction(CONTROL_WRITE, self.txdata)
+        self.update_registers(self.txdata)
+        if self.link_stats is not None:
+            frames += self.link_stats_frames(self.link_stats.control(self.clock.seconds(self.transaction_start), self.data_len + 8))
+        if self.timing is not None:
+            self.timing.transaction("control_write", self.clock.seconds(self.transaction_start), self.clock.seconds(self.transaction_end),
+                                    self.data_len + 8, (self.header.mms, self.header.addr))
+        return self.end_transaction(frames)
+
+    def decode_ctrl_read_header_echo(self, end_time):
+        if not self.check_header_echo():
+            return self.drop_transaction("header_echo_mismatch", end_time, echo=True)
+        frames = []
+        self.tx_dummy_bytes_start = self.phase_start
+        self.header_echo_start = self.phase_start
+        self.header_echo_end = end_time
+        if self.trace_rx:
+            self.emit(frames, create_rx_header_echo_frame, self.rxview[4:8], self.header_echo_start, end_time, self.register_map)
+        self.next_phase(Tc6State.CTRL_READ_DATA, 8 + self.data_len)
+        return frames
+
+    def decode_ctrl_read_data(self, end_time):
+        frames = []
+        self.rx_control_data_start = self.phase_start
+        self.transaction_end = end_time
+        rxdata = self.rxview[8:8 + self.data_len]
+        if self.trace_transaction:
+            self.emit(frames, create_control_transaction_frame, self.header, rxdata, self.ctrl_rw_data_protection, self.transaction_start, self.transaction_end, self.register_map)
+        if self.trace_tx:
+            self.emit(frames, create_tx_control_dummy_bytes_frame, self.txview[4:8 + self.data_len], self.tx_dummy_bytes_start, end_time)
+        if self.trace_rx:
+            self.emit(frames, create_rx_control_data_frame, rxdata, self.rx_control_data_start, end_time)
+        if self.store is not None:
+            self.record_control_transaction(CONTROL_READ, rxdata)
+        self.update_registers(rxdata)
+        if self.link_stats is not None:
+            frames += self.link_stats_frames(self.link_stats.control(self.clock.seconds(self.transaction_start), self.data_len + 8))
+        if self.timing is not None:
+            clock = self.clock
+            self.timing.transaction("control_read", clock.seconds(self.transaction_start), clock.seconds(self.transaction_end),
+                                    self.data_len + 8, (self.header.mms, self.header.addr),
+                                    clock.seconds(self.rx_control_data_start) - clock.seconds(self.header_end))
+        return self.end_transaction(frames)
+
+    def decode_data_transaction(self, end_time):
+        frames = []
+        self.tx_data_start = self.phase_start
+        self.rxdata = self.rxview[0:self.data_len]
+        if self.trace_rx:
+            self.emit(frames, create_rx_data_chunk_frame, self.rxdata, self.transaction_start, end_time)
+        self.next_phase(Tc6State.FOOTER, self.data_len + 4)
+        return frames
+
+    def decode_footer(self, end_time):
+        frames = []
+        self.footer_start = self.phase_start
+        self.transaction_end = end_time
+        self.footer_word = int.from_bytes(self.rxview[self.data_len:self.data_len + 4], byteorder="big")
+        self.footer = Tc6DataFooter.from_bytes(self.footer_word)
+        txdata = self.txview[4:4 + self.data_len]
+        if self.trace_transaction:
+            self.emit(frames, create_data_transaction_frame, self.header, self.footer, txdata, self.rxdata, self.transaction_start, self.transaction_end)
+        if self.trace_tx:
+            self.emit(frames, create_tx_data_chunk_frame, txdata, self.tx_data_start, end_time)
+        if self.trace_rx:
+            self.emit(frames, create_rx_footer_frame, self.footer, self.footer_start, end_time)
+        if self.trace_ethernet:
+            frames += self.reassemble_ethernet_frames(txdata, end_time)
+        if self.link_stats is not None:
+            frames += self.link_stats_frames(self.link_stats.chunk(self.header, self.footer, self.data_len,
+                                                                   self.clock.seconds(self.transaction_start), self.clock.seconds(end_time)))
+        if self.timing is not None:
+            self.timing.transaction("data", self.clock.seconds(self.transaction_start), self.clock.seconds(end_time), self.data_len + 4)
+        if self.pcapng is not None:
+            self.pcapng.chunk(self.header, self.footer, txdata, self.rxdata, self.clock.seconds(self.transaction_start), self.clock.seconds(end_time))
+        if self.store is not None:
+            self.store.append(DATA, self.transaction_start, end_time, self.header_word, self.footer_word, 0, 0, 0,
+                              txdata if self.header.dv else b"", self.rxdata if self.footer.dv else b"")
+        frames = self.end_transaction(frames)
+        if not parity_ok(self.footer_word):
+            # the chunk was likely not aligned, search the next header
+            frames += self.enter_error("footer_parity_error", end_time)
+        return frames
+
+    def reassemble_ethernet_frames(self, txdata, end_time):
+        """Feeds the chunk payload of a data transaction into the TX and RX
+        Ethernet frame reassembly
+
+        Returns:
+            List of frames for every completed Ethernet frame
+        """
+        h = self.header
+        f = self.footer
+        frames = []
+        for frame in self.tx_frames.chunk(txdata, h.dv, h.sv, h.swo, h.ev, h.ebo, False, self.transaction_start, end_time):
+            self.emit(frames, create_ethernet_frame, "TX", frame)
+        for frame in self.rx_frames.chunk(self.rxdata, f.dv, f.sv, f.swo, f.ev, f.ebo, f.fd, self.transaction_start, end_time):
+            self.emit(frames, create_ethernet_frame, "RX", frame)
+        return frames
+
+    def link_stats_frames(self, summaries):
+        """Returns the frames of closed link statistics windows, which are
+        not subject to the filter"""
+        if not summaries or not self.trace_link_stats:
+            return []
+        return [create_link_stats_frame(summary, self.clock) for summary in summaries]
+
+    def record_control_transaction(self, kind, data):
+        h = self.header
+        data = strip_protection(data, self.ctrl_rw_data_protection)
+        if kind == CONTROL_WRITE:
+            self.store.append(kind, self.transaction_start, self.transaction_end, self.header_word, 0, h.mms, h.addr, h.len, data, b"")
+        else:
+            self.store.append(kind, self.transaction_start, self.transaction_end, self.header_word, 0, h.mms, h.addr, h.len, b"", data)
+
+    def update_registers(self, data):
+        """Applies the data of a control read or write to the register shadow
+
+        Call this function after a control transaction is complete, the
+        decoding parameters are adjusted if CONFIG0 changed.
+        """
+        h = self.header
+        if self.stats and self.ctrl_rw_data_protection and not protection_ok(data):
+            self.stats.event("protection_error")
+        data = strip_protection(data, self.ctrl_rw_data_protection)
+        words = [int.from_bytes(data[i:i + 4], byteorder="big") for i in range(0, len(data), 4)]
+        changed = self.registers.apply(h.mms, h.addr, words, self.transaction_end, not h.aid)
+        if CONFIG0 in changed:
+            self.check_transaction_parameter_change()
+
+    def check_transaction_parameter_change(self):
+        """Adjusts decoding parameters to the CONFIG0 value of the register
+        shadow, specifially
+        - PROTE (Control data read/write protection enable)
+        - CPS (Chunk Payload Size)
+        fields are checked to see if these parameters are changed, and if they are
+        the decoder will be updated accordignly.
+        """
+        reg = self.registers.value(CONFIG0)
+        # Let's see if there is a change in control data protection mode
+        if self.auto_ctrl_rw_data_protection:
+            if (reg & 0x00000020):
+                if not self.ctrl_rw_data_protection:
+                    self.log("Control Data R/W protection changed to enabled")
+                    if self.stats:
+                        self.stats.event("protection_change")
+                self.ctrl_rw_data_protection = True
+            else:
+                if self.ctrl_rw_data_protection:
+                    self.log("Control Data R/W protection changed to disabled")
+                    if self.stats:
+                        self.stats.event("protection_change")
+                self.ctrl_rw_data_protection = False
+        if self.auto_chunk_size:
+            block_payload_size = reg & 0x00000007
+            previous_chunk_size = self.chunk_size
+            if block_payload_size == 0b101:
+                self.chunk_size = 32
+            elif block_payload_size == 0b110:
+                self.chunk_size = 64
+            if self.stats and self.chunk_size != previous_chunk_size:
+                self.stats.event("chunk_size_change")
+            self.log(f"Block payload size set to {self.chunk_size}")
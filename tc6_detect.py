@@ -0,0 +1,334 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Detection of block payload size and control data protection
+#
+# The SPI events are buffered and decoded by one lane per hypothesis (64/32
+# bytes x unprotected/protected for the auto-detected settings). A lane is a
+# decoder without traces that counts its completed transactions and its
+# errors: header/footer parity errors, header echo mismatches, protected
+# words that are not followed by their complement and transactions cut off
+# by a chip select deassertion. Lanes are compared at chip select
+# deassertions. Once a lane completed DETECT_TRANSACTIONS transactions and
+# one lane has fewer errors than all others, or a lane without errors
+# completed DETECT_MIN_TRANSACTIONS while all others have errors, that lane
+# wins: the decoder takes its settings and decodes the buffered events with
+# the next SPI transfer.
+#
+# Lanes that only differ in a setting the transactions did not use yet (e.g.
+# protection before the first control transaction) tie. Once every tied lane
+# completed DETECT_TRANSACTIONS transactions, the lane with the most
+# transactions wins, the current settings on equal counts. A setting the
+# tied lanes do not distinguish is tentative: the first byte of every
+# later transaction is checked, and a header that uses the setting (control
+# header for protection, data header for block payload size) starts
+# detection of that setting again with this transaction.
+#
+# Lanes follow CONFIG0 writes like the decoder, so captures containing the
+# configuration are decoded as before. Detection runs again from the next
+# chip select deassertion if REDETECT_ERRORS errors occur within
+# REDETECT_TRANSACTIONS transactions.
+#
+# The decoder passes its SPI events to the detector while detect_results or
+# detect_chip_select are set (see hook()). Events the detector does not hold
+# and held events it releases are passed back to result() once
+# detect_results is cleared, and to chip_select() and chip_deselect().
+from collections import deque
+from tc6 import Tc6Header, Tc6State
+
+DETECT_TRANSACTIONS = 16
+DETECT_MIN_TRANSACTIONS = 4
+# Limit of the buffered SPI events, for captures with few transactions
+DETECT_MAX_EVENTS = 50000
+REDETECT_ERRORS = 3
+REDETECT_TRANSACTIONS = 16
+
+# DNC bit of a header in its first byte
+DNC_BYTE_MASK = Tc6Header.DNC_MASK >> 24
+SETTINGS = ("chunk_size", "protection")
+
+# Decoder events counted as lane errors
+LANE_ERRORS = frozenset(("header_parity_error", "header_echo_mismatch", "footer_parity_error", "protection_error"))
+
+class LaneScore():
+    """Error counter of a lane, attached to the lane decoder as its stats"""
+    def __init__(self):
+        self.errors = 0
+
+    def event(self, name):
+        if name in LANE_ERRORS:
+            self.errors += 1
+
+class ConfigurationDetector():
+    def __init__(self, decoder):
+        """Detector initialization, starts detection on the first events
+
+        Args:
+            decoder: Tc6Decoder with auto-detected block payload size and/or
+                     control data protection
+        """
+        self.decoder = decoder
+        self.active = False
+        self.waiting = False
+        self.ready = False
+        self.detected = False
+        # a tentative result was logged, the next detection is logged too
+        self.tentative_logged = False
+        # tentative settings, checked by the next header of this kind
+        self.check_control = False
+        self.check_data = False
+        # time of a chip select assertion waiting for the first byte
+        self.peek_time = None
+        self.events = []
+        self.lanes = []
+        self.errors = deque(maxlen=REDETECT_ERRORS)
+        self.start(initial=True)
+
+    def hook(self):
+        """Sets the decoder events passed to the detector: all events while
+        detection is active, the chip select events while detection waits
+        for the next deassertion or settings are tentative, and the first
+        transfer after an assertion that checks the tentative settings"""
+        d = self.decoder
+        d.detect_results = self.active or self.peek_time is not None
+        d.detect_chip_select = self.active or self.waiting or self.check_control or self.check_data
+
+    def hypotheses(self, settings=SETTINGS):
+        d = self.decoder
+        chunk_sizes = [d.chunk_size]
+        if d.auto_chunk_size and "chunk_size" in settings:
+            chunk_sizes += [size for size in (64, 32) if size != d.chunk_size]
+        protections = [d.ctrl_rw_data_protection]
+        if d.auto_ctrl_rw_data_protection and "protection" in settings:
+            protections.append(not d.ctrl_rw_data_protection)
+        # the current settings are the first lane and win ties
+        return [(chunk_size, protection) for chunk_size in chunk_sizes for protection in protections]
+
+    def start(self, initial=False, settings=SETTINGS):
+        """Starts detection of the auto-detected settings
+
+        Args:
+            initial: Detection starts with the first event of the capture
+                     instead of after a chip select deassertion
+            settings: Names of the settings detected, see SETTINGS
+        """
+        d = self.decoder
+        self.lanes = []
+        for chunk_size, protection in self.hypotheses(settings):
+            lane = type(d)((), chunk_size, protection, None, d.register_map)
+            lane.auto_chunk_size = d.auto_chunk_size
+            lane.auto_ctrl_rw_data_protection = d.auto_ctrl_rw_data_protection
+            lane.log = lambda message: None
+            lane.stats = LaneScore()
+            if not initial:
+                # detection starts after a chip select deassertion
+                lane.disable(None)
+            self.lanes.append((chunk_size, protection, lane))
+        self.events = []
+        self.active = True
+        self.waiting = False
+        self.ready = False
+        # a setting not detected again stays tentative
+        self.check_control = self.check_control and "protection" not in settings
+        self.check_data = self.check_data and "chunk_size" not in settings
+        self.peek_time = None
+        self.hook()
+
+    def stop(self):
+        """Ends detection without decoding the buffered events, the decoder
+        settings were set otherwise"""
+        self.active = False
+        self.waiting = False
+        self.detected = True
+        self.tentative_logged = False
+        self.check_control = False
+        self.check_data = False
+        self.peek_time = None
+        self.lanes = []
+        self.events = []
+        self.hook()
+
+    def state(self):
+        """Returns the detection state while detection is not active as
+        picklable dict, see restore()"""
+        return {
+            "waiting": self.waiting,
+            "detected": self.detected,
+            "tentative_logged": self.tentative_logged,
+            "check_control": self.check_control,
+            "check_data": self.check_data,
+            "errors": list(self.errors),
+        }
+
+    def restore(self, state):
+        """Continues detection from a state()"""
+        self.stop()
+        self.waiting = state["waiting"]
+        self.detected = state["detected"]
+        self.tentative_logged = state["tentative_logged"]
+        self.check_control = state["check_control"]
+        self.check_data = state["check_data"]
+        self.errors.clear()
+        self.errors.extend(state["errors"])
+        self.hook()
+
+    def end(self):
+        """Decodes the events still held at the end of the input
+
+        Returns:
+            List of decoded frames
+        """
+        if self.active:
+            return self.finish()
+        self.end_peek()
+        return []
+
+    def error(self, transaction_count):
+        """Counts a decoding error, detection starts again after the next
+        chip select deassertion if errors accumulate"""
+        if self.active or self.waiting:
+            return
+        self.errors.append(transaction_count)
+        if len(self.errors) == REDETECT_ERRORS and transaction_count - self.errors[0] <= REDETECT_TRANSACTIONS:
+            self.errors.clear()
+            self.waiting = True
+            self.hook()
+
+    def end_peek(self):
+        self.peek_time = None
+        self.hook()
+
+    def peek(self, mosi, miso, start_time, end_time):
+        """Checks the first transfer after a chip select assertion while
+        settings are tentative"""
+        enable_time = self.peek_time
+        self.end_peek()
+        control = mosi and not mosi[0] & DNC_BYTE_MASK
+        if mosi and self.decoder.pos == 0 and ((control and self.check_control) or (not control and self.check_data)):
+            # first transaction using the tentative setting, the decoder
+            # gets the chip select assertion again with the buffered events
+            self.start(settings=("protection",) if control else ("chunk_size",))
+            self.enable(enable_time)
+            return self.result(mosi, miso, start_time, end_time)
+        return self.decoder.result(mosi, miso, start_time, end_time)
+
+    def result(self, mosi, miso, start_time, end_time):
+        if not self.active:
+            return self.peek(mosi, miso, start_time, end_time)
+        self.events.append(("result", start_time, end_time, mosi, miso))
+        if self.ready or len(self.events) >= DETECT_MAX_EVENTS:
+            frames = self.finish()
+            if frames:
+                return frames[0] if len(frames) == 1 else frames
+            return None
+        for _, _, lane in self.lanes:
+            lane.result(mosi, miso, start_time, end_time)
+        return None
+
+    def enable(self, start_time):
+        if not self.active:
+            self.decoder.chip_select(start_time)
+            if self.check_control or self.check_data:
+                # the first byte decides whether detection starts again
+                self.peek_time = start_time
+                self.hook()
+            return None
+        self.events.append(("enable", start_time, start_time, None, None))
+        for _, _, lane in self.lanes:
+            lane.enable(start_time)
+
+    def disable(self, start_time):
+        if not self.active:
+            if self.peek_time is not None:
+                # no byte transferred
+                self.end_peek()
+            self.decoder.chip_deselect(start_time)
+            if self.waiting:
+                self.start()
+            return
+        self.events.append(("disable", start_time, start_time, None, None))
+        for _, _, lane in self.lanes:
+            if lane.state not in (Tc6State.CHIP_DESELECT, Tc6State.ERROR) and lane.pos > 0:
+                # transaction cut off, the lane expects more or fewer bytes
+                lane.stats.errors += 1
+            lane.disable(start_time)
+        self.ready = self.decided()
+
+    def score(self, lane):
+        return (-lane.stats.errors, lane.transaction_count)
+
+    def decided(self):
+        lanes = [lane for _, _, lane in self.lanes]
+        if len(lanes) == 1:
+            return True
+        errors = sorted(lane.stats.errors for lane in lanes)
+        if errors[0] == errors[1]:
+            # lanes that only differ in a setting not used yet (e.g.
+            # protection before the first control transaction) are not
+            # distinguished, the score picks the lane with the most
+            # transactions once every tied lane decoded enough of them
+            return all(lane.transaction_count >= DETECT_TRANSACTIONS for lane in lanes if lane.stats.errors == errors[0])
+        if errors[0] == 0 and max(lane.transaction_count for lane in lanes) >= DETECT_MIN_TRANSACTIONS:
+            return True
+        return max(lane.transaction_count for lane in lanes) >= DETECT_TRANSACTIONS
+
+    def finish(self):
+        """Commits to the best lane and decodes the buffered events
+
+        Returns:
+            List of decoded frames
+        """
+        d = self.decoder
+        scores = [self.score(lane) for _, _, lane in self.lanes]
+        best = max(scores)
+        chunk_size, protection, _ = self.lanes[scores.index(best)]
+        tied = [(lane_chunk_size, lane_protection) for (lane_chunk_size, lane_protection, _), score in zip(self.lanes, scores) if score == best]
+        check_data = self.check_data or any(lane_chunk_size != chunk_size for lane_chunk_size, _ in tied)
+        check_control = self.check_control or any(lane_protection != protection for _, lane_protection in tied)
+        changed = (chunk_size, protection) != (d.chunk_size, d.ctrl_rw_data_protection)
+        logged = not self.detected or changed or self.tentative_logged
+        if logged:
+            d.log(f"Detected block payload size {chunk_size}{' (no data transaction yet)' if check_data else ''}, "
+                  f"control data protection {'enabled' if protection else 'disabled'}{' (no control transaction yet)' if check_control else ''}")
+            if d.stats and self.detected and changed:
+                d.stats.event("redetection")
+        self.detected = True
+        self.tentative_logged = logged and (check_control or check_data)
+        d.chunk_size = chunk_size
+        d.ctrl_rw_data_protection = protection
+        self.active = False
+        self.lanes = []
+        self.hook()
+
+        events = self.events
+        self.events = []
+        frames = []
+        for event_type, start_time, end_time, mosi, miso in events:
+            if event_type == "result":
+                decoded = d.result(mosi, miso, start_time, end_time)
+                if decoded:
+                    if isinstance(decoded, list):
+                        frames += decoded
+                    else:
+                        frames.append(decoded)
+            elif event_type == "enable":
+                d.chip_select(start_time)
+            else:
+                d.chip_deselect(start_time)
+        # settings not distinguished are checked by the next transaction
+        # using them
+        self.check_data = check_data
+        self.check_control = check_control
+        self.hook()
+        return frames
@@ -0,0 +1,140 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Reassembly of Ethernet frames from TC6 data chunks
+from collections import namedtuple
+
+# Reassembled Ethernet frame, dropped is set if the MAC-PHY signalled a frame drop (FD)
+EthernetFrame = namedtuple('EthernetFrame', ['data', 'start_time', 'end_time', 'dropped'])
+
+# Decoded Ethernet header, vid and pcp are None for untagged frames, MAC
+# addresses are bytes
+EthernetHeader = namedtuple('EthernetHeader', ['dst', 'src', 'vid', 'pcp', 'ethertype'])
+
+VLAN_ETHERTYPES = (0x8100, 0x88a8)
+INITIAL_FRAME_BUFFER_SIZE = 2048
+
+class EthernetFrameAssembler():
+    """Reassembles Ethernet frames of one direction from data chunks
+
+    Chunk payload is copied into a reusable buffer that grows by doubling, so
+    frames spread over many chunks are assembled without quadratic copying.
+    """
+    def __init__(self):
+        self.buffer = bytearray(INITIAL_FRAME_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.in_frame = False
+        self.dropped = False
+        self.start_time = None
+
+    def append(self, data):
+        end = self.length + len(data)
+        if end > len(self.buffer):
+            size = len(self.buffer)
+            while size < end:
+                size *= 2
+            self.view.release()
+            self.buffer.extend(bytes(size - len(self.buffer)))
+            self.view = memoryview(self.buffer)
+        self.view[self.length:end] = data
+        self.length = end
+
+    def start(self, start_time):
+        self.length = 0
+        self.in_frame = True
+        self.dropped = False
+        self.start_time = start_time
+
+    def complete(self, end_time):
+        self.in_frame = False
+        return EthernetFrame(bytes(self.view[:self.length]), self.start_time, end_time, self.dropped)
+
+    def state(self):
+        """Returns the frame in transfer as picklable tuple"""
+        return (bytes(self.view[:self.length]), self.in_frame, self.dropped, self.start_time)
+
+    def restore(self, state):
+        """Continues the frame in transfer of state()"""
+        data, in_frame, dropped, start_time = state
+        self.length = 0
+        self.append(data)
+        self.in_frame = in_frame
+        self.dropped = dropped
+        self.start_time = start_time
+
+    def chunk(self, data, dv, sv, swo, ev, ebo, fd, start_time, end_time):
+        """Processes the payload of one data chunk
+
+        Args:
+            data: Chunk payload
+            dv, sv, swo, ev, ebo: Data valid, start valid, start word offset,
+                                  end valid and end byte offset of the chunk
+            fd: Frame drop, the frame in transfer is dropped
+            start_time: Start time of the chunk
+            end_time: End time of the chunk
+
+        Returns:
+            List of completed frames
+        """
+        frames = []
+        if not dv:
+            return frames
+        start = swo * 4
+        if self.in_frame and fd:
+            # drop applies to the frame in transfer
+            self.dropped = True
+            fd = False
+        if ev and (not sv or ebo < start):
+            # end of the frame started in an earlier chunk
+            if self.in_frame:
+                self.append(data[:ebo + 1])
+                frames.append(self.complete(end_time))
+        if sv:
+            # a frame that was never completed is discarded
+            self.start(start_time)
+            self.dropped = fd
+            if ev and ebo >= start:
+                self.append(data[start:ebo + 1])
+                frames.append(self.complete(end_time))
+            else:
+                self.append(data[start:])
+        elif not ev and self.in_frame:
+            self.append(data)
+        return frames
+
+def decode_ethernet_header(data):
+    """Decodes the Ethernet and VLAN header of a frame
+
+    Args:
+        data: Ethernet frame starting with the destination MAC address
+
+    Returns:
+        EthernetHeader or None if the frame is too short
+    """
+    if len(data) < 14:
+        return None
+    ethertype = int.from_bytes(data[12:14], byteorder="big")
+    vid = None
+    pcp = None
+    if ethertype in VLAN_ETHERTYPES and len(data) >= 18:
+        tci = int.from_bytes(data[14:16], byteorder="big")
+        pcp = tci >> 13
+        vid = tci & 0x0fff
+        ethertype = int.from_bytes(data[16:18], byteorder="big")
+    return EthernetHeader(bytes(data[0:6]), bytes(data[6:12]), vid, pcp, ethertype)
+
+def format_mac(address):
+    """Returns a MAC address as colon separated hex bytes"""
+    return ":".join(f"{b:02x}" for b in address)
@@ -0,0 +1,152 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Transaction filter expressions
+#
+# A filter is a list of alternatives separated by '|', an alternative is a
+# list of whitespace separated terms which must all match. A term is negated
+# by a leading '!'.
+#
+#   control, data        transaction kind
+#   read, write          control read/write transaction
+#   mms=<range>          control transaction memory map selector
+#   addr=<range>         control transaction register address
+#   len=<range>          control transaction length field
+#   exst, hdrb, sync,    footer flags of a data transaction
+#   fd, rtsa, rtsp
+#   rca=<range>, txc=<range>
+#                        footer fields of a data transaction
+#   dv, sv, ev           data valid, start valid or end valid flag set in the
+#                        TX header or the RX footer, tx.<flag> or rx.<flag>
+#                        selects one direction
+#   parity_error         header or footer with invalid parity, also matches
+#                        transactions dropped after a header parity error
+#
+# A range is a number, '<low>-<high>' or a comma separated list of both,
+# numbers are decimal or prefixed hexadecimal (0x).
+#
+# Example:
+#   write mms=0 addr=0x4 | exst | parity_error
+from tc6 import parity_ok
+
+class FilterError(ValueError):
+    pass
+
+FOOTER_FLAGS = ("exst", "hdrb", "sync", "fd", "rtsa", "rtsp")
+FOOTER_FIELDS = ("rca", "txc", "vs", "swo", "ebo")
+CONTROL_FIELDS = ("mms", "addr", "len")
+CHUNK_FLAGS = ("dv", "sv", "ev")
+
+def parse_range(text):
+    """Parses a range into a list of (low, high) tuples"""
+    ranges = []
+    try:
+        for part in text.split(","):
+            low, separator, high = part.partition("-")
+            if separator and not high:
+                raise ValueError()
+            low = int(low, 0)
+            high = int(high, 0) if separator else low
+            if low < 0 or high < 0:
+                raise ValueError()
+            ranges.append((low, high))
+    except ValueError:
+        raise FilterError(f"invalid range '{text}'")
+    return ranges
+
+def in_ranges(value, ranges):
+    for low, high in ranges:
+        if low <= value <= high:
+            return True
+    return False
+
+def compile_term(term):
+    """Compiles one term into a predicate(header, footer, header_word, footer_word)
+
+    footer and footer_word are None for control transactions and for data
+    transactions dropped before the footer, the transaction kind is taken
+    from the DNC bit of the header.
+    """
+    if term.startswith("!"):
+        predicate = compile_term(term[1:])
+        return lambda h, f, hw, fw: not predicate(h, f, hw, fw)
+
+    name, _, value = term.partition("=")
+    if value:
+        ranges = parse_range(value)
+        if len(ranges) == 1:
+            low, high = ranges[0]
+            if name in CONTROL_FIELDS:
+                return lambda h, f, hw, fw: not h.dnc and low <= getattr(h, name) <= high
+            if name in FOOTER_FIELDS:
+                return lambda h, f, hw, fw: f is not None and low <= getattr(f, name) <= high
+        else:
+            if name in CONTROL_FIELDS:
+                return lambda h, f, hw, fw: not h.dnc and in_ranges(getattr(h, name), ranges)
+            if name in FOOTER_FIELDS:
+                return lambda h, f, hw, fw: f is not None and in_ranges(getattr(f, name), ranges)
+        raise FilterError(f"unknown field '{name}'")
+
+    if term == "control":
+        return lambda h, f, hw, fw: not h.dnc
+    if term == "data":
+        return lambda h, f, hw, fw: h.dnc
+    if term == "read":
+        return lambda h, f, hw, fw: not h.dnc and not h.wnr
+    if term == "write":
+        return lambda h, f, hw, fw: not h.dnc and h.wnr
+    if term in FOOTER_FLAGS:
+        return lambda h, f, hw, fw: f is not None and getattr(f, term)
+    if term in CHUNK_FLAGS:
+        return lambda h, f, hw, fw: h.dnc and (getattr(h, term) or (f is not None and getattr(f, term)))
+    direction, _, flag = term.partition(".")
+    if flag in CHUNK_FLAGS:
+        if direction == "tx":
+            return lambda h, f, hw, fw: h.dnc and getattr(h, flag)
+        if direction == "rx":
+            return lambda h, f, hw, fw: f is not None and getattr(f, flag)
+    if term == "parity_error":
+        return lambda h, f, hw, fw: not parity_ok(hw) or (fw is not None and not parity_ok(fw))
+    raise FilterError(f"unknown filter term '{term}'")
+
+def compile_filter(expression):
+    """Compiles a filter expression
+
+    Args:
+        expression: Filter expression, see module description
+
+    Returns:
+        predicate(header, footer, header_word, footer_word) returning True for
+        matching transactions, or None for an empty expression
+
+    Raises:
+        FilterError: Invalid expression
+    """
+    expression = expression or ""
+    alternatives = []
+    for alternative in expression.split("|"):
+        terms = [compile_term(term) for term in alternative.split()]
+        if not terms:
+            if expression.strip():
+                raise FilterError("empty filter alternative")
+            continue
+        if len(terms) == 1:
+            alternatives.append(terms[0])
+        else:
+            alternatives.append(lambda h, f, hw, fw, terms=terms: all(term(h, f, hw, fw) for term in terms))
+    if not alternatives:
+        return None
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return lambda h, f, hw, fw: any(alternative(h, f, hw, fw) for alternative in alternatives)
@@ -0,0 +1,190 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Decoder instrumentation
+#
+# DecoderStats wraps the state handlers and entry points of a Tc6Decoder
+# instance. A decoder without attached stats runs its original methods, so
+# instrumentation costs nothing when it is disabled.
+#
+# Frames are counted when result() or the detector returns them, events held
+# during detection pass result() again when the detector releases them,
+# these nested calls are not counted again. Bytes
+# discarded by the header search are counted in the ERROR state, the bytes
+# of the header found belong to the HEADER state. The search restarts after
+# the header of a dropped transaction, so these bytes are counted again. The decode time of events
+# released at the end of the input or by the stream (detector finish()) is
+# added to the decode time.
+import json
+import time
+from collections import Counter
+from tc6 import Tc6State
+
+# Handlers completing a transaction
+TRANSACTION_TYPES = {
+    Tc6State.CTRL_WRITE_DUMMY_BYTES: "control_write",
+    Tc6State.CTRL_READ_DATA: "control_read",
+    Tc6State.FOOTER: "data",
+}
+
+class DecoderStats():
+    def __init__(self, path=None, interval=None):
+        """Instrumentation counters
+
+        Args:
+            path: JSON file written by dump()
+            interval: Seconds between periodic dumps to path, None to only
+                      dump on request
+        """
+        self.path = path
+        self.interval = interval
+        self.last_dump = time.monotonic()
+
+        self.spi_transfers = 0
+        self.spi_bytes = 0
+        self.decode_ns = 0
+        self.state_bytes = Counter()
+        self.state_calls = Counter()
+        self.state_ns = Counter()
+        self.transactions = Counter()
+        self.frames = Counter()
+        self.released_frames = 0
+        self.events = Counter()
+        # an entry point is running, nested calls are not timed again
+        self.decoding = False
+
+    def attach(self, decoder):
+        """Instruments a decoder instance"""
+        for state, handler in list(decoder.handlers.items()):
+            decoder.handlers[state] = self.wrap_handler(decoder, state, handler)
+        decoder.result = self.wrap_result(decoder, decoder.result)
+        decoder.resync = self.wrap_resync(decoder, decoder.resync)
+        decoder.chip_deselect = self.wrap_chip_deselect(decoder, decoder.chip_deselect)
+        if decoder.detector is not None:
+            decoder.detector.finish = self.wrap_release(decoder.detector.finish)
+
+    def wrap_handler(self, decoder, state, handler):
+        name = state.name
+        transaction_type = TRANSACTION_TYPES.get(state)
+        def instrumented_handler(end_time):
+            consumed = decoder.boundary - decoder.phase_begin
+            start = time.perf_counter_ns()
+            frames = handler(end_time)
+            self.state_ns[name] += time.perf_counter_ns() - start
+            self.state_bytes[name] += consumed
+            self.state_calls[name] += 1
+            if transaction_type and decoder.pos == 0:
+                self.transactions[transaction_type] += 1
+            if self.interval is not None:
+                self.periodic_dump()
+            return frames
+        return instrumented_handler
+
+    def wrap_result(self, decoder, result):
+        def instrumented_result(mosi, miso, start_time, end_time):
+            if decoder.state == Tc6State.CHIP_DESELECT and not decoder.detect_results:
+                self.state_bytes[Tc6State.CHIP_DESELECT.name] += len(mosi)
+            if self.decoding:
+                # passed back or released by the detector
+                return result(mosi, miso, start_time, end_time)
+            self.spi_transfers += 1
+            self.spi_bytes += len(mosi)
+            self.decoding = True
+            start = time.perf_counter_ns()
+            frames = result(mosi, miso, start_time, end_time)
+            self.decode_ns += time.perf_counter_ns() - start
+            self.decoding = False
+            self.count_frames(frames)
+            return frames
+        return instrumented_result
+
+    def wrap_resync(self, decoder, resync):
+        name = Tc6State.ERROR.name
+        header = Tc6State.HEADER.name
+        def instrumented_resync(mosi, miso, offset, start_time, end_time, frames):
+            window = decoder.pos
+            header_ns = self.state_ns[header]
+            start = time.perf_counter_ns()
+            end = resync(mosi, miso, offset, start_time, end_time, frames)
+            # the header handler times itself
+            self.state_ns[name] += time.perf_counter_ns() - start - (self.state_ns[header] - header_ns)
+            # bytes moved out of the search window, or the window grew
+            kept = 4 if decoder.state != Tc6State.ERROR or decoder.pos == 0 else decoder.pos
+            self.state_bytes[name] += end - offset - (kept - window)
+            self.state_calls[name] += 1
+            return end
+        return instrumented_resync
+
+    def wrap_chip_deselect(self, decoder, chip_deselect):
+        def instrumented_chip_deselect(start_time):
+            if decoder.state not in (Tc6State.CHIP_DESELECT, Tc6State.ERROR) and decoder.pos > 0:
+                # chip select deasserted in the middle of a transaction
+                self.state_bytes[decoder.state.name] += decoder.pos - decoder.phase_begin
+                self.event("incomplete_transaction")
+            return chip_deselect(start_time)
+        return instrumented_chip_deselect
+
+    def wrap_release(self, finish):
+        def instrumented_finish():
+            if self.decoding:
+                frames = finish()
+            else:
+                self.decoding = True
+                start = time.perf_counter_ns()
+                frames = finish()
+                self.decode_ns += time.perf_counter_ns() - start
+                self.decoding = False
+                self.count_frames(frames)
+            self.released_frames += len(frames)
+            return frames
+        return instrumented_finish
+
+    def count_frames(self, frames):
+        if frames:
+            for frame in frames if isinstance(frames, list) else (frames,):
+                self.frames[frame.type] += 1
+
+    def event(self, name):
+        """Counts a resynchronization, error or decoder parameter event"""
+        self.events[name] += 1
+
+    def summary(self):
+        """Returns all counters as dict"""
+        states = {}
+        for name in sorted(set(self.state_bytes) | set(self.state_calls)):
+            states[name] = {
+                "bytes": self.state_bytes[name],
+                "calls": self.state_calls[name],
+                "seconds": self.state_ns[name] / 1e9,
+            }
+        return {
+            "spi_transfers": self.spi_transfers,
+            "spi_bytes": self.spi_bytes,
+            "decode_seconds": self.decode_ns / 1e9,
+            "states": states,
+            "transactions": dict(self.transactions),
+            "frames": dict(self.frames),
+            "released_frames": self.released_frames,
+            "events": dict(self.events),
+        }
+
+    def dump(self, path=None):
+        """Writes the summary as JSON"""
+        with open(path or self.path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        self.last_dump = time.monotonic()
+
+    def periodic_dump(self):
+        if time.monotonic() - self.last_dump >= self.interval:
+            self.dump()
@@ -0,0 +1,242 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Link throughput and flow control statistics
+#
+# Transactions are accumulated into consecutive time windows of fixed length
+# (aligned to multiples of the window length). Every window only holds
+# counters, a window is summarized and reset when the first transaction of a
+# later window arrives. Windows without traffic are skipped, unless the
+# MAC-PHY is starving the host of transmit credits: the windows of such a
+# gap are summarized together, one summary spans the whole gap.
+#
+# Times are float seconds, the decoder converts the GraphTime of Logic with
+# its CaptureClock (see tc6_clock.py), window_start and window_end of the
+# summary are seconds of the same clock.
+#
+# Summary fields:
+#   chunks, tx_chunks, rx_chunks, idle_chunks
+#                        data chunks, chunks with TX/RX data valid, chunks
+#                        without data in both directions
+#   control_transactions control transactions
+#   spi_bytes            bytes transferred on SPI
+#   tx_bytes, rx_bytes   Ethernet frame bytes carried in the chunks
+#   tx_efficiency, rx_efficiency
+#                        frame bytes per chunk payload byte (percent)
+#   payload_efficiency   frame bytes of both directions per SPI byte in both
+#                        directions (percent)
+#   tx_goodput, rx_goodput
+#                        frame bytes per second of the window (bit/s)
+#   starvation_time, starvation_count
+#                        time and number of intervals in which the MAC-PHY
+#                        had no transmit credits (TXC 0) while the host had
+#                        a frame to send
+#   rca_max, rca_mean    receive chunks available (RX backlog)
+#   exst, rtsa, rtsp     footers with the flag set
+import math
+
+DEFAULT_WINDOW = 0.01
+
+SUMMARY_FIELDS = (
+    "window_start", "window_end", "chunks", "tx_chunks", "rx_chunks", "idle_chunks", "control_transactions",
+    "spi_bytes", "tx_bytes", "rx_bytes", "tx_efficiency", "rx_efficiency", "payload_efficiency",
+    "tx_goodput", "rx_goodput", "starvation_time", "starvation_count", "rca_max", "rca_mean",
+    "exst", "rtsa", "rtsp",
+)
+
+def frame_bytes(dv, sv, swo, ev, ebo, chunk_size):
+    """Returns the number of Ethernet frame bytes in a chunk"""
+    if not dv:
+        return 0
+    start = swo * 4
+    if sv and ev:
+        if ebo >= start:
+            return ebo + 1 - start
+        # end of one frame and start of the next
+        return ebo + 1 + chunk_size - start
+    if sv:
+        return chunk_size - start
+    if ev:
+        return ebo + 1
+    return chunk_size
+
+class LinkStats():
+    def __init__(self, window=DEFAULT_WINDOW, sink=None):
+        """Link statistics initialization
+
+        Args:
+            window: Window length in seconds
+            sink: Called with the summary of every closed window
+        """
+        self.window = window
+        self.sink = sink
+        self.index = None
+        self.tx_in_frame = False
+        self.starvation_start = None
+        self.reset()
+
+    def reset(self):
+        self.chunks = 0
+        self.tx_chunks = 0
+        self.rx_chunks = 0
+        self.idle_chunks = 0
+        self.control_transactions = 0
+        self.spi_bytes = 0
+        self.payload_bytes = 0
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self.starvation_time = 0.0
+        self.starvation_count = 0
+        self.rca_max = 0
+        self.rca_sum = 0
+        self.exst = 0
+        self.rtsa = 0
+        self.rtsp = 0
+
+    def advance(self, time):
+        """Closes the windows ending before time
+
+        Returns:
+            List of summaries of the closed windows
+        """
+        index = math.floor(time / self.window)
+        if self.index is None:
+            self.index = index
+        summaries = []
+        if self.index < index:
+            summaries.append(self.close())
+        if self.index < index:
+            if self.starvation_start is not None:
+                # windows without traffic during starvation
+                summaries.append(self.close(index - self.index))
+            else:
+                # windows without traffic are skipped
+                self.index = index
+        return summaries
+
+    def close(self, count=1):
+        """Summarizes the current window and resets the counters
+
+        Args:
+            count: Number of consecutive windows summarized together
+        """
+        start = self.index * self.window
+        length = self.window * count
+        end = start + length
+        if self.starvation_start is not None:
+            self.starvation_time += end - self.starvation_start
+            self.starvation_start = end
+        payload = self.payload_bytes or 1
+        summary = {
+            "window_start": start,
+            "window_end": end,
+            "chunks": self.chunks,
+            "tx_chunks": self.tx_chunks,
+            "rx_chunks": self.rx_chunks,
+            "idle_chunks": self.idle_chunks,
+            "control_transactions": self.control_transactions,
+            "spi_bytes": self.spi_bytes,
+            "tx_bytes": self.tx_bytes,
+            "rx_bytes": self.rx_bytes,
+            "tx_efficiency": round(self.tx_bytes * 100 / payload, 1),
+            "rx_efficiency": round(self.rx_bytes * 100 / payload, 1),
+            "payload_efficiency": round((self.tx_bytes + self.rx_bytes) * 50 / (self.spi_bytes or 1), 1),
+            "tx_goodput": round(self.tx_bytes * 8 / length),
+            "rx_goodput": round(self.rx_bytes * 8 / length),
+            "starvation_time": self.starvation_time,
+            "starvation_count": self.starvation_count,
+            "rca_max": self.rca_max,
+            "rca_mean": round(self.rca_sum / self.chunks, 2) if self.chunks else 0.0,
+            "exst": self.exst,
+            "rtsa": self.rtsa,
+            "rtsp": self.rtsp,
+        }
+        self.index += count
+        self.reset()
+        if self.sink:
+            self.sink(summary)
+        return summary
+
+    def control(self, start_time, spi_bytes):
+        """Adds a control transaction
+
+        Returns:
+            List of summaries of the closed windows
+        """
+        summaries = self.advance(start_time)
+        self.control_transactions += 1
+        self.spi_bytes += spi_bytes
+        return summaries
+
+    def chunk(self, header, footer, chunk_size, start_time, end_time):
+        """Adds a data chunk transaction
+
+        Args:
+            header: Tc6TransmitDataHeader
+            footer: Tc6DataFooter
+            chunk_size: Block payload size
+            start_time: Start time of the transaction
+            end_time: End time of the transaction
+
+        Returns:
+            List of summaries of the closed windows
+        """
+        summaries = self.advance(start_time)
+        h = header
+        f = footer
+        self.chunks += 1
+        self.spi_bytes += chunk_size + 4
+        self.payload_bytes += chunk_size
+        if h.dv:
+            self.tx_chunks += 1
+            self.tx_bytes += frame_bytes(True, h.sv, h.swo, h.ev, h.ebo, chunk_size)
+            if h.sv and (not h.ev or h.ebo < h.swo * 4):
+                self.tx_in_frame = True
+            elif h.ev:
+                self.tx_in_frame = False
+        if f.dv:
+            self.rx_chunks += 1
+            self.rx_bytes += frame_bytes(True, f.sv, f.swo, f.ev, f.ebo, chunk_size)
+        elif not h.dv:
+            self.idle_chunks += 1
+        self.rca_max = max(self.rca_max, f.rca)
+        self.rca_sum += f.rca
+        self.exst += f.exst
+        self.rtsa += f.rtsa
+        self.rtsp += f.rtsp
+
+        starved = f.txc == 0 and (h.dv or self.tx_in_frame)
+        if starved and self.starvation_start is None:
+            self.starvation_start = end_time
+            self.starvation_count += 1
+        elif not starved and self.starvation_start is not None:
+            self.starvation_time += end_time - self.starvation_start
+            self.starvation_start = None
+        return summaries
+
+    def state(self):
+        """Returns the counters and the current window as picklable dict"""
+        state = dict(vars(self))
+        del state["sink"]
+        return state
+
+    def restore(self, state):
+        """Continues the window of a state()"""
+        vars(self).update(state)
+
+    def flush(self):
+        """Closes the current window, call at the end of the capture"""
+        if self.index is None:
+            return []
+        return [self.close()]
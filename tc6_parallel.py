@@ -0,0 +1,337 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Parallel offline decoding
+#
+# A capture is split at chip select deassertions into segments which are
+# read and decoded once each on a process pool. Transactions are
+# independent, the state carried across segments is handled as follows:
+#
+# - Block payload size and control data protection: every segment detects
+#   the settings from its own traffic (see tc6_detect.py), the first one from
+#   the start of the capture like the sequential decoder. A segment records
+#   the value of each setting used by its transactions before a CONFIG0
+#   write set it, and the value of the first CONFIG0 write.
+# - Ethernet frames in transfer at the start of a segment: the chunks up to
+#   the first frame start are returned as markers and fed into the frame
+#   state of the previous segment when the segments are merged.
+# - Register shadow and transaction store: the change logs and transactions
+#   of the segments are concatenated.
+#
+# Segments are merged in capture order. A segment that used a setting
+# different from the end of the previous segment, or whose first CONFIG0
+# write changed the settings without changing CONFIG0, is decoded again with
+# the state of the previous segment, so the output is identical to the
+# sequential decoder. Settings a segment did not use are carried over from
+# the previous segment. Workers return the frames as columns (types, time
+# arrays, data), which pickle in a fraction of the time of Frame tuples.
+#
+# Example:
+#   decoder = ParallelDecoder(("auto-detect", "auto-detect", "transactions", ""), jobs=8)
+#   for frame in decoder.decode(csv_segments("capture.csv", decoder.segments)):
+#       ...
+import os
+from array import array
+from collections import namedtuple
+from itertools import chain
+from multiprocessing import Pool
+from tc6_capture import binary_paths, read_binary, read_csv, split_binary, split_csv
+from tc6_decoder import Frame, Tc6Decoder, create_ethernet_frame
+from tc6_detect import DNC_BYTE_MASK
+from tc6_ethernet import EthernetFrameAssembler
+from tc6_registers import CONFIG0, RegisterLog, RegisterShadow
+from tc6_store import TransactionStore
+
+SEGMENTS_PER_JOB = 4
+
+# Decoding parameters at a segment boundary, config0_time is the time of the
+# last change of the CONFIG0 value
+SegmentStart = namedtuple('SegmentStart', ['chunk_size', 'ctrl_rw_data_protection', 'config0', 'config0_time'])
+
+# used: {setting: value} of the settings used before CONFIG0 set them,
+# configured: settings set by a CONFIG0 write, config0: (value, changed,
+# first log, end log) of the first CONFIG0 write, see SegmentDecoder,
+# undecided: detection was still active at the end of the segment
+SegmentResult = namedtuple('SegmentResult', ['index', 'count', 'end', 'undecided', 'used', 'configured', 'config0', 'frames', 'logs', 'registers', 'ethernet', 'store'])
+
+def csv_segments(path, count):
+    """Returns the segment specifications of a CSV export"""
+    return [("csv", path, start, end) for start, end in split_csv(path, count)]
+
+def binary_segments(directory, count, clk=0, mosi=1, miso=2, cs=3, cpol=0, cpha=0):
+    """Returns the segment specifications of a binary export directory"""
+    paths = binary_paths(directory, clk, mosi, miso, cs)
+    return [("binary", paths, cpol, cpha, start, end) for start, end in split_binary(paths[3], count)]
+
+def read_segment(spec):
+    if spec[0] == "csv":
+        _, path, start, end = spec
+        return read_csv(path, start, end)
+    _, paths, cpol, cpha, start_time, end_time = spec
+    return read_binary(*paths, cpol, cpha, start_time, end_time)
+
+def frame_columns(frames):
+    """Returns frames as (types, start times, end times, data) columns"""
+    types = []
+    start_times = array("d")
+    end_times = array("d")
+    data = []
+    for frame in frames:
+        types.append(frame.type)
+        start_times.append(frame.start_time)
+        end_times.append(frame.end_time)
+        data.append(frame.data)
+    return types, start_times, end_times, data
+
+def create_chunk_marker(direction, data, flags, start_time, end_time, emit=True):
+    return Frame('ethernet_chunk', start_time, end_time, {'direction': direction, 'chunk': (data, *flags, start_time, end_time), 'emit': emit})
+
+class SegmentDecoder(Tc6Decoder):
+    """Decoder of one segment
+
+    Data chunks of each direction up to the first frame start are emitted as
+    markers, they may end a frame started in the previous segment. The
+    settings used before a CONFIG0 write set them are recorded for the merge.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logs = []
+        self.log = self.logs.append
+        self.head = {"TX": False, "RX": False}
+        self.used = {}
+        self.configured = set()
+        self.config0 = None
+
+    def quiet_detection(self):
+        """Drops the messages of detection, the sequential decoder does not
+        detect the settings again at the start of the segment"""
+        def log(message):
+            if not self.detector.active:
+                self.logs.append(message)
+        self.log = log
+
+    def use(self, setting, value):
+        if setting not in self.configured and setting not in self.used:
+            self.used[setting] = value
+
+    def decode_header(self, end_time):
+        if self.txbuf[0] & DNC_BYTE_MASK:
+            self.use("chunk_size", self.chunk_size)
+        else:
+            self.use("protection", self.ctrl_rw_data_protection)
+        return super().decode_header(end_time)
+
+    def check_transaction_parameter_change(self):
+        settings = (self.chunk_size, self.ctrl_rw_data_protection)
+        logs = len(self.logs)
+        super().check_transaction_parameter_change()
+        if self.config0 is None:
+            # the CONFIG0 value before the segment is only known when merging
+            changed = (self.chunk_size, self.ctrl_rw_data_protection) != settings
+            self.config0 = (self.registers.value(CONFIG0), changed, logs, len(self.logs))
+        if self.auto_ctrl_rw_data_protection:
+            self.configured.add("protection")
+        if self.auto_chunk_size and self.registers.value(CONFIG0) & 0x7 in (0b101, 0b110):
+            self.configured.add("chunk_size")
+
+    def end_transaction(self, frames):
+        if self.transaction_filter is not None and self.pending and not self.transaction_matches():
+            # markers of a filtered transaction still continue the frames of
+            # the previous segment, only the completed frames are not emitted
+            for factory, args in self.pending:
+                if factory is create_chunk_marker:
+                    frames.append(create_chunk_marker(*args, emit=False))
+        return super().end_transaction(frames)
+
+    def reassemble_ethernet_frames(self, txdata, end_time):
+        h = self.header
+        f = self.footer
+        frames = []
+        directions = (
+            ("TX", self.tx_frames, txdata, (h.dv, h.sv, h.swo, h.ev, h.ebo, False)),
+            ("RX", self.rx_frames, self.rxdata, (f.dv, f.sv, f.swo, f.ev, f.ebo, f.fd)),
+        )
+        for direction, assembler, data, flags in directions:
+            if self.head[direction] and flags[0]:
+                self.emit(frames, create_chunk_marker, direction, bytes(data), flags, self.transaction_start, end_time)
+                self.head[direction] = not flags[1]
+            for frame in assembler.chunk(data, *flags, self.transaction_start, end_time):
+                self.emit(frames, create_ethernet_frame, direction, frame)
+        return frames
+
+def decode_segment(task):
+    """Decodes one segment, or consecutive segments as one
+
+    Args:
+        task: (index, specs, settings, start, store) with the list of
+              segments starting at index, the analyzer settings, the
+              SegmentStart of the segment or None to detect the settings and
+              whether to record the transactions in a TransactionStore
+
+    Returns:
+        SegmentResult
+    """
+    index, specs, settings, start, store = task
+    decoder = SegmentDecoder.from_settings(*settings)
+    if store:
+        decoder.store = TransactionStore()
+    if start is not None:
+        if decoder.detector is not None:
+            decoder.detector.stop()
+        decoder.chunk_size = start.chunk_size
+        decoder.ctrl_rw_data_protection = start.ctrl_rw_data_protection
+        if start.config0 is not None:
+            decoder.registers.apply(*CONFIG0, [start.config0], start.config0_time)
+    elif index > 0 and decoder.detector is not None:
+        decoder.quiet_detection()
+    if index > 0:
+        # segments start after a chip select deassertion
+        decoder.disable(None)
+        if decoder.trace_ethernet:
+            decoder.head = {"TX": True, "RX": True}
+
+    frames = list(decoder.feed(chain.from_iterable(map(read_segment, specs)), end=False))
+    undecided = decoder.detector is not None and decoder.detector.active
+    if decoder.detector is not None:
+        frames += decoder.detector.end()
+
+    registers = decoder.registers.state()
+    ethernet = {}
+    if decoder.trace_ethernet:
+        ethernet["TX"] = (decoder.tx_frames.state(), not decoder.head["TX"])
+        ethernet["RX"] = (decoder.rx_frames.state(), not decoder.head["RX"])
+    end = (decoder.chunk_size, decoder.ctrl_rw_data_protection)
+    return SegmentResult(index, len(specs), end, undecided, decoder.used, decoder.configured, decoder.config0, frame_columns(frames),
+                         decoder.logs, registers, ethernet, decoder.store)
+
+def replay_chunk(assembler, chunk):
+    """Feeds a chunk marker into the frame state of the previous segment"""
+    data, dv, sv, swo, ev, ebo, fd, start_time, end_time = chunk
+    if not sv:
+        return assembler.chunk(*chunk)
+    # the segment decoded the frame starting in this chunk, only the end of
+    # the frame in transfer is missing
+    if assembler.in_frame and fd:
+        assembler.dropped = True
+    if assembler.in_frame and ev and ebo < swo * 4:
+        assembler.append(data[:ebo + 1])
+        return [assembler.complete(end_time)]
+    return []
+
+class ParallelDecoder():
+    def __init__(self, settings, jobs=None, segments=None, store=None):
+        """Parallel decoder initialization
+
+        Args:
+            settings: (block_payload_size, control_data_protection, trace,
+                      filter, register_map) setting strings of
+                      Tc6Decoder.from_settings()
+            jobs: Number of worker processes, default one per CPU
+            segments: Number of segments a capture is split into
+            store: TransactionStore receiving the transactions of all segments
+        """
+        if settings[2] == "link":
+            # windows and credit starvation span segment boundaries
+            raise ValueError("the link trace is not supported by the parallel decoder")
+        self.settings = tuple(settings)
+        self.jobs = jobs or os.cpu_count()
+        self.segments = segments or self.jobs * SEGMENTS_PER_JOB
+        self.registers = RegisterShadow()
+        self.store = store
+        self.log = print
+        self.redecoded_segments = 0
+
+    def segment_start(self, chunk_size, ctrl_rw_data_protection):
+        """Returns the SegmentStart after the segments merged so far"""
+        changes = self.registers.changes(CONFIG0)
+        config0_time, config0 = changes[-1] if changes else (None, None)
+        return SegmentStart(chunk_size, ctrl_rw_data_protection, config0, config0_time)
+
+    def continues(self, result, start):
+        """Checks that a segment decoded with detected settings continues the
+        previous segments like the sequential decoder"""
+        expected = {"chunk_size": start.chunk_size, "protection": start.ctrl_rw_data_protection}
+        if any(expected[setting] != value for setting, value in result.used.items()):
+            return False
+        # the sequential decoder only applies a CONFIG0 write that changes
+        # the register value
+        return result.config0 is None or not result.config0[1] or result.config0[0] != start.config0
+
+    def merge_registers(self, registers):
+        for key, (times, values) in registers.items():
+            log = self.registers.logs.get(key)
+            if log is None:
+                log = self.registers.logs[key] = RegisterLog()
+            for time, value in zip(times, values):
+                if log.last() != value:
+                    log.append(time, value)
+
+    def decode(self, specs):
+        """Decodes the segments of a capture
+
+        Args:
+            specs: Segments from csv_segments() or binary_segments()
+
+        Yields:
+            Decoded frames in the order of the sequential decoder
+        """
+        assemblers = {"TX": EthernetFrameAssembler(), "RX": EthernetFrameAssembler()}
+        with Pool(self.jobs) as pool:
+            record = self.store is not None
+            tasks = [(i, [spec], self.settings, None, record) for i, spec in enumerate(specs)]
+            end = None
+            merged = 0
+            for result in pool.imap(decode_segment, tasks):
+                if result.index < merged:
+                    # decoded with an earlier segment
+                    continue
+                index = result.index
+                start = self.segment_start(*end) if end is not None else None
+                if start is not None and (result.undecided or not self.continues(result, start)):
+                    self.redecoded_segments += 1
+                    result = decode_segment((index, [specs[index]], self.settings, start, record))
+                while result.undecided and index + result.count < len(specs):
+                    # detection needs the events of the next segment
+                    self.redecoded_segments += 1
+                    result = decode_segment((index, specs[index:index + result.count + 1], self.settings, start, record))
+                merged = index + result.count
+                logs = result.logs
+                if start is not None:
+                    if result.config0 is not None and result.config0[0] == start.config0:
+                        # CONFIG0 written again with its value
+                        _, _, first, last = result.config0
+                        logs = logs[:first] + logs[last:]
+                    # settings not used by the segment are carried over
+                    end = tuple(value if setting in result.used or setting in result.configured else previous
+                                for setting, value, previous in zip(("chunk_size", "protection"), result.end, end))
+                else:
+                    end = result.end
+
+                for message in logs:
+                    self.log(message)
+                self.merge_registers(result.registers)
+                if record:
+                    self.store.extend(result.store)
+                for frame in map(Frame, *result.frames):
+                    if frame.type == 'ethernet_chunk':
+                        direction = frame.data['direction']
+                        ethernet_frames = replay_chunk(assemblers[direction], frame.data['chunk'])
+                        if frame.data['emit']:
+                            for ethernet_frame in ethernet_frames:
+                                yield create_ethernet_frame(direction, ethernet_frame)
+                    else:
+                        yield frame
+                for direction, (state, started) in result.ethernet.items():
+                    if started:
+                        assemblers[direction].restore(state)
@@ -0,0 +1,260 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# PCAPNG export of the Ethernet traffic
+#
+# The TX and RX Ethernet frames are reassembled from the data chunks (see
+# tc6_ethernet.py) independent of the trace and written to a PCAPNG file for
+# Wireshark:
+#   - one section with two Ethernet interfaces, 0 for TX (host to MAC-PHY,
+#     outbound) and 1 for RX (MAC-PHY to host, inbound)
+#   - one Enhanced Packet Block per frame with nanosecond timestamps, the
+#     capture time of the end of the last chunk of the frame plus epoch. The
+#     decoder passes float seconds from its CaptureClock (see tc6_clock.py),
+#     in Logic seconds since the first transaction seen
+#   - frames dropped by the MAC-PHY (FD footer) carry the comment
+#     DROP_COMMENT, e.g. Wireshark filter: frame.comment contains "FD"
+#
+# The decoder only appends frames to a batch. Full batches are passed through
+# a bounded queue to a writer thread that encodes and writes them, so file I/O
+# runs while decoding continues. Decoding only waits if queue_size batches
+# are waiting for the disk. With flush_interval, the writer thread takes the
+# partial batch itself when no batch arrived for the interval, so frames
+# reach the file while the decoder gets no new events (e.g. Logic between
+# captures). An exception of the writer thread is raised by the next flush()
+# or close(), after which batches are discarded.
+#
+# Example:
+#   decoder.pcapng = PcapngWriter("capture.pcapng")
+#   ...
+#   decoder.pcapng.close()
+import queue
+import struct
+import threading
+from tc6_ethernet import EthernetFrameAssembler
+
+BATCH_SIZE = 256
+DEFAULT_QUEUE_SIZE = 64
+# seconds between checks that the writer thread is still running while the
+# queue is full
+PUT_TIMEOUT = 0.5
+
+TX_INTERFACE = 0
+RX_INTERFACE = 1
+LINKTYPE_ETHERNET = 1
+
+BLOCK_SECTION_HEADER = 0x0a0d0d0a
+BLOCK_INTERFACE_DESCRIPTION = 0x00000001
+BLOCK_ENHANCED_PACKET = 0x00000006
+BYTE_ORDER_MAGIC = 0x1a2b3c4d
+
+OPT_END = 0
+OPT_COMMENT = 1
+SHB_USERAPPL = 4
+IF_NAME = 2
+IF_DESCRIPTION = 3
+IF_TSRESOL = 9
+EPB_FLAGS = 2
+
+# epb_flags direction
+EPB_INBOUND = 0x1
+EPB_OUTBOUND = 0x2
+
+DROP_COMMENT = "FD: frame dropped by the MAC-PHY"
+
+def _option(code, value):
+    if isinstance(value, str):
+        value = value.encode()
+    return struct.pack("<HH", code, len(value)) + value + bytes(-len(value) % 4)
+
+def _block(block_type, body):
+    length = 12 + len(body)
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+def section_header():
+    options = _option(SHB_USERAPPL, "OA-TC6 Protocol Analyzer") + _option(OPT_END, b"")
+    # version 1.0, section length unknown
+    return _block(BLOCK_SECTION_HEADER, struct.pack("<IHHq", BYTE_ORDER_MAGIC, 1, 0, -1) + options)
+
+def interface_description(name, description):
+    options = (_option(IF_NAME, name) + _option(IF_DESCRIPTION, description) +
+               _option(IF_TSRESOL, bytes([9])) + _option(OPT_END, b""))
+    return _block(BLOCK_INTERFACE_DESCRIPTION, struct.pack("<HHI", LINKTYPE_ETHERNET, 0, 0) + options)
+
+INTERFACES = (
+    interface_description("tc6-tx", "TC6 TX (host to MAC-PHY)"),
+    interface_description("tc6-rx", "TC6 RX (MAC-PHY to host)"),
+)
+
+FLAG_OPTIONS = {
+    TX_INTERFACE: _option(EPB_FLAGS, struct.pack("<I", EPB_OUTBOUND)),
+    RX_INTERFACE: _option(EPB_FLAGS, struct.pack("<I", EPB_INBOUND)),
+}
+DROP_OPTION = _option(OPT_COMMENT, DROP_COMMENT)
+END_OPTION = _option(OPT_END, b"")
+
+def enhanced_packet(interface, frame, epoch=0.0):
+    """Returns the Enhanced Packet Block of a reassembled EthernetFrame"""
+    timestamp = round((epoch + frame.end_time) * 1e9)
+    data = frame.data
+    options = FLAG_OPTIONS[interface] + (DROP_OPTION if frame.dropped else b"") + END_OPTION
+    body = struct.pack("<IIIII", interface, timestamp >> 32, timestamp & 0xffffffff, len(data), len(data))
+    return _block(BLOCK_ENHANCED_PACKET, body + data + bytes(-len(data) % 4) + options)
+
+class PcapngWriter():
+    def __init__(self, path, queue_size=DEFAULT_QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=None, epoch=0.0):
+        """PCAPNG export initialization, the file is written by a background
+        thread until close()
+
+        Args:
+            path: Output file
+            queue_size: Batches waiting for the writer thread before decoding
+                        waits
+            batch_size: Frames per batch
+            flush_interval: Seconds without a full batch after which the
+                            writer thread writes the partial batch, None to
+                            only write full batches and on close()
+            epoch: Seconds added to the capture times, e.g. the UNIX time of
+                   the start of the capture
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.epoch = epoch
+        # guards the batch, which the writer thread takes on flush_interval
+        self.lock = threading.Lock()
+        self.batch = []
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.frames = 0
+        self.dropped_frames = 0
+        self.tx_frames = EthernetFrameAssembler()
+        self.rx_frames = EthernetFrameAssembler()
+        self.file = open(path, "wb")
+        self.file.write(section_header() + b"".join(INTERFACES))
+        # a valid empty capture until the first batch is written
+        self.file.flush()
+        self.thread = threading.Thread(target=self.run, name="pcapng writer", daemon=True)
+        self.thread.start()
+
+    def chunk(self, header, footer, txdata, rxdata, start_time, end_time):
+        """Adds the payload of a data chunk transaction
+
+        Args:
+            header: Tc6TransmitDataHeader
+            footer: Tc6DataFooter
+            txdata: TX chunk payload
+            rxdata: RX chunk payload
+            start_time: Start time of the transaction
+            end_time: End time of the transaction
+        """
+        h = header
+        f = footer
+        if h.dv:
+            for frame in self.tx_frames.chunk(txdata, True, h.sv, h.swo, h.ev, h.ebo, False, start_time, end_time):
+                self.add(TX_INTERFACE, frame)
+        if f.dv:
+            for frame in self.rx_frames.chunk(rxdata, True, f.sv, f.swo, f.ev, f.ebo, f.fd, start_time, end_time):
+                self.add(RX_INTERFACE, frame)
+
+    def add(self, interface, frame):
+        """Queues an EthernetFrame of TX_INTERFACE or RX_INTERFACE"""
+        self.frames += 1
+        self.dropped_frames += frame.dropped
+        with self.lock:
+            self.batch.append((interface, frame))
+            full = len(self.batch) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Passes the current batch to the writer thread
+
+        Raises:
+            Exception: The writer thread failed to write an earlier batch,
+                       e.g. OSError
+            RuntimeError: The writer thread stopped
+        """
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            # queued under the lock, so the writer thread can not take a
+            # later partial batch before it
+            batch = self.batch
+            self.batch = []
+            if batch and not self.put(batch):
+                raise self.error if self.error is not None else RuntimeError("PCAPNG writer thread stopped")
+
+    def put(self, item):
+        """Queues an item for the writer thread, waits while the queue is full
+
+        Returns:
+            False if the writer thread is no longer running
+        """
+        while self.thread.is_alive():
+            try:
+                self.queue.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def close(self):
+        """Writes the remaining frames and closes the file
+
+        Raises:
+            Exception: Writing the file failed, e.g. OSError
+        """
+        if self.thread is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.put(None)
+            self.thread.join()
+            self.thread = None
+            self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def take_batch(self):
+        """Returns the partial batch of the decoder if no full batch is
+        queued"""
+        with self.lock:
+            if not self.queue.empty():
+                return []
+            batch = self.batch
+            self.batch = []
+            return batch
+
+    def run(self):
+        while True:
+            try:
+                batch = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                batch = self.take_batch()
+                if not batch:
+                    continue
+            if batch is None:
+                return
+            if self.error is not None:
+                # the file is unusable, batches are only consumed
+                continue
+            try:
+                epoch = self.epoch
+                self.file.write(b"".join(enhanced_packet(interface, frame, epoch) for interface, frame in batch))
+                self.file.flush()
+            except Exception as e:
+                # raised by the next flush() or close()
+                self.error = e
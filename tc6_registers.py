@@ -0,0 +1,149 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Register shadow of the MAC-PHY
+#
+# Every word of the decoded control reads and writes is applied to a shadow
+# of the registers. Each register keeps a time ordered log of its value
+# changes, the value at a given time is found by binary search. The times
+# are kept as given, float seconds or the GraphTime of Logic, which can not
+# be stored in an array.
+#
+# Example:
+#   decoder.registers.value_at("STATUS0", 0.25)
+#   decoder.registers.changes("CONFIG0")
+from array import array
+from bisect import bisect_right
+from tc6_regmap import load_register_map
+
+# names of the OA-TC6 standard registers, see tc6_regmap.py
+STANDARD_REGISTERS = load_register_map("oa-tc6").names
+
+CONFIG0 = STANDARD_REGISTERS["CONFIG0"]
+
+class RegisterLog():
+    """Value changes of one register"""
+    __slots__ = ("times", "values")
+
+    def __init__(self):
+        self.times = []
+        self.values = array("L")
+
+    def append(self, time, value):
+        self.times.append(time)
+        self.values.append(value)
+
+    def value_at(self, time):
+        i = bisect_right(self.times, time)
+        return self.values[i - 1] if i else None
+
+    def last(self):
+        return self.values[-1] if self.values else None
+
+class RegisterShadow():
+    def __init__(self, names=STANDARD_REGISTERS):
+        """Register shadow initialization
+
+        Args:
+            names: Dict of register name to (mms, addr), used to look up
+                   registers by name
+        """
+        self.names = names
+        self.keys = {key: name for name, key in names.items()}
+        self.logs = {}
+
+    def key(self, register, addr=None):
+        """Returns the (mms, addr) of a register name or (mms, addr) pair"""
+        if addr is not None:
+            return (register, addr)
+        if isinstance(register, str):
+            try:
+                return self.names[register]
+            except KeyError:
+                raise KeyError(f"unknown register '{register}'")
+        return register
+
+    def apply(self, mms, addr, words, time, increment=True):
+        """Applies the data words of a control read or write
+
+        Only values that differ from the current value of the register are
+        added to its log.
+
+        Args:
+            mms: Memory map selector
+            addr: Address of the first word
+            words: Register values
+            time: Time at which the values are valid
+            increment: Address auto increment, False if AID was set
+
+        Returns:
+            List of (mms, addr) of the changed registers
+        """
+        changed = []
+        for word in words:
+            log = self.logs.get((mms, addr))
+            if log is None:
+                log = self.logs[(mms, addr)] = RegisterLog()
+            if log.last() != word:
+                log.append(time, word)
+                changed.append((mms, addr))
+            if increment:
+                addr = (addr + 1) & 0xffff
+        return changed
+
+    def value(self, register, addr=None):
+        """Returns the last known value of a register or None
+
+        Args:
+            register: Register name or MMS if addr is given
+            addr: Register address
+        """
+        log = self.logs.get(self.key(register, addr))
+        return log.last() if log else None
+
+    def value_at(self, register, time, addr=None):
+        """Returns the value of a register at a time or None if unknown
+
+        Args:
+            register: Register name or (mms, addr)
+            time: Capture time
+            addr: Register address if register is the MMS
+        """
+        log = self.logs.get(self.key(register, addr))
+        return log.value_at(time) if log else None
+
+    def changes(self, register, addr=None):
+        """Returns all changes of a register as list of (time, value)"""
+        log = self.logs.get(self.key(register, addr))
+        return list(zip(log.times, log.values)) if log else []
+
+    def state(self):
+        """Returns the change logs as picklable dict of (mms, addr) to
+        (times, values)"""
+        return {key: (list(log.times), list(log.values)) for key, log in self.logs.items()}
+
+    def restore(self, state):
+        """Replaces the change logs with a state()"""
+        self.logs = {}
+        for key, (times, values) in state.items():
+            log = self.logs[key] = RegisterLog()
+            log.times.extend(times)
+            log.values.extend(values)
+
+    def registers(self):
+        """Returns the (mms, addr) of all registers seen, sorted"""
+        return sorted(self.logs)
+
+    def name(self, mms, addr):
+        return self.keys.get((mms, addr))
@@ -0,0 +1,284 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Register maps of the MAC-PHY
+#
+# A register map is a table of (mms, addr, name, fields) rows, fields being a
+# string of NAME[bit] and NAME[high:low] specifications, most significant
+# first. RegisterMap compiles a table once into a dict of (mms, addr) to
+# Register with the shift and mask of every field, so describing the data of
+# a control transaction is one dict lookup per word. The formatted fields of
+# a register value are interned in a bounded LRU cache, like the decoded
+# headers and footers in tc6.py: single bit fields are listed by name when
+# set, wider fields as NAME=value, e.g. BUFSTS(TXC=16 RCA=3).
+#
+# Built-in maps:
+#   oa-tc6    OPEN Alliance standard registers: MMS 0, Clause 22 PHY
+#             registers mapped to MMS 0 and the PLCA registers in MMS 4
+#   lan865x   oa-tc6 and a subset of the Microchip LAN865x vendor registers
+#
+# Register map files are JSON with the same rows, optionally extending a
+# built-in map:
+#   {"extends": "oa-tc6",
+#    "registers": [{"mms": 1, "addr": "0x0000", "name": "MAC_NCR", "fields": "TXEN[3] RXEN[2]"}]}
+#
+# Maps are loaded once per process with load_register_map() and shared by all
+# decoders, a map file is loaded again when its modification time changed.
+#
+# Example:
+#   regmap = load_register_map("lan865x")
+#   regmap.describe(0, 0x04, b"\x00\x00\x80\x26")
+#   # 'CONFIG0(SYNC RFA=0 TXCTHRESH=0 PROTE CPS=6)'
+import json
+import os
+import re
+from functools import lru_cache
+
+FIELD_CACHE_SIZE = 4096
+REGISTER_MAP_CACHE_SIZE = 32
+DEFAULT_REGISTER_MAP = "oa-tc6"
+
+FIELD_SPEC = re.compile(r"(\w+)\[(\d+)(?::(\d+))?\]")
+
+OA_TC6_REGISTERS = (
+    (0, 0x0000, "IDVER", "MAJVER[7:4] MINVER[3:0]"),
+    (0, 0x0001, "PHYID", "OUI[31:10] MODEL[9:4] REV[3:0]"),
+    (0, 0x0002, "STDCAP", "TXFCSVC[10] IPRAC[9] DPRAC[8] CTC[7] FTSC[6] AIDC[5] SEQC[4] MINBPS[2:0]"),
+    (0, 0x0003, "RESET", "SWRESET[0]"),
+    (0, 0x0004, "CONFIG0", "SYNC[15] TXFCSVE[14] RFA[13:12] TXCTHRESH[11:10] TXCTE[9] RXCTE[8] FTSE[7] FTSS[6] PROTE[5] SEQE[4] CPS[2:0]"),
+    (0, 0x0005, "CONFIG1", ""),
+    (0, 0x0008, "STATUS0", "CDPE[12] TXFCSE[11] TTSCAC[10] TTSCAB[9] TTSCAA[8] PHYINT[7] RESETC[6] HDRE[5] LOFE[4] RXBOE[3] TXBUE[2] TXBOE[1] TXPE[0]"),
+    (0, 0x0009, "STATUS1", ""),
+    (0, 0x000b, "BUFSTS", "TXC[15:8] RCA[7:0]"),
+    (0, 0x000c, "IMASK0", "CDPEM[12] TXFCSEM[11] TTSCACM[10] TTSCABM[9] TTSCAAM[8] PHYINTM[7] RESETCM[6] HDREM[5] LOFEM[4] RXBOEM[3] TXBUEM[2] TXBOEM[1] TXPEM[0]"),
+    (0, 0x000d, "IMASK1", ""),
+    (0, 0x0010, "TTSCAH", ""),
+    (0, 0x0011, "TTSCAL", ""),
+    (0, 0x0012, "TTSCBH", ""),
+    (0, 0x0013, "TTSCBL", ""),
+    (0, 0x0014, "TTSCCH", ""),
+    (0, 0x0015, "TTSCCL", ""),
+    (0, 0xff00, "BASIC_CONTROL", "SW_RESET[15] LOOPBACK[14] SPD_SEL0[13] AUTONEGEN[12] PD[11] ISOLATE[10] RE_AUTONEG[9] DUPLEXMD[8] COLTEST[7] SPD_SEL1[6]"),
+    (0, 0xff01, "BASIC_STATUS", "AUTONEGCMPLT[5] RMTFLTD[4] AUTONEGA[3] LNKSTS[2] JABDET[1] EXTCAPA[0]"),
+    (0, 0xff02, "PHY_ID1", ""),
+    (0, 0xff03, "PHY_ID2", "OUI[15:10] MODEL[9:4] REV[3:0]"),
+    (0, 0xff0d, "MMDCTRL", "FNCTN[15:14] DEVAD[4:0]"),
+    (0, 0xff0e, "MMDAD", ""),
+    (4, 0xca00, "PLCA_IDVER", "MAPID[15:8] MAPVER[7:0]"),
+    (4, 0xca01, "PLCA_CTRL0", "EN[15] RST[14]"),
+    (4, 0xca02, "PLCA_CTRL1", "NCNT[15:8] ID[7:0]"),
+    (4, 0xca03, "PLCA_STS", "PST[15]"),
+    (4, 0xca04, "PLCA_TOTMR", "TOTMR[7:0]"),
+    (4, 0xca05, "PLCA_BURST", "MAXBC[15:8] BTMR[7:0]"),
+)
+
+LAN865X_REGISTERS = (
+    (0, 0x0009, "STATUS1", "SEV[28] TTSCMC[27] TTSCMB[26] TTSCMA[25] TTSCOFC[24] TTSCOFB[23] TTSCOFA[22] BUSER[21] UV18[20] ECC[19] FSMSTER[17] TXNER[1] RXNER[0]"),
+    (1, 0x0000, "MAC_NCR", "TXEN[3] RXEN[2] LBL[1]"),
+    (1, 0x0001, "MAC_NCFGR", ""),
+    (1, 0x0020, "MAC_HRB", ""),
+    (1, 0x0021, "MAC_HRT", ""),
+    (1, 0x0022, "MAC_SAB1", ""),
+    (1, 0x0023, "MAC_SAT1", ""),
+    (1, 0x0024, "MAC_SAB2", ""),
+    (1, 0x0025, "MAC_SAT2", ""),
+    (1, 0x0026, "MAC_SAB3", ""),
+    (1, 0x0027, "MAC_SAT3", ""),
+    (1, 0x0028, "MAC_SAB4", ""),
+    (1, 0x0029, "MAC_SAT4", ""),
+)
+
+REGISTER_MAPS = {
+    "oa-tc6": OA_TC6_REGISTERS,
+    "lan865x": OA_TC6_REGISTERS + LAN865X_REGISTERS,
+}
+
+class RegisterMapError(ValueError):
+    """Unknown register map or invalid register map file"""
+
+class RegisterField():
+    __slots__ = ("name", "shift", "mask", "flag", "width")
+
+    def __init__(self, name, high, low):
+        self.name = name
+        self.shift = low
+        self.width = high - low + 1
+        self.mask = (1 << self.width) - 1
+        self.flag = self.width == 1
+
+    def extract(self, value):
+        return (value >> self.shift) & self.mask
+
+    def format(self, value):
+        """Returns the field of a register value as text, None for a single
+        bit field that is not set"""
+        field = (value >> self.shift) & self.mask
+        if self.flag:
+            return self.name if field else None
+        if self.width > 8:
+            return f"{self.name}=0x{field:x}"
+        return f"{self.name}={field}"
+
+def parse_fields(spec):
+    """Returns the RegisterFields of a field specification string
+
+    Raises:
+        RegisterMapError: Invalid specification
+    """
+    fields = []
+    for token in spec.split():
+        m = FIELD_SPEC.fullmatch(token)
+        if not m:
+            raise RegisterMapError(f"invalid register field '{token}'")
+        name, high, low = m.group(1), int(m.group(2)), m.group(3)
+        low = high if low is None else int(low)
+        if low > high or high > 31:
+            raise RegisterMapError(f"invalid register field '{token}'")
+        fields.append(RegisterField(name, high, low))
+    return tuple(fields)
+
+class Register():
+    def __init__(self, mms, addr, name, fields=""):
+        """Register definition
+
+        Args:
+            mms: Memory map selector
+            addr: Register address
+            name: Register name
+            fields: Field specification, e.g. 'SYNC[15] CPS[2:0]'
+        """
+        self.mms = mms
+        self.addr = addr
+        self.name = name
+        self.fields = parse_fields(fields)
+
+    def decode(self, value):
+        """Returns the fields of a register value as dict"""
+        return {field.name: field.extract(value) for field in self.fields}
+
+    def format(self, value):
+        """Returns the register name and the fields of a value as text"""
+        return _format_register(self, value)
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _format_register(register, value):
+    if not register.fields:
+        return register.name
+    fields = (field.format(value) for field in register.fields)
+    return f"{register.name}({' '.join(field for field in fields if field)})"
+
+class RegisterMap():
+    def __init__(self, rows=()):
+        """Register map initialization
+
+        Args:
+            rows: Iterable of (mms, addr, name, fields), later rows replace
+                  earlier rows of the same register
+        """
+        self.registers = {}
+        self.names = {}
+        for row in rows:
+            self.add(Register(*row))
+
+    def add(self, register):
+        old = self.registers.get((register.mms, register.addr))
+        if old is not None:
+            del self.names[old.name]
+        self.registers[(register.mms, register.addr)] = register
+        self.names[register.name] = (register.mms, register.addr)
+
+    def get(self, mms, addr):
+        """Returns the Register at (mms, addr) or None"""
+        return self.registers.get((mms, addr))
+
+    def name(self, mms, addr):
+        register = self.registers.get((mms, addr))
+        return register.name if register else None
+
+    def describe(self, mms, addr, data, increment=True):
+        """Returns the names and fields of the registers of control data
+
+        Args:
+            mms: Memory map selector
+            addr: Address of the first word
+            data: Control data without protection words
+            increment: Address auto increment, False if AID was set
+
+        Returns:
+            Text of the known registers, e.g. 'CONFIG0(SYNC CPS=6)', empty if
+            none is known
+        """
+        registers = self.registers
+        parts = []
+        for i in range(0, len(data) - 3, 4):
+            register = registers.get((mms, addr))
+            if register is not None:
+                parts.append(_format_register(register, int.from_bytes(data[i:i + 4], byteorder="big")))
+            if increment:
+                addr = (addr + 1) & 0xffff
+        return " ".join(parts)
+
+def _parse_int(value):
+    return int(value, 0) if isinstance(value, str) else value
+
+def read_register_map_file(path):
+    """Returns the rows of a JSON register map file
+
+    Raises:
+        RegisterMapError: The file cannot be read or is invalid
+    """
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegisterMapError(f"{path}: {e}") from e
+    if isinstance(document, list):
+        document = {"registers": document}
+    rows = []
+    base = document.get("extends")
+    if base is not None:
+        if base not in REGISTER_MAPS:
+            raise RegisterMapError(f"{path}: unknown register map '{base}'")
+        rows += REGISTER_MAPS[base]
+    for entry in document.get("registers", []):
+        try:
+            rows.append((_parse_int(entry["mms"]), _parse_int(entry["addr"]), entry["name"], entry.get("fields", "")))
+        except (KeyError, TypeError, ValueError) as e:
+            raise RegisterMapError(f"{path}: invalid register {entry!r}") from e
+    return rows
+
+def load_register_map(source=DEFAULT_REGISTER_MAP):
+    """Returns the RegisterMap of a built-in map name or a JSON file, every
+    map is only built once per process, a file again when it was modified
+
+    Raises:
+        RegisterMapError: Unknown map, the file cannot be read or is invalid
+    """
+    mtime = None
+    if source not in REGISTER_MAPS:
+        try:
+            mtime = os.stat(source).st_mtime_ns
+        except OSError:
+            pass
+    return _load_register_map(source, mtime)
+
+# the modification time of a file is part of the key, the maps of earlier
+# versions of a file are evicted
+@lru_cache(maxsize=REGISTER_MAP_CACHE_SIZE)
+def _load_register_map(source, mtime):
+    if source in REGISTER_MAPS:
+        return RegisterMap(REGISTER_MAPS[source])
+    if not os.path.isfile(source):
+        raise RegisterMapError(f"unknown register map '{source}' (built-in maps: {', '.join(REGISTER_MAPS)})")
+    return RegisterMap(read_register_map_file(source))
@@ -0,0 +1,264 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Columnar store of decoded transactions
+#
+# Every column is a typed array with room for a capacity of transactions, all
+# columns and the shared payload buffer double their size when they are full.
+# Control data (without protection words) and the payload of chunks with data
+# valid set are kept in the payload buffer, referenced by offset and length.
+#
+# File format (little endian):
+#   header: magic "TC6STORE", version (u32), reserved (u32), count (u64),
+#           payload size (u64)
+#   columns in the order of COLUMNS, each padded to a multiple of 8 bytes
+#   payload buffer
+#
+# A saved store is loaded by mapping the file into memory, the columns are
+# memoryviews into the mapping, so loading does not depend on the number of
+# transactions. numpy.frombuffer(store.column("header"), numpy.uint32) gives
+# zero copy numpy arrays.
+#
+# Example:
+#   store = TransactionStore.load("capture.tc6")
+#   for i in store.select("write mms=0 addr=0x4"):
+#       print(store.record(i))
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from tc6 import Tc6ControlCommandHeader, Tc6DataFooter, Tc6TransmitDataHeader
+from tc6_filter import compile_filter
+
+STORE_MAGIC = b"TC6STORE"
+STORE_VERSION = 1
+STORE_HEADER = struct.Struct("<8sIIQQ")
+INITIAL_CAPACITY = 1024
+
+CONTROL_READ = 0
+CONTROL_WRITE = 1
+DATA = 2
+
+# Column name and array type code
+COLUMNS = (
+    ("start_time", "d"),
+    ("end_time", "d"),
+    ("tx_offset", "Q"),
+    ("rx_offset", "Q"),
+    ("header", "I"),
+    ("footer", "I"),
+    ("addr", "H"),
+    ("tx_length", "H"),
+    ("rx_length", "H"),
+    ("kind", "B"),
+    ("mms", "B"),
+    ("len", "B"),
+)
+
+Transaction = namedtuple('Transaction', ['kind', 'start_time', 'end_time', 'header', 'footer', 'mms', 'addr', 'len', 'txdata', 'rxdata'])
+
+def _padded(size):
+    return (size + 7) & ~7
+
+class TransactionStore():
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        """Empty store
+
+        Args:
+            capacity: Initial number of transactions
+        """
+        self.count = 0
+        self.capacity = capacity
+        self.columns = {name: array(code, bytes(capacity * array(code).itemsize)) for name, code in COLUMNS}
+        self.payload = bytearray(capacity * 16)
+        self.payload_size = 0
+        self.mapping = None
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        if self.mapping is not None:
+            raise ValueError("a loaded store is read-only")
+        for column in self.columns.values():
+            column.frombytes(bytes(self.capacity * column.itemsize))
+        self.capacity *= 2
+
+    def add_payload(self, data):
+        offset = self.payload_size
+        end = offset + len(data)
+        if end > len(self.payload):
+            size = len(self.payload)
+            while size < end:
+                size *= 2
+            self.payload.extend(bytes(size - len(self.payload)))
+        self.payload[offset:end] = data
+        self.payload_size = end
+        return offset
+
+    def append(self, kind, start_time, end_time, header, footer, mms, addr, length, txdata, rxdata):
+        """Adds a transaction
+
+        Args:
+            kind: CONTROL_READ, CONTROL_WRITE or DATA
+            start_time: Start time of the transaction
+            end_time: End time of the transaction
+            header: Raw header word
+            footer: Raw footer word, 0 for control transactions
+            mms, addr, length: Control header fields, 0 for data transactions
+            txdata: Control write data or TX chunk payload
+            rxdata: Control read data or RX chunk payload
+        """
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        c = self.columns
+        c["start_time"][i] = start_time
+        c["end_time"][i] = end_time
+        c["header"][i] = header
+        c["footer"][i] = footer
+        c["kind"][i] = kind
+        c["mms"][i] = mms
+        c["addr"][i] = addr
+        c["len"][i] = length
+        c["tx_offset"][i] = self.add_payload(txdata)
+        c["tx_length"][i] = len(txdata)
+        c["rx_offset"][i] = self.add_payload(rxdata)
+        c["rx_length"][i] = len(rxdata)
+        self.count = i + 1
+
+    def extend(self, other):
+        """Appends all transactions of another store, column by column"""
+        count = self.count + other.count
+        while count > self.capacity:
+            self.grow()
+        base = self.add_payload(other.payload[:other.payload_size])
+        for name, code in COLUMNS:
+            column = other.column(name)
+            if name in ("tx_offset", "rx_offset"):
+                column = array(code, [offset + base for offset in column])
+            memoryview(self.columns[name])[self.count:count] = column
+        self.count = count
+
+    def column(self, name):
+        """Returns a column as memoryview of len(self) items"""
+        return memoryview(self.columns[name])[:self.count]
+
+    def txdata(self, i):
+        offset = self.columns["tx_offset"][i]
+        return bytes(self.payload[offset:offset + self.columns["tx_length"][i]])
+
+    def rxdata(self, i):
+        offset = self.columns["rx_offset"][i]
+        return bytes(self.payload[offset:offset + self.columns["rx_length"][i]])
+
+    def record(self, i):
+        """Returns transaction i as Transaction"""
+        c = self.columns
+        return Transaction(c["kind"][i], c["start_time"][i], c["end_time"][i], c["header"][i], c["footer"][i],
+                           c["mms"][i], c["addr"][i], c["len"][i], self.txdata(i), self.rxdata(i))
+
+    def time_range(self, start_time=None, end_time=None):
+        """Returns the range of transactions starting within a time range"""
+        times = self.column("start_time")
+        first = 0 if start_time is None else bisect_left(times, start_time)
+        last = self.count if end_time is None else bisect_right(times, end_time)
+        return range(first, last)
+
+    def select(self, expression, start_time=None, end_time=None):
+        """Returns the indices of the transactions matching a filter
+
+        Args:
+            expression: Filter expression, see tc6_filter.py
+            start_time: Only transactions starting at or after this time
+            end_time: Only transactions starting up to this time
+
+        Returns:
+            List of transaction indices
+        """
+        predicate = compile_filter(expression)
+        indices = self.time_range(start_time, end_time)
+        if predicate is None:
+            return list(indices)
+        kinds = self.columns["kind"]
+        headers = self.columns["header"]
+        footers = self.columns["footer"]
+        selected = []
+        for i in indices:
+            hw = headers[i]
+            if kinds[i] == DATA:
+                fw = footers[i]
+                matched = predicate(Tc6TransmitDataHeader.from_bytes(hw), Tc6DataFooter.from_bytes(fw), hw, fw)
+            else:
+                matched = predicate(Tc6ControlCommandHeader.from_bytes(hw), None, hw, None)
+            if matched:
+                selected.append(i)
+        return selected
+
+    def save(self, path):
+        """Writes the store in the binary file format"""
+        with open(path, "wb") as f:
+            f.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, self.count, self.payload_size))
+            for name, code in COLUMNS:
+                column = self.columns[name]
+                if sys.byteorder != "little":
+                    column = array(code, column[:self.count])
+                    column.byteswap()
+                data = memoryview(column)[:self.count].cast("B")
+                f.write(data)
+                f.write(bytes(_padded(len(data)) - len(data)))
+            f.write(memoryview(self.payload)[:self.payload_size])
+
+    @classmethod
+    def load(cls, path):
+        """Maps a saved store into memory, the loaded store is read-only
+
+        Raises:
+            ValueError: Not a store file
+        """
+        if sys.byteorder != "little":
+            raise ValueError("mapping stores requires a little endian host")
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapping) < STORE_HEADER.size:
+            raise ValueError(f"{path}: not a transaction store")
+        magic, version, _, count, payload_size = STORE_HEADER.unpack_from(mapping)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError(f"{path}: not a transaction store (version {STORE_VERSION})")
+        store = cls.__new__(cls)
+        store.mapping = mapping
+        store.count = count
+        store.capacity = count
+        store.columns = {}
+        view = store.view = memoryview(mapping)
+        offset = STORE_HEADER.size
+        for name, code in COLUMNS:
+            size = count * array(code).itemsize
+            store.columns[name] = view[offset:offset + size].cast(code)
+            offset += _padded(size)
+        store.payload = view[offset:offset + payload_size]
+        store.payload_size = payload_size
+        return store
+
+    def close(self):
+        """Releases the mapping of a loaded store"""
+        if self.mapping is not None:
+            for column in self.columns.values():
+                column.release()
+            self.payload.release()
+            self.view.release()
+            self.mapping.close()
+            self.mapping = None
@@ -0,0 +1,533 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Live streaming decode
+#
+# SPI events are read on an asyncio event loop and decoded as they arrive.
+# Sources:
+#   -            rows of a Logic 2 CSV export on stdin
+#   unix:PATH    rows from the connections to a unix socket server
+#   tcp:HOST:PORT
+#                rows from the connections to a TCP server
+#   PATH         rows from a FIFO, or a capture file (CSV export or binary
+#                export directory) replayed at the pace of its timestamps
+#
+# Rows are in the format of the Logic 2 data table export (see tc6_synth.py),
+# an optional header line selects the columns. Connections to a server are
+# decoded one after the other as one stream.
+#
+# The decoded frames, decoder errors and log messages and periodic counters
+# are published to subscribers as StreamMessage(kind, data, received):
+#   frame   Frame, published with the SPI event that completed it
+#   error   (event name, capture time) of a decoder error, e.g.
+#           ('header_parity_error', 1.5), see Error Recovery in README.md
+#   log     decoder log message
+#   stats   dict of the stream counters, every stats_interval seconds
+#   end     end of the input, the last message of a subscription
+# received is the time.monotonic() at which the SPI event was read, the
+# delivery latency of a message is the time it is taken from the queue minus
+# received.
+#
+# While block payload size or control data protection are detected, the
+# detector holds the SPI events (see tc6_detect.py). A live source may not
+# send the transactions that decide detection for a long time, so once
+# events are held for detect_latency seconds the best settings are taken at
+# the next chip select deassertion, and settings that are not distinguished
+# yet are detected with the next transactions using them. Detection that
+# decides at a chip select deassertion is completed there instead of with
+# the next SPI transfer. Frames of held events are published with the
+# received time of the last event of the frame, their delivery latency
+# includes the time the events were held.
+#
+# Every subscription has a bounded queue. Publishing never waits: if a queue
+# is full its oldest message is dropped and counted in Subscription.dropped,
+# so a slow consumer loses messages instead of delaying the decoder and the
+# other subscribers. The input is only read as fast as it is decoded, the
+# transport (pipe buffer, TCP window) holds the producer back. While a burst
+# is decoded the event loop is yielded every INGEST_BATCH events, so
+# subscribers receive the frames while the burst is still being read.
+#
+# Example:
+#   python tc6_stream.py unix:/tmp/tc6.sock --trace ethernet
+#   python tc6_stream.py capture.csv --speed 1
+#
+#   stream = StreamDecoder(Tc6Decoder.from_settings("auto-detect", "auto-detect", "transactions"))
+#   subscription = stream.subscribe(("frame", "error"))
+#   asyncio.create_task(stream.run("tcp:localhost:7400"))
+#   async for message in subscription:
+#       ...
+import argparse
+import asyncio
+import csv
+import os
+import signal
+import stat
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from tc6 import Tc6State
+from tc6_capture import logic2_row_parser, read_binary_dir, read_csv
+from tc6_decoder import Tc6Decoder, RESULT_TYPES, COMPACT_RESULT_TYPES, create_link_stats_frame, format_label
+from tc6_filter import FilterError
+from tc6_regmap import DEFAULT_REGISTER_MAP, RegisterMapError
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_STATS_INTERVAL = 1.0
+DEFAULT_DETECT_LATENCY = 0.1
+INGEST_BATCH = 256
+
+# decoder events that are not errors, the decoder logs the new parameters
+PARAMETER_EVENTS = frozenset(("chunk_size_change", "protection_change", "redetection"))
+
+StreamMessage = namedtuple('StreamMessage', ['kind', 'data', 'received'])
+
+class Subscription():
+    def __init__(self, kinds=None, maxsize=DEFAULT_QUEUE_SIZE):
+        """Subscription initialization
+
+        Args:
+            kinds: Message kinds to receive, None for all. The end message is
+                   always received.
+            maxsize: Number of queued messages before the oldest are dropped
+        """
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.queue = asyncio.Queue(max(1, maxsize))
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, message):
+        if self.kinds is not None and message.kind not in self.kinds and message.kind != "end":
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        message = await self.queue.get()
+        if message.kind == "end":
+            self.closed = True
+            raise StopAsyncIteration
+        return message
+
+    async def batches(self):
+        """Yields lists of all queued messages, waiting for the first one"""
+        while not self.closed:
+            messages = [await self.queue.get()]
+            while not self.queue.empty():
+                messages.append(self.queue.get_nowait())
+            if messages[-1].kind == "end":
+                # nothing is published after the end message
+                self.closed = True
+                messages.pop()
+            if messages:
+                yield messages
+
+async def pipe_lines(pipe):
+    """Returns a StreamReader of a pipe, FIFO or terminal"""
+    reader = asyncio.StreamReader()
+    await asyncio.get_running_loop().connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader
+
+async def file_lines(f):
+    for line in f:
+        yield line
+
+async def paced(events, speed):
+    """Yields SPI events at the pace of their start times
+
+    Args:
+        events: Iterable of SPI events
+        speed: Capture seconds per second, 0 to yield the events as fast as
+               they are decoded
+    """
+    first = None
+    for event in events:
+        if speed > 0 and event[1] is not None:
+            if first is None:
+                first = (event[1], time.monotonic())
+            delay = first[1] + (event[1] - first[0]) / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield event
+
+class StreamDecoder():
+    def __init__(self, decoder, stats_interval=DEFAULT_STATS_INTERVAL, detect_latency=DEFAULT_DETECT_LATENCY):
+        """Streaming decoder initialization
+
+        Args:
+            decoder: Tc6Decoder, its log and stats are published by the stream
+            stats_interval: Seconds between stats messages, None for none
+            detect_latency: Seconds SPI events are held by detection before
+                            the current best settings are taken, None to
+                            wait until detection decides
+        """
+        self.decoder = decoder
+        self.stats_interval = stats_interval
+        self.detect_latency = detect_latency
+        self.subscriptions = []
+        self.connection = asyncio.Lock()
+        self.started = time.monotonic()
+        self.received = self.started
+        self.time = None
+        self.rows = 0
+        self.events = 0
+        self.frames = 0
+        self.errors = Counter()
+        self.ended = False
+        # end times and received times of the events held by detection
+        self.held_times = []
+        self.held_received = []
+        self.detect_timer = None
+        self.detect_expired = False
+        self.deasserted = True
+        # decoder events are counted by the stream and passed on
+        self.stats = decoder.stats
+        decoder.stats = self
+        decoder.log = self.log
+
+    def subscribe(self, kinds=None, maxsize=DEFAULT_QUEUE_SIZE):
+        """Returns a new Subscription, see Subscription()"""
+        subscription = Subscription(kinds, maxsize)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.remove(subscription)
+
+    def publish(self, kind, data, received=None):
+        message = StreamMessage(kind, data, self.received if received is None else received)
+        for subscription in self.subscriptions:
+            subscription.put(message)
+
+    def publish_frames(self, frames):
+        if not frames:
+            return
+        if not isinstance(frames, list):
+            frames = [frames]
+        for frame in frames:
+            self.frames += 1
+            self.publish("frame", frame, self.frame_received(frame))
+
+    def frame_received(self, frame):
+        """Returns the received time of the held event that completed a
+        frame, None for the current event"""
+        if not self.held_times or frame.end_time is None:
+            return None
+        i = bisect_left(self.held_times, frame.end_time)
+        if i == len(self.held_times):
+            return None
+        return self.held_received[i]
+
+    def hold(self, end_time):
+        if end_time is not None:
+            self.held_times.append(end_time)
+            self.held_received.append(self.received)
+
+    def release(self):
+        self.held_times = []
+        self.held_received = []
+        self.detect_expired = False
+
+    def watch_detection(self):
+        """Bounds the time the held events wait for detection"""
+        if self.detect_latency is None or self.detect_timer is not None or not self.held_received:
+            return
+        delay = self.held_received[0] + self.detect_latency - time.monotonic()
+        self.detect_timer = asyncio.get_running_loop().call_later(max(0.0, delay), self.detection_timeout)
+
+    def detection_timeout(self):
+        self.detect_timer = None
+        detector = self.decoder.detector
+        if not detector.active or not self.held_received:
+            return
+        if time.monotonic() - self.held_received[0] < self.detect_latency:
+            # detection started again since the timer was set
+            self.watch_detection()
+            return
+        if self.deasserted:
+            self.publish_frames(detector.finish())
+            self.release()
+        else:
+            # the lanes complete the transaction first
+            self.detect_expired = True
+
+    def log(self, message):
+        self.publish("log", message)
+
+    def event(self, name):
+        """Decoder event (Tc6Decoder.stats interface)"""
+        if self.stats:
+            self.stats.event(name)
+        if name not in PARAMETER_EVENTS:
+            self.errors[name] += 1
+            self.publish("error", (name, self.time))
+
+    def summary(self):
+        """Returns the stream counters as dict"""
+        return {
+            "uptime": time.monotonic() - self.started,
+            "rows": self.rows,
+            "spi_events": self.events,
+            "frames": self.frames,
+            "capture_time": self.time,
+            "errors": dict(self.errors),
+            "dropped": [subscription.dropped for subscription in self.subscriptions],
+        }
+
+    def feed_event(self, event):
+        """Decodes one SPI event and publishes its frames"""
+        event_type, start_time, end_time, mosi, miso = event
+        self.events += 1
+        self.time = start_time
+        d = self.decoder
+        held = d.detector is not None and d.detector.active
+        frames = None
+        if event_type == "result":
+            frames = d.result(mosi, miso, start_time, end_time)
+        elif event_type == "enable":
+            d.enable(start_time)
+        elif event_type == "disable":
+            d.disable(start_time)
+        if d.detector is None:
+            self.publish_frames(frames)
+            return
+        self.deasserted = event_type == "disable"
+        if held or d.detector.active:
+            self.hold(end_time)
+            if self.deasserted and d.detector.active and (d.detector.ready or self.detect_expired):
+                frames = d.detector.finish()
+        self.publish_frames(frames)
+        if d.detector.active:
+            self.watch_detection()
+        else:
+            self.release()
+
+    async def ingest(self, events):
+        """Decodes an async iterable of SPI events"""
+        batch = 0
+        async for event in events:
+            self.received = time.monotonic()
+            self.feed_event(event)
+            batch += 1
+            if batch >= INGEST_BATCH:
+                batch = 0
+                await asyncio.sleep(0)
+
+    async def parse_lines(self, lines):
+        """Yields the SPI events of an async iterable of CSV lines, malformed
+        rows are published as 'malformed_row' errors"""
+        parse = None
+        async for line in lines:
+            row = next(csv.reader([line.decode(errors="replace")]), None)
+            if not row:
+                continue
+            self.rows += 1
+            if parse is None:
+                columns = [c.strip().strip('"').lower() for c in row]
+                if "type" in columns:
+                    try:
+                        parse = logic2_row_parser(columns)
+                    except ValueError:
+                        self.event("malformed_header")
+                        parse = logic2_row_parser()
+                    continue
+                parse = logic2_row_parser()
+            try:
+                event = parse(row)
+            except (ValueError, IndexError):
+                self.event("malformed_row")
+                continue
+            yield event
+
+    async def handle_connection(self, reader, writer):
+        async with self.connection:
+            try:
+                await self.ingest(self.parse_lines(reader))
+            finally:
+                writer.close()
+                if self.decoder.state != Tc6State.CHIP_DESELECT:
+                    # the next connection starts with a new transaction
+                    self.decoder.disable(None)
+
+    async def serve(self, server):
+        async with server:
+            await server.serve_forever()
+
+    async def publish_stats(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.publish("stats", self.summary())
+
+    async def run(self, source, speed=0.0, clk=0, mosi=1, miso=2, cs=3, cpol=0, cpha=0):
+        """Decodes a source until its end, servers run until cancelled
+
+        Args:
+            source: '-', 'unix:PATH', 'tcp:HOST:PORT' or a path, see above
+            speed: Replay speed of capture files, 0 for as fast as possible
+            clk, mosi, miso, cs, cpol, cpha: Channels and SPI mode of binary
+                                             exports
+        """
+        stats_task = asyncio.create_task(self.publish_stats()) if self.stats_interval else None
+        try:
+            if source == "-":
+                mode = os.fstat(sys.stdin.fileno()).st_mode
+                if stat.S_ISREG(mode):
+                    await self.ingest(self.parse_lines(file_lines(sys.stdin.buffer)))
+                else:
+                    await self.ingest(self.parse_lines(await pipe_lines(sys.stdin.buffer)))
+            elif source.startswith("unix:"):
+                await self.serve(await asyncio.start_unix_server(self.handle_connection, source[5:]))
+            elif source.startswith("tcp:"):
+                host, port = source[4:].rsplit(":", 1)
+                await self.serve(await asyncio.start_server(self.handle_connection, host, int(port)))
+            elif os.path.isdir(source):
+                await self.ingest(paced(read_binary_dir(source, clk, mosi, miso, cs, cpol, cpha), speed))
+            elif stat.S_ISFIFO(os.stat(source).st_mode):
+                # opening blocks until the writer opens the FIFO
+                fifo = await asyncio.get_running_loop().run_in_executor(None, open, source, "rb", 0)
+                with fifo:
+                    await self.ingest(self.parse_lines(await pipe_lines(fifo)))
+            else:
+                await self.ingest(paced(read_csv(source), speed))
+        finally:
+            if stats_task:
+                stats_task.cancel()
+            self.end()
+
+    def end(self):
+        """Completes decoding at the end of the input and publishes the end
+        message"""
+        if self.ended:
+            return
+        self.ended = True
+        if self.detect_timer is not None:
+            self.detect_timer.cancel()
+            self.detect_timer = None
+        d = self.decoder
+        if d.detector is not None:
+            self.publish_frames(d.detector.end())
+            self.release()
+        if d.link_stats is not None:
+            # the last window is closed at the end of the input
+            for summary in d.link_stats.flush():
+                if d.trace_link_stats:
+                    self.publish_frames(create_link_stats_frame(summary, d.clock))
+        self.publish("stats", self.summary())
+        self.publish("end", None)
+
+def write_rows(writer, output, rows):
+    writer.writerows(rows)
+    output.flush()
+
+async def write_output(subscription, output, result_types):
+    """Writes the frames of a subscription as CSV and reports errors, log
+    messages and counters with the delivery latency on stderr"""
+    loop = asyncio.get_running_loop()
+    writer = csv.writer(output)
+    await loop.run_in_executor(None, write_rows, writer, output, [("type", "start_time", "end_time", "label")])
+    latency_max = 0.0
+    latency_sum = 0.0
+    latency_count = 0
+    async for messages in subscription.batches():
+        now = time.monotonic()
+        rows = []
+        for message in messages:
+            if message.kind == "frame":
+                frame = message.data
+                rows.append((frame.type, frame.start_time, frame.end_time, format_label(frame, result_types)))
+                latency = now - message.received
+                latency_max = max(latency_max, latency)
+                latency_sum += latency
+                latency_count += 1
+            elif message.kind == "error":
+                name, capture_time = message.data
+                print(f"error: {name} at {capture_time}", file=sys.stderr)
+            elif message.kind == "log":
+                print(message.data, file=sys.stderr)
+            elif message.kind == "stats":
+                s = message.data
+                mean = latency_sum / latency_count if latency_count else 0.0
+                print(f"{s['spi_events']} SPI events, {s['frames']} frames, {sum(s['errors'].values())} errors, "
+                      f"{subscription.dropped} dropped, latency mean {mean * 1000:.2f} ms max {latency_max * 1000:.2f} ms", file=sys.stderr)
+                latency_max = latency_sum = 0.0
+                latency_count = 0
+        if rows:
+            # written on a thread, a blocked output does not stop decoding
+            await loop.run_in_executor(None, write_rows, writer, output, rows)
+
+async def stream_main(args, decoder):
+    stream = StreamDecoder(decoder, args.stats_interval or None, args.detect_latency or None)
+    subscription = stream.subscribe(maxsize=args.queue_size)
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    result_types = COMPACT_RESULT_TYPES if args.label == "compact" else RESULT_TYPES
+    writer_task = asyncio.create_task(write_output(subscription, output, result_types))
+    run_task = asyncio.create_task(stream.run(args.source, args.speed, args.clk, args.mosi, args.miso, args.cs, args.cpol, args.cpha))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, run_task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await run_task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await writer_task
+        if output is not sys.stdout:
+            output.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode TC6 SPI traffic as it arrives")
+    parser.add_argument("source", help="'-' for stdin, unix:PATH, tcp:HOST:PORT, a FIFO or a capture file")
+    parser.add_argument("-o", "--output", help="output CSV file (default: stdout)")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay speed of capture files (1 for real time, default: as fast as possible)")
+    parser.add_argument("--trace", choices=("transactions", "tx", "rx", "ethernet", "link", "combined"), default="transactions")
+    parser.add_argument("--block-payload-size", choices=("auto-detect", "64", "32"), default="auto-detect")
+    parser.add_argument("--control-data-protection", choices=("auto-detect", "enabled", "disabled"), default="auto-detect")
+    parser.add_argument("--filter", default="", help="only decode transactions matching the filter expression (see tc6_filter.py)")
+    parser.add_argument("--label", choices=("full", "compact"), default="full", help="label format")
+    parser.add_argument("--register-map", default=DEFAULT_REGISTER_MAP, metavar="NAME|FILE", help="register names and fields of control transactions: oa-tc6, lan865x or a JSON file (see tc6_regmap.py)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="queued messages before the oldest are dropped")
+    parser.add_argument("--stats-interval", type=float, default=DEFAULT_STATS_INTERVAL, metavar="SECONDS",
+                        help="report the counters and the delivery latency on stderr (0 for only at the end)")
+    parser.add_argument("--detect-latency", type=float, default=DEFAULT_DETECT_LATENCY, metavar="SECONDS",
+                        help="longest time SPI events are held while the settings are auto-detected (0 for until detected)")
+    binary = parser.add_argument_group("binary export")
+    binary.add_argument("--clk", type=int, default=0, help="SPI clock channel")
+    binary.add_argument("--mosi", type=int, default=1, help="MOSI channel")
+    binary.add_argument("--miso", type=int, default=2, help="MISO channel")
+    binary.add_argument("--cs", type=int, default=3, help="chip select channel")
+    binary.add_argument("--cpol", type=int, choices=(0, 1), default=0, help="SPI clock polarity")
+    binary.add_argument("--cpha", type=int, choices=(0, 1), default=0, help="SPI clock phase")
+    args = parser.parse_args(argv)
+
+    try:
+        decoder = Tc6Decoder.from_settings(args.block_payload_size, args.control_data_protection, args.trace, args.filter, args.register_map)
+    except FilterError as e:
+        parser.error(f"--filter: {e}")
+    except RegisterMapError as e:
+        parser.error(f"--register-map: {e}")
+    asyncio.run(stream_main(args, decoder))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Synthetic TC6 SPI traffic generator
+#
+# Produces SPI events in the same (type, start_time, end_time, mosi, miso)
+# format as the readers in tc6_capture.py, one 8 bit transfer per event.
+#
+# Example:
+#   python tc6_synth.py capture.csv --transactions 100000
+import argparse
+import random
+import struct
+
+CONFIG0_MMS = 0
+CONFIG0_ADDR = 0x4
+CONFIG0_SYNC = 0x00008000
+CONFIG0_PROTE = 0x00000020
+CONFIG0_CPS_32 = 0b101
+CONFIG0_CPS_64 = 0b110
+
+ETHERNET_FRAME_SIZES = (60, 64, 128, 256, 512, 1024, 1514, 1518)
+
+def with_parity(word):
+    """Sets the parity bit of a header or footer for odd parity"""
+    word &= ~1
+    return word | (bin(word).count("1") & 1 ^ 1)
+
+def control_header(wnr, mms, addr, length, aid=False):
+    return with_parity((wnr << 29) | (aid << 28) | (mms << 24) | (addr << 8) | ((length - 1) << 1))
+
+def data_header(dv=False, sv=False, swo=0, ev=False, ebo=0, seq=False, norx=False):
+    return with_parity((1 << 31) | (seq << 30) | (norx << 29) | (dv << 21) | (sv << 20) | (swo << 16) | (ev << 14) | (ebo << 8))
+
+def data_footer(dv=False, sv=False, swo=0, ev=False, ebo=0, exst=False, hdrb=False, sync=True, rca=0, fd=False, rtsa=False, rtsp=False, txc=31):
+    return with_parity((exst << 31) | (hdrb << 30) | (sync << 29) | (rca << 24) | (dv << 21) | (sv << 20) | (swo << 16)
+                       | (fd << 15) | (ev << 14) | (ebo << 8) | (rtsa << 7) | (rtsp << 6) | (txc << 1))
+
+def pack_chunks(frames, chunk_size):
+    """Packs Ethernet frames into chunk payloads
+
+    A frame starts at a word aligned offset, a new frame may start in the
+    chunk in which the previous frame ends.
+
+    Args:
+        frames: Iterable of Ethernet frames
+        chunk_size: Chunk payload size
+
+    Yields:
+        (payload, dv, sv, swo, ev, ebo) tuples
+    """
+    frames = iter(frames)
+    pending = next(frames, None)
+    current = None
+    offset = 0
+    while pending is not None or current is not None:
+        payload = bytearray(chunk_size)
+        sv = ev = False
+        swo = ebo = 0
+        pos = 0
+        if current is not None:
+            n = min(chunk_size, len(current) - offset)
+            payload[:n] = current[offset:offset + n]
+            offset += n
+            pos = n
+            if offset == len(current):
+                ev = True
+                ebo = n - 1
+                current = None
+        start = (pos + 3) // 4 * 4
+        if current is None and pending is not None and start < chunk_size:
+            # only one frame may end per chunk
+            if not (ev and start + len(pending) <= chunk_size):
+                current = pending
+                pending = next(frames, None)
+                sv = True
+                swo = start // 4
+                n = min(chunk_size - start, len(current))
+                payload[start:start + n] = current[:n]
+                offset = n
+                if offset == len(current):
+                    ev = True
+                    ebo = start + n - 1
+                    current = None
+        yield (bytes(payload), True, sv, swo, ev, ebo)
+
+class Tc6TrafficGenerator():
+    def __init__(self, seed=0, chunk_size=64, ctrl_rw_data_protection=False, byte_time=0.32e-6, transaction_gap=1e-6):
+        """Traffic generator initialization
+
+        Args:
+            seed: Random seed, the generated traffic is reproducible
+            chunk_size: Initial block payload size of the MAC-PHY
+            ctrl_rw_data_protection: Initial control data protection
+            byte_time: Duration of one byte on SPI (default 25 MHz)
+            transaction_gap: Chip select deasserted time between transactions
+        """
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.ctrl_rw_data_protection = ctrl_rw_data_protection
+        self.byte_time = byte_time
+        self.transaction_gap = transaction_gap
+        self.time = 0.0
+        self.seq = False
+
+    def random_bytes(self, count):
+        return self.random.getrandbits(count * 8).to_bytes(count, byteorder="big") if count else b""
+
+    def transaction(self, mosi, miso):
+        """Yields the SPI events of one chip select assertion"""
+        t = self.time
+        yield ("enable", t, t, None, None)
+        step = self.byte_time
+        duration = step * 0.9
+        t += step
+        for i in range(len(mosi)):
+            yield ("result", t, t + duration, mosi[i:i + 1], miso[i:i + 1])
+            t += step
+        yield ("disable", t, t, None, None)
+        self.time = t + self.transaction_gap
+
+    def control_words(self, values):
+        data = bytearray()
+        for value in values:
+            data += struct.pack(">I", value)
+            if self.ctrl_rw_data_protection:
+                data += struct.pack(">I", value ^ 0xffffffff)
+        return bytes(data)
+
+    def control_write(self, mms, addr, values):
+        """Control write of one or more registers (address auto increment)"""
+        header = struct.pack(">I", control_header(True, mms, addr, len(values)))
+        data = self.control_words(values)
+        yield from self.transaction(header + data + bytes(4), self.random_bytes(4) + header + data)
+        if mms == CONFIG0_MMS and addr == CONFIG0_ADDR:
+            config0 = values[0]
+            self.ctrl_rw_data_protection = bool(config0 & CONFIG0_PROTE)
+            if config0 & 0x7 == CONFIG0_CPS_32:
+                self.chunk_size = 32
+            elif config0 & 0x7 == CONFIG0_CPS_64:
+                self.chunk_size = 64
+
+    def control_read(self, mms, addr, values):
+        """Control read of one or more registers returning values"""
+        header = struct.pack(">I", control_header(False, mms, addr, len(values)))
+        data = self.control_words(values)
+        yield from self.transaction(header + bytes(4 + len(data)), self.random_bytes(4) + header + data)
+
+    def config0_write(self, chunk_size, ctrl_rw_data_protection):
+        """CONFIG0 write changing the block payload size and protection"""
+        value = CONFIG0_SYNC | (CONFIG0_CPS_32 if chunk_size == 32 else CONFIG0_CPS_64)
+        if ctrl_rw_data_protection:
+            value |= CONFIG0_PROTE
+        yield from self.control_write(CONFIG0_MMS, CONFIG0_ADDR, [value])
+
+    def data_chunk(self, tx=None, rx=None, rca=0, txc=31, exst=False, fd=False, norx=False):
+        """Data chunk transaction
+
+        Args:
+            tx: (payload, dv, sv, swo, ev, ebo) of the transmit chunk or None
+            rx: (payload, dv, sv, swo, ev, ebo) of the receive chunk or None
+        """
+        empty = (bytes(self.chunk_size), False, False, 0, False, 0)
+        tx_payload, tx_dv, tx_sv, tx_swo, tx_ev, tx_ebo = tx or empty
+        rx_payload, rx_dv, rx_sv, rx_swo, rx_ev, rx_ebo = rx or empty
+        self.seq = not self.seq if tx_dv else self.seq
+        header = data_header(tx_dv, tx_sv, tx_swo, tx_ev, tx_ebo, self.seq, norx)
+        footer = data_footer(rx_dv, rx_sv, rx_swo, rx_ev, rx_ebo, exst=exst, rca=rca, fd=fd, txc=txc)
+        yield from self.transaction(struct.pack(">I", header) + tx_payload, rx_payload + struct.pack(">I", footer))
+
+    def ethernet_frame(self, size=None):
+        """Random Ethernet frame, VLAN tagged in one of four cases"""
+        size = size or self.random.choice(ETHERNET_FRAME_SIZES)
+        header = self.random_bytes(12)
+        if self.random.random() < 0.25:
+            tci = (self.random.randrange(8) << 13) | self.random.randrange(1, 4095)
+            header += struct.pack(">HHH", 0x8100, tci, 0x0800)
+        else:
+            header += struct.pack(">H", 0x0800)
+        return header + self.random_bytes(size - len(header))
+
+    def ethernet_traffic(self, tx_frames, rx_frames):
+        """Transfers Ethernet frames in both directions through data chunks
+
+        The chunk size must not change while the frames are transferred.
+        """
+        tx_chunks = list(pack_chunks(tx_frames, self.chunk_size))
+        rx_chunks = list(pack_chunks(rx_frames, self.chunk_size))
+        count = max(len(tx_chunks), len(rx_chunks))
+        for i in range(count):
+            tx = tx_chunks[i] if i < len(tx_chunks) else None
+            rx = rx_chunks[i] if i < len(rx_chunks) else None
+            rca = min(31, max(0, len(rx_chunks) - i - 1))
+            txc = 31 if i + 1 < len(tx_chunks) or self.random.random() < 0.9 else 0
+            yield from self.data_chunk(tx, rx, rca=rca, txc=txc)
+
+    def scenario(self, transactions):
+        """Mixed traffic of about the given number of transactions
+
+        Contains single and multi register control reads and writes, data
+        chunks carrying Ethernet frames and empty chunks, and CONFIG0 writes
+        changing the block payload size and control data protection.
+        """
+        r = self.random
+        count = 0
+        while count < transactions:
+            kind = r.random()
+            if kind < 0.02:
+                count += 1
+                yield from self.config0_write(r.choice((32, 64)), r.random() < 0.5)
+            elif kind < 0.10:
+                count += 1
+                values = [r.getrandbits(32) for _ in range(r.choice((1, 1, 2, 4)))]
+                yield from self.control_write(r.randrange(1, 12), r.randrange(0x100), values)
+            elif kind < 0.20:
+                count += 1
+                values = [r.getrandbits(32) for _ in range(r.choice((1, 1, 2, 4)))]
+                yield from self.control_read(r.randrange(0, 12), r.randrange(0x100), values)
+            elif kind < 0.30:
+                count += 1
+                yield from self.data_chunk()
+            else:
+                tx = [self.ethernet_frame() for _ in range(r.randrange(3))]
+                rx = [self.ethernet_frame() for _ in range(r.randrange(3))]
+                for event in self.ethernet_traffic(tx, rx):
+                    if event[0] == "disable":
+                        count += 1
+                    yield event
+
+def write_csv(events, path):
+    """Writes SPI events as Logic 2 SPI analyzer CSV export"""
+    with open(path, "w", newline="") as f:
+        f.write('name,type,start_time,duration,"mosi","miso"\n')
+        for event_type, start_time, end_time, mosi, miso in events:
+            if event_type == "result":
+                f.write(f'"SPI","result",{start_time:.9f},{end_time - start_time:.9f},0x{mosi.hex()},0x{miso.hex()}\n')
+            else:
+                f.write(f'"SPI","{event_type}",{start_time:.9f},0,,\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic TC6 SPI capture as Logic 2 CSV export")
+    parser.add_argument("output", help="output CSV file")
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_csv(Tc6TrafficGenerator(args.seed).scenario(args.transactions), args.output)
+
+if __name__ == "__main__":
+    main()
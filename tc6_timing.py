@@ -0,0 +1,243 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# SPI timing analysis
+#
+# Timing quantities of every decoded transaction are counted in histograms
+# with logarithmic buckets: each power of two is divided into SUB_BUCKETS
+# buckets of equal width, so percentiles are exact within 1/SUB_BUCKETS of
+# the value and the number of buckets only depends on the range of the
+# values, not on the length of the capture. The transactions with the worst
+# values are kept as (value, start_time, end_time) to locate them in the
+# capture.
+#
+# Times are float seconds, the decoder converts the GraphTime of Logic with
+# its CaptureClock (see tc6_clock.py), so in Logic the times of the worst
+# values are seconds since the first transaction seen by the decoder.
+#
+# Quantities:
+#   duration     first header byte to last byte of the transaction (s)
+#   gap          chip select deassertion to the next assertion, counted for
+#                the transaction following the gap (s)
+#   throughput   SPI bytes per second of the transaction, the worst
+#                transactions are the slowest (bytes/s)
+#   turnaround   end of the control read header to the first byte of the
+#                read data (s)
+#
+# Every quantity is counted per transaction type (control_read,
+# control_write, data) and per type and first register of control
+# transactions, e.g. "control_write CONFIG0".
+#
+# Example:
+#   decoder.timing = TimingStats()
+#   ...
+#   decoder.timing.histograms[("duration", "data")].percentile(99)
+import heapq
+import json
+import math
+import time
+from tc6_registers import STANDARD_REGISTERS
+
+SUB_BUCKETS = 64
+WORST_COUNT = 5
+PERCENTILES = (50, 90, 99, 99.9)
+
+class LogHistogram():
+    def __init__(self, lowest=False, sub_buckets=SUB_BUCKETS, worst=WORST_COUNT):
+        """Histogram with logarithmic buckets
+
+        Args:
+            lowest: The lowest values are the worst values
+            sub_buckets: Buckets per power of two
+            worst: Number of worst values kept
+        """
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self.worst_count = worst
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        # heap of (key, count, value, start_time, end_time), the best of the
+        # worst values is on top
+        self.worst = []
+
+    def bucket(self, value):
+        mantissa, exponent = math.frexp(value)
+        return exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def bucket_range(self, index):
+        """Returns the lowest and highest value of a bucket"""
+        exponent, sub = divmod(index, self.sub_buckets)
+        low = math.ldexp(0.5 + sub / (2 * self.sub_buckets), exponent)
+        high = math.ldexp(0.5 + (sub + 1) / (2 * self.sub_buckets), exponent)
+        return low, high
+
+    def add(self, value, start_time=None, end_time=None):
+        """Counts a value
+
+        Args:
+            value: Non-negative value
+            start_time, end_time: Transaction of the value
+        """
+        if value <= 0:
+            self.zeros += 1
+            value = 0.0
+        else:
+            index = self.bucket(value)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        entry = (-value if self.lowest else value, -self.count, value, start_time, end_time)
+        if len(self.worst) < self.worst_count:
+            heapq.heappush(self.worst, entry)
+        elif entry[0] > self.worst[0][0]:
+            heapq.heapreplace(self.worst, entry)
+
+    def percentile(self, percent):
+        """Returns the value below or at which percent of the values are,
+        None if the histogram is empty"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                _, high = self.bucket_range(index)
+                return min(max(high, self.min), self.max)
+        return self.max
+
+    def worst_values(self):
+        """Returns the worst values as list of (value, start_time, end_time),
+        worst first"""
+        return [(value, start_time, end_time) for _, _, value, start_time, end_time in sorted(self.worst, reverse=True)]
+
+    def summary(self):
+        summary = {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent:g}"] = self.percentile(percent)
+        summary["worst"] = [{"value": value, "start_time": start_time, "end_time": end_time}
+                            for value, start_time, end_time in self.worst_values()]
+        return summary
+
+class TimingStats():
+    def __init__(self, path=None, interval=None, names=STANDARD_REGISTERS):
+        """Timing histograms of the decoded transactions
+
+        Args:
+            path: JSON file written by dump()
+            interval: Seconds between periodic dumps to path, None to only
+                      dump on request
+            names: Dict of register name to (mms, addr)
+        """
+        self.path = path
+        self.interval = interval
+        self.last_dump = time.monotonic()
+        self.register_names = {key: name for name, key in names.items()}
+        # (quantity, group) -> LogHistogram
+        self.histograms = {}
+        self.deselect_time = None
+        self.gap = None
+
+    def histogram(self, quantity, group):
+        histogram = self.histograms.get((quantity, group))
+        if histogram is None:
+            histogram = self.histograms[(quantity, group)] = LogHistogram(lowest=quantity == "throughput")
+        return histogram
+
+    def add(self, quantity, groups, value, start_time, end_time):
+        for group in groups:
+            self.histogram(quantity, group).add(value, start_time, end_time)
+
+    def chip_deselect(self, start_time):
+        self.deselect_time = start_time
+
+    def chip_select(self, start_time):
+        if self.deselect_time is not None:
+            self.gap = (self.deselect_time, start_time)
+        self.deselect_time = None
+
+    def register_name(self, mms, addr):
+        name = self.register_names.get((mms, addr))
+        return name if name else f"{mms}:0x{addr:04x}"
+
+    def transaction(self, kind, start_time, end_time, spi_bytes, register=None, turnaround=None):
+        """Counts a complete transaction
+
+        Args:
+            kind: 'control_read', 'control_write' or 'data'
+            start_time: Start time of the transaction
+            end_time: End time of the transaction
+            spi_bytes: Bytes transferred by the transaction
+            register: (mms, addr) of the first register of a control
+                      transaction
+            turnaround: Control read turnaround time
+        """
+        groups = (kind,) if register is None else (kind, f"{kind} {self.register_name(*register)}")
+        duration = end_time - start_time
+        self.add("duration", groups, duration, start_time, end_time)
+        if duration > 0:
+            self.add("throughput", groups, spi_bytes / duration, start_time, end_time)
+        if turnaround is not None:
+            self.add("turnaround", groups, turnaround, start_time, end_time)
+        if self.gap is not None:
+            deselect_time, select_time = self.gap
+            self.add("gap", groups, select_time - deselect_time, deselect_time, select_time)
+            self.gap = None
+        if self.interval is not None:
+            self.periodic_dump()
+
+    def summary(self):
+        """Returns the summaries of all histograms as dict of quantity to
+        dict of group to summary"""
+        summary = {}
+        for quantity, group in sorted(self.histograms):
+            summary.setdefault(quantity, {})[group] = self.histograms[(quantity, group)].summary()
+        return summary
+
+    def report(self):
+        """Returns the percentiles per transaction type as text lines"""
+        lines = [f"{'quantity':<12} {'type':<14} {'count':>8} {'p50':>12} {'p99':>12} {'max':>12}  worst at"]
+        for (quantity, group), histogram in sorted(self.histograms.items()):
+            if " " in group:
+                continue
+            worst = histogram.worst_values()
+            worst_at = f"{worst[0][1]:.9f}" if worst and worst[0][1] is not None else ""
+            lines.append(f"{quantity:<12} {group:<14} {histogram.count:>8} {histogram.percentile(50):>12.6g} "
+                         f"{histogram.percentile(99):>12.6g} {histogram.max:>12.6g}  {worst_at}")
+        return lines
+
+    def dump(self, path=None):
+        """Writes the summary as JSON"""
+        with open(path or self.path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        self.last_dump = time.monotonic()
+
+    def periodic_dump(self):
+        if time.monotonic() - self.last_dump >= self.interval:
+            self.dump()
@@ -0,0 +1,87 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the persistent decode cache
+import os
+import tempfile
+import unittest
+from tc6_cache import DecodeCache
+from tc6_capture import read_csv
+from tc6_decoder import Tc6Decoder
+from tc6_synth import Tc6TrafficGenerator, write_csv
+from test_tc6_detect import unconfigured_traffic
+
+SETTINGS = ("auto-detect", "auto-detect", "combined", "", "")
+
+def create_decoder():
+    decoder = Tc6Decoder.from_settings(*SETTINGS)
+    decoder.messages = []
+    decoder.log = decoder.messages.append
+    return decoder
+
+class DecodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.csv")
+        self.events = list(Tc6TrafficGenerator(8).scenario(600))
+        write_csv(self.events, self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cache(self, checkpoint_size=16 * 1024):
+        return DecodeCache(os.path.join(self.directory.name, "cache"), checkpoint_size=checkpoint_size)
+
+    def sequential(self):
+        decoder = create_decoder()
+        return list(decoder.feed(read_csv(self.path))), decoder
+
+    def cached(self, cache):
+        decoder = create_decoder()
+        return list(cache.decode_csv(decoder, SETTINGS, self.path)), decoder
+
+    def test_detection_continues_across_segments(self):
+        write_csv(unconfigured_traffic(32, True, 60), self.path)
+        frames, decoder = self.sequential()
+        # segments of a single transaction, shorter than detection needs
+        cached_frames, cached = self.cached(self.cache(512))
+        self.assertEqual(cached_frames, frames)
+        self.assertEqual(cached.messages, decoder.messages)
+
+    def test_unchanged_capture_is_reused(self):
+        frames, decoder = self.sequential()
+        self.cached(self.cache())
+        cache = self.cache()
+        cached_frames, cached = self.cached(cache)
+        self.assertEqual(cache.decoded_bytes, 0)
+        self.assertEqual(cache.reused_bytes, os.path.getsize(self.path))
+        self.assertEqual(cached_frames, frames)
+        self.assertEqual(cached.messages, decoder.messages)
+        self.assertEqual(cached.transaction_count, decoder.transaction_count)
+
+    def test_appended_capture_resumes_from_checkpoint(self):
+        write_csv(self.events[:len(self.events) // 2], self.path)
+        self.cached(self.cache())
+        write_csv(self.events, self.path)
+        frames, decoder = self.sequential()
+        cache = self.cache()
+        cached_frames, cached = self.cached(cache)
+        self.assertGreater(cache.reused_bytes, 0)
+        self.assertGreater(cache.decoded_bytes, 0)
+        self.assertEqual(cached_frames, frames)
+        self.assertEqual(cached.transaction_count, decoder.transaction_count)
+        self.assertEqual(cached.registers.state(), decoder.registers.state())
+
+if __name__ == "__main__":
+    unittest.main()
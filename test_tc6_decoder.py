@@ -0,0 +1,58 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the TC6 decoder on synthetic traffic
+import struct
+import unittest
+from tc6_decoder import COMBINED_TRACES, Tc6Decoder, Trace
+from tc6_synth import Tc6TrafficGenerator, data_header
+
+def decode(events, trace=Trace.TRANSACTION, chunk_size=64, ctrl_rw_data_protection=False):
+    decoder = Tc6Decoder(trace, chunk_size, ctrl_rw_data_protection)
+    decoder.log = lambda message: None
+    return list(decoder.feed(events))
+
+class ErrorRecoveryTest(unittest.TestCase):
+    def corrupted_header(self):
+        """Data chunk with a header parity error, then an empty data chunk
+        whose header follows in the same chip select assertion"""
+        g = Tc6TrafficGenerator(6)
+        header = data_header() ^ 1
+        next_header = data_header()
+        mosi = struct.pack(">I", header) + struct.pack(">I", next_header) + bytes(64)
+        miso = bytes(4) + g.random_bytes(64) + struct.pack(">I", 0x20003e01)
+        return list(g.transaction(mosi, miso))
+
+    def test_dropped_transaction_ends_at_restart_byte(self):
+        events = self.corrupted_header()
+        frames = decode(events)
+        self.assertEqual(frames[0].type, "dropped_transaction")
+        # events[2] is the second byte, where the header search restarts
+        self.assertEqual((frames[0].start_time, frames[0].end_time), (events[1][1], events[2][1]))
+        for trace in (Trace.TRANSACTION, COMBINED_TRACES):
+            frames = decode(events, trace)
+            dropped = frames[0]
+            self.assertTrue(all(frame.start_time >= dropped.end_time for frame in frames[1:]))
+
+    def test_decoding_resumes_after_dropped_header(self):
+        g = Tc6TrafficGenerator(7)
+        events = self.corrupted_header()
+        g.time = events[-1][2] + 1e-6
+        events += g.data_chunk()
+        frames = decode(events)
+        self.assertEqual([frame.type for frame in frames][-1], "data_transaction")
+        self.assertEqual(frames[-1].start_time, events[-69][1])
+
+if __name__ == "__main__":
+    unittest.main()
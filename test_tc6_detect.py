@@ -0,0 +1,86 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the block payload size and control data protection detection
+import unittest
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_detect import ConfigurationDetector, DETECT_TRANSACTIONS, LaneScore
+from tc6_synth import Tc6TrafficGenerator
+
+def unconfigured_traffic(chunk_size, ctrl_rw_data_protection, count=40, seed=1):
+    """Control and data transactions without a CONFIG0 write"""
+    g = Tc6TrafficGenerator(seed, chunk_size, ctrl_rw_data_protection)
+    for i in range(count):
+        if i % 4 == 0:
+            yield from g.control_read(1, i, [g.random.getrandbits(32) for _ in range(1 + i % 3)])
+        elif i % 4 == 1:
+            yield from g.control_write(2, i, [g.random.getrandbits(32)])
+        else:
+            yield from g.ethernet_traffic([g.ethernet_frame(60)], [g.ethernet_frame(60)])
+
+def decode(decoder, events):
+    decoder.log = lambda message: None
+    return list(decoder.feed(events))
+
+class FakeLane():
+    def __init__(self, errors, transaction_count):
+        self.stats = LaneScore()
+        self.stats.errors = errors
+        self.transaction_count = transaction_count
+
+class DetectionTest(unittest.TestCase):
+    def test_detects_settings_without_configuration(self):
+        for chunk_size in (64, 32):
+            for protection in (False, True):
+                events = list(unconfigured_traffic(chunk_size, protection))
+                decoder = Tc6Decoder(Trace.TRANSACTION)
+                frames = decode(decoder, events)
+                self.assertEqual((decoder.chunk_size, decoder.ctrl_rw_data_protection), (chunk_size, protection))
+                self.assertEqual(frames, decode(Tc6Decoder(Trace.TRANSACTION, chunk_size, protection), events))
+
+    def test_tied_lanes_with_different_counts_decide(self):
+        detector = ConfigurationDetector(Tc6Decoder(Trace.TRANSACTION))
+        lanes = [FakeLane(1, DETECT_TRANSACTIONS), FakeLane(1, DETECT_TRANSACTIONS + 3), FakeLane(4, 30), FakeLane(5, 2)]
+        detector.lanes = [(64, False, lanes[0]), (64, True, lanes[1]), (32, False, lanes[2]), (32, True, lanes[3])]
+        self.assertTrue(detector.decided())
+        detector.finish()
+        self.assertTrue(detector.decoder.ctrl_rw_data_protection)
+
+    def test_tied_lanes_wait_for_enough_transactions(self):
+        detector = ConfigurationDetector(Tc6Decoder(Trace.TRANSACTION))
+        lanes = [FakeLane(0, DETECT_TRANSACTIONS - 1), FakeLane(0, DETECT_TRANSACTIONS + 3)]
+        detector.lanes = [(64, False, lanes[0]), (64, True, lanes[1])]
+        self.assertFalse(detector.decided())
+
+    def test_decoder_methods_are_not_replaced(self):
+        decoder = Tc6Decoder(Trace.TRANSACTION)
+        self.assertTrue(decoder.detect_results and decoder.detect_chip_select)
+        decode(decoder, unconfigured_traffic(64, False))
+        self.assertFalse(decoder.detector.active)
+        self.assertFalse({"result", "enable", "disable"} & set(vars(decoder)))
+
+    def test_redetection_after_configuration_change(self):
+        g = Tc6TrafficGenerator(2)
+        events = list(unconfigured_traffic(64, False, 20, seed=3))
+        # CONFIG0 write not captured, the chunk size changed
+        g.chunk_size = 32
+        g.time = events[-1][2] + 1e-6
+        for _ in range(40):
+            events += g.data_chunk()
+        decoder = Tc6Decoder(Trace.TRANSACTION)
+        decode(decoder, events)
+        self.assertEqual(decoder.chunk_size, 32)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the Ethernet frame reassembly
+import unittest
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_ethernet import EthernetFrameAssembler
+from tc6_synth import Tc6TrafficGenerator, pack_chunks
+
+def reassembled(events, chunk_size):
+    decoder = Tc6Decoder(Trace.ETHERNET_FRAME, chunk_size, False)
+    decoder.log = lambda message: None
+    return [(frame.data['direction'], frame.data['data'], frame.data['dropped']) for frame in decoder.feed(events)]
+
+class EthernetFrameAssemblerTest(unittest.TestCase):
+    def test_frames_of_packed_chunks(self):
+        g = Tc6TrafficGenerator(9)
+        # small frames end and start in the same chunk
+        frames = [g.ethernet_frame(size) for size in (60, 1518, 64, 60, 61, 300)]
+        for chunk_size in (64, 32):
+            assembler = EthernetFrameAssembler()
+            result = []
+            for i, (payload, dv, sv, swo, ev, ebo) in enumerate(pack_chunks(frames, chunk_size)):
+                result += assembler.chunk(payload, dv, sv, swo, ev, ebo, False, i, i + 0.5)
+            self.assertEqual([frame.data for frame in result], frames)
+            self.assertFalse(any(frame.dropped for frame in result))
+
+    def test_frame_drop_marks_frame_in_transfer(self):
+        g = Tc6TrafficGenerator(10)
+        chunks = list(pack_chunks([g.ethernet_frame(200)], 64))
+        assembler = EthernetFrameAssembler()
+        result = []
+        for i, (payload, dv, sv, swo, ev, ebo) in enumerate(chunks):
+            result += assembler.chunk(payload, dv, sv, swo, ev, ebo, i == 1, i, i + 0.5)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0].dropped)
+        self.assertEqual((result[0].start_time, result[0].end_time), (0, len(chunks) - 0.5))
+
+    def test_decoder_reassembles_both_directions(self):
+        for chunk_size in (64, 32):
+            g = Tc6TrafficGenerator(11, chunk_size)
+            tx = [g.ethernet_frame() for _ in range(5)]
+            rx = [g.ethernet_frame() for _ in range(3)]
+            frames = reassembled(g.ethernet_traffic(tx, rx), chunk_size)
+            self.assertEqual([data for direction, data, _ in frames if direction == "TX"], tx)
+            self.assertEqual([data for direction, data, _ in frames if direction == "RX"], rx)
+
+    def test_state_continues_frame_in_transfer(self):
+        g = Tc6TrafficGenerator(12)
+        frame = g.ethernet_frame(1000)
+        chunks = list(pack_chunks([frame], 64))
+        assembler = EthernetFrameAssembler()
+        for i, (payload, dv, sv, swo, ev, ebo) in enumerate(chunks[:5]):
+            assembler.chunk(payload, dv, sv, swo, ev, ebo, False, i, i + 0.5)
+        restored = EthernetFrameAssembler()
+        restored.restore(assembler.state())
+        result = []
+        for i, (payload, dv, sv, swo, ev, ebo) in enumerate(chunks[5:], 5):
+            result += restored.chunk(payload, dv, sv, swo, ev, ebo, False, i, i + 0.5)
+        self.assertEqual([f.data for f in result], [frame])
+
+if __name__ == "__main__":
+    unittest.main()
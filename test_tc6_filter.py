@@ -0,0 +1,78 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the transaction filter expressions
+import unittest
+from tc6 import Tc6ControlCommandHeader, Tc6DataFooter, Tc6TransmitDataHeader
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_filter import FilterError, compile_filter, parse_range
+from tc6_synth import Tc6TrafficGenerator, control_header, data_footer, data_header
+
+def control(write, mms, addr, length=1):
+    word = control_header(write, mms, addr, length)
+    return Tc6ControlCommandHeader.from_bytes(word.to_bytes(4, "big")), None, word, None
+
+def chunk(footer_word=None, **flags):
+    header_word = data_header(**flags)
+    footer_word = footer_word if footer_word is not None else data_footer()
+    return (Tc6TransmitDataHeader.from_bytes(header_word.to_bytes(4, "big")),
+            Tc6DataFooter.from_bytes(footer_word.to_bytes(4, "big")), header_word, footer_word)
+
+class FilterParsingTest(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range("4"), [(4, 4)])
+        self.assertEqual(parse_range("0x10-0x1f,3"), [(16, 31), (3, 3)])
+        for text in ("", "1-", "-1", "x", "2-y"):
+            with self.assertRaises(FilterError):
+                parse_range(text)
+
+    def test_invalid_expressions(self):
+        for expression in ("foo", "mms=", "color=1", "write |", "| data", "tx.foo"):
+            with self.subTest(expression=expression), self.assertRaises(FilterError):
+                compile_filter(expression)
+
+    def test_empty_expression(self):
+        self.assertIsNone(compile_filter(""))
+        self.assertIsNone(compile_filter("  "))
+
+    def test_terms_and_alternatives(self):
+        f = compile_filter("write mms=0 addr=0x4 | exst | !control rca=1-3")
+        self.assertTrue(f(*control(True, 0, 4)))
+        self.assertFalse(f(*control(False, 0, 4)))
+        self.assertFalse(f(*control(True, 1, 4)))
+        self.assertTrue(f(*chunk(data_footer(exst=True))))
+        self.assertTrue(f(*chunk(data_footer(rca=2))))
+        self.assertFalse(f(*chunk(data_footer(rca=4))))
+
+    def test_direction_flags(self):
+        f = compile_filter("tx.sv")
+        self.assertTrue(f(*chunk(dv=True, sv=True)))
+        self.assertFalse(f(*chunk(data_footer(dv=True, sv=True))))
+        self.assertTrue(compile_filter("sv")(*chunk(data_footer(dv=True, sv=True))))
+
+    def test_parity_error(self):
+        header, footer, header_word, footer_word = chunk()
+        f = compile_filter("parity_error")
+        self.assertFalse(f(header, footer, header_word, footer_word))
+        self.assertTrue(f(header, footer, header_word, footer_word ^ 1))
+
+    def test_decoder_emits_matching_transactions(self):
+        g = Tc6TrafficGenerator(13)
+        events = list(g.control_write(0, 4, [0x8006])) + list(g.control_read(1, 0, [1, 2])) + list(g.data_chunk())
+        decoder = Tc6Decoder(Trace.TRANSACTION, 64, False, compile_filter("control !read"))
+        decoder.log = lambda message: None
+        self.assertEqual([frame.type for frame in decoder.feed(events)], ["control_write"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the decoder instrumentation
+import unittest
+from collections import Counter
+from tc6_decoder import COMBINED_TRACES, Tc6Decoder
+from tc6_instrument import DecoderStats
+from tc6_synth import Tc6TrafficGenerator
+
+def instrumented_decode(events, chunk_size=None, ctrl_rw_data_protection=None):
+    decoder = Tc6Decoder(COMBINED_TRACES, chunk_size, ctrl_rw_data_protection)
+    decoder.log = lambda message: None
+    stats = DecoderStats()
+    decoder.instrument(stats)
+    frames = list(decoder.feed(events))
+    return frames, stats.summary()
+
+class DecoderStatsTest(unittest.TestCase):
+    def test_frames_released_after_detection(self):
+        events = list(Tc6TrafficGenerator(4).scenario(300))
+        frames, summary = instrumented_decode(events)
+        self.assertEqual(Counter(summary["frames"]), Counter(frame.type for frame in frames))
+        self.assertGreater(summary["released_frames"], 0)
+        _, summary = instrumented_decode(events, 64, False)
+        self.assertEqual(summary["released_frames"], 0)
+
+    def test_header_search_bytes(self):
+        events = list(Tc6TrafficGenerator(5).scenario(200))
+        # the capture starts in the middle of the first transaction
+        first = next(i for i, event in enumerate(events) if event[0] == "disable")
+        events = events[8:]
+        frames, summary = instrumented_decode(events, 64, False)
+        self.assertEqual(Counter(summary["frames"]), Counter(frame.type for frame in frames))
+        searched = summary["states"]["ERROR"]["bytes"]
+        # the rest of the first transaction is discarded, unless a plausible
+        # header is found in it
+        self.assertGreater(searched, 0)
+        self.assertLessEqual(searched, first - 8)
+        # bytes searched again after a dropped header are counted twice
+        self.assertGreaterEqual(sum(state["bytes"] for state in summary["states"].values()), summary["spi_bytes"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the link statistics windows
+import unittest
+from tc6 import Tc6DataFooter, Tc6TransmitDataHeader
+from tc6_linkstats import LinkStats
+from tc6_synth import data_footer, data_header
+
+def chunk(stats, time, txc=31):
+    header = Tc6TransmitDataHeader.from_bytes(data_header(dv=True, sv=True).to_bytes(4, "big"))
+    footer = Tc6DataFooter.from_bytes(data_footer(txc=txc).to_bytes(4, "big"))
+    return stats.chunk(header, footer, 64, time, time + 1e-5)
+
+class LinkStatsTest(unittest.TestCase):
+    def test_windows_without_traffic_are_skipped(self):
+        stats = LinkStats(0.01)
+        chunk(stats, 0.001)
+        summaries = chunk(stats, 0.5)
+        self.assertEqual([(s["window_start"], s["window_end"]) for s in summaries], [(0.0, 0.01)])
+
+    def test_starvation_gap_is_one_summary(self):
+        stats = LinkStats(0.01)
+        chunk(stats, 0.001, txc=0)
+        summaries = chunk(stats, 100.005)
+        self.assertEqual(len(summaries), 2)
+        gap = summaries[1]
+        self.assertAlmostEqual(gap["window_start"], 0.01)
+        self.assertAlmostEqual(gap["window_end"], 100.0)
+        self.assertEqual((gap["chunks"], gap["starvation_count"]), (0, 0))
+        self.assertAlmostEqual(gap["starvation_time"], gap["window_end"] - gap["window_start"])
+        total = sum(s["starvation_time"] for s in summaries + stats.flush())
+        self.assertAlmostEqual(total, 100.005 + 1e-5 - 0.001 - 1e-5)
+
+if __name__ == "__main__":
+    unittest.main()
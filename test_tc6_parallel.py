@@ -0,0 +1,77 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the parallel decoder against the sequential decoder
+import os
+import tempfile
+import unittest
+from tc6_capture import read_csv
+from tc6_decoder import Tc6Decoder
+from tc6_parallel import ParallelDecoder, csv_segments
+from tc6_store import TransactionStore
+from tc6_synth import Tc6TrafficGenerator, write_csv
+
+def records(store):
+    return [store.record(i) for i in range(len(store))]
+
+class ParallelDecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.csv")
+        # the scenario changes the block payload size and protection mid-stream
+        write_csv(Tc6TrafficGenerator(3).scenario(1500), self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def sequential(self, settings):
+        decoder = Tc6Decoder.from_settings(*settings)
+        messages = []
+        decoder.log = messages.append
+        decoder.store = TransactionStore()
+        frames = list(decoder.feed(read_csv(self.path)))
+        return frames, decoder, messages
+
+    def parallel(self, settings, segments):
+        decoder = ParallelDecoder(settings, 2, segments, TransactionStore())
+        messages = []
+        decoder.log = messages.append
+        frames = list(decoder.decode(csv_segments(self.path, decoder.segments)))
+        return frames, decoder, messages
+
+    def test_identical_to_sequential(self):
+        for settings in (("auto-detect", "auto-detect", "transactions", "", ""),
+                         ("64", "disabled", "combined", "", ""),
+                         ("auto-detect", "auto-detect", "ethernet", "", "")):
+            frames, decoder, messages = self.sequential(settings)
+            for segments in (3, 16):
+                with self.subTest(settings=settings, segments=segments):
+                    parallel_frames, parallel, parallel_messages = self.parallel(settings, segments)
+                    self.assertEqual(parallel_frames, frames)
+                    self.assertEqual(parallel_messages, messages)
+                    self.assertEqual(parallel.registers.changes("CONFIG0"), decoder.registers.changes("CONFIG0"))
+                    self.assertEqual(records(parallel.store), records(decoder.store))
+
+class StoreExtendTest(unittest.TestCase):
+    def test_extend_rebases_payload_offsets(self):
+        stores = [TransactionStore(4), TransactionStore(4)]
+        for n, store in enumerate(stores):
+            for i in range(5):
+                store.append(0, n + i, n + i + 0.5, i, i, 1, i, 1, bytes([n, i]) * 4, bytes([i, n]) * 4)
+        expected = records(stores[0]) + records(stores[1])
+        stores[0].extend(stores[1])
+        self.assertEqual(records(stores[0]), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the PCAPNG export
+import os
+import struct
+import sys
+import tempfile
+import time
+import unittest
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_ethernet import EthernetFrame
+from tc6_pcapng import (BLOCK_ENHANCED_PACKET, BLOCK_INTERFACE_DESCRIPTION, BLOCK_SECTION_HEADER, BYTE_ORDER_MAGIC,
+                        DROP_COMMENT, LINKTYPE_ETHERNET, OPT_COMMENT, RX_INTERFACE, TX_INTERFACE, PcapngWriter)
+from tc6_synth import Tc6TrafficGenerator
+
+# the saleae stand-in of the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench"))
+
+def read_blocks(path):
+    """Returns the (type, body) of all blocks of a PCAPNG file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    blocks = []
+    pos = 0
+    while pos < len(data):
+        block_type, length = struct.unpack_from("<II", data, pos)
+        assert length % 4 == 0 and struct.unpack_from("<I", data, pos + length - 4)[0] == length
+        blocks.append((block_type, data[pos + 8:pos + length - 4]))
+        pos += length
+    return blocks
+
+def options(data):
+    result = {}
+    pos = 0
+    while pos < len(data):
+        code, length = struct.unpack_from("<HH", data, pos)
+        if code == 0:
+            break
+        result[code] = data[pos + 4:pos + 4 + length]
+        pos += 4 + length + (-length % 4)
+    return result
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+class PcapngWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.pcapng")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_block_layout(self):
+        writer = PcapngWriter(self.path, batch_size=2)
+        writer.add(TX_INTERFACE, EthernetFrame(bytes(range(61)), 0.5, 1.25, False))
+        writer.add(RX_INTERFACE, EthernetFrame(bytes(64), 2.0, 3.000000001, True))
+        writer.add(TX_INTERFACE, EthernetFrame(bytes(60), 4.0, 5.0, False))
+        writer.close()
+        self.assertEqual((writer.frames, writer.dropped_frames), (3, 1))
+
+        blocks = read_blocks(self.path)
+        self.assertEqual([block_type for block_type, _ in blocks],
+                         [BLOCK_SECTION_HEADER] + [BLOCK_INTERFACE_DESCRIPTION] * 2 + [BLOCK_ENHANCED_PACKET] * 3)
+        self.assertEqual(struct.unpack_from("<IHH", blocks[0][1]), (BYTE_ORDER_MAGIC, 1, 0))
+        for _, body in blocks[1:3]:
+            self.assertEqual(struct.unpack_from("<H", body)[0], LINKTYPE_ETHERNET)
+
+        packets = []
+        for _, body in blocks[3:]:
+            interface, high, low, captured, length = struct.unpack_from("<IIIII", body)
+            data = body[20:20 + captured]
+            packets.append((interface, (high << 32) | low, length, data, options(body[20 + captured + (-captured % 4):])))
+        self.assertEqual([(interface, timestamp, length) for interface, timestamp, length, _, _ in packets],
+                         [(TX_INTERFACE, 1250000000, 61), (RX_INTERFACE, 3000000001, 64), (TX_INTERFACE, 5000000000, 60)])
+        self.assertEqual(packets[0][3], bytes(range(61)))
+        self.assertNotIn(OPT_COMMENT, packets[0][4])
+        self.assertEqual(packets[1][4][OPT_COMMENT], DROP_COMMENT.encode())
+
+    def test_decoded_frames_are_exported(self):
+        g = Tc6TrafficGenerator(17)
+        tx = [g.ethernet_frame() for _ in range(4)]
+        rx = [g.ethernet_frame() for _ in range(2)]
+        decoder = Tc6Decoder(Trace.TRANSACTION, 64, False)
+        decoder.pcapng = PcapngWriter(self.path)
+        list(decoder.feed(g.ethernet_traffic(tx, rx)))
+        decoder.pcapng.close()
+        packets = [body for block_type, body in read_blocks(self.path) if block_type == BLOCK_ENHANCED_PACKET]
+        exported = {TX_INTERFACE: [], RX_INTERFACE: []}
+        for body in packets:
+            interface, _, _, captured, _ = struct.unpack_from("<IIIII", body)
+            exported[interface].append(body[20:20 + captured])
+        self.assertEqual(exported, {TX_INTERFACE: tx, RX_INTERFACE: rx})
+
+    def test_headers_written_at_open(self):
+        writer = PcapngWriter(self.path)
+        try:
+            self.assertEqual([block_type for block_type, _ in read_blocks(self.path)],
+                             [BLOCK_SECTION_HEADER, BLOCK_INTERFACE_DESCRIPTION, BLOCK_INTERFACE_DESCRIPTION])
+        finally:
+            writer.close()
+
+    def test_partial_batch_written_without_new_frames(self):
+        writer = PcapngWriter(self.path, flush_interval=0.05)
+        try:
+            writer.add(TX_INTERFACE, EthernetFrame(bytes(60), 0.0, 0.001, False))
+            # no further add(), flush() or close() while waiting
+            self.assertTrue(wait_for(lambda: len(read_blocks(self.path)) == 4))
+        finally:
+            writer.close()
+        self.assertEqual(len(read_blocks(self.path)), 4)
+
+class HlaPcapngTest(unittest.TestCase):
+    def setUp(self):
+        import HighLevelAnalyzer
+        self.module = HighLevelAnalyzer
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.pcapng")
+        settings = {
+            "block_payload_size_setting": "auto-detect", "control_data_protection_setting": "auto-detect",
+            "trace_setting": "transactions", "filter_setting": "", "instrumentation_file_setting": "",
+            "label_setting": "full", "link_stats_window_setting": 0, "timing_file_setting": "",
+            "register_map_setting": "", "pcapng_file_setting": self.path,
+        }
+        for name, value in settings.items():
+            setattr(HighLevelAnalyzer.Hla, name, value)
+
+    def tearDown(self):
+        for writer in list(self.module.pcapng_writers.values()):
+            writer.close()
+        self.module.pcapng_writers.clear()
+        self.directory.cleanup()
+
+    def test_rebuilt_analyzer_closes_previous_writer(self):
+        first = self.module.Hla()
+        writer = first.decoder.pcapng
+        second = self.module.Hla()
+        self.assertIsNone(writer.thread)
+        self.assertIs(self.module.pcapng_writers[self.path], second.decoder.pcapng)
+
+    def test_removed_analyzer_closes_writer(self):
+        hla = self.module.Hla()
+        writer = hla.decoder.pcapng
+        del hla
+        self.assertIsNone(writer.thread)
+        self.assertEqual(self.module.pcapng_writers, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the register shadow
+import struct
+import unittest
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_registers import RegisterShadow
+from tc6_synth import Tc6TrafficGenerator, control_header
+
+def shadow(events):
+    decoder = Tc6Decoder(Trace.TRANSACTION, 64, False)
+    decoder.log = lambda message: None
+    list(decoder.feed(events))
+    return decoder.registers
+
+class RegisterShadowTest(unittest.TestCase):
+    def test_apply_increments_address(self):
+        registers = RegisterShadow()
+        self.assertEqual(registers.apply(1, 0xffff, [1, 2, 3], 0.5), [(1, 0xffff), (1, 0), (1, 1)])
+        self.assertEqual(registers.value(1, 0), 2)
+        # unchanged values are not logged
+        self.assertEqual(registers.apply(1, 0, [2, 5], 1.0), [(1, 1)])
+        self.assertEqual(registers.changes(1, 1), [(0.5, 3), (1.0, 5)])
+        self.assertEqual(registers.value_at(1, 0.75, 1), 3)
+
+    def test_apply_without_increment(self):
+        registers = RegisterShadow()
+        registers.apply(0, 8, [1, 2, 3], 0.5, increment=False)
+        self.assertEqual(registers.changes(0, 8), [(0.5, 1), (0.5, 2), (0.5, 3)])
+        self.assertIsNone(registers.value(0, 9))
+
+    def test_decoded_multi_register_transactions(self):
+        g = Tc6TrafficGenerator(14)
+        events = list(g.control_write(1, 0x10, [0xa, 0xb, 0xc])) + list(g.control_read(2, 0x20, [7, 8]))
+        registers = shadow(events)
+        self.assertEqual([registers.value(1, addr) for addr in (0x10, 0x11, 0x12)], [0xa, 0xb, 0xc])
+        self.assertEqual([registers.value(2, addr) for addr in (0x20, 0x21)], [7, 8])
+
+    def test_decoded_address_increment_disabled(self):
+        g = Tc6TrafficGenerator(15)
+        # AID set, all words are written to the same register
+        header = struct.pack(">I", control_header(True, 1, 0x10, 2, aid=True))
+        data = g.control_words([0xa, 0xb])
+        registers = shadow(g.transaction(header + data + bytes(4), g.random_bytes(4) + header + data))
+        self.assertEqual(registers.changes(1, 0x10)[-1][1], 0xb)
+        self.assertIsNone(registers.value(1, 0x11))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the register maps
+import json
+import os
+import tempfile
+import unittest
+from tc6_regmap import RegisterMapError, load_register_map
+
+class LoadRegisterMapTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "map.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_map(self, name, mtime_ns):
+        with open(self.path, "w") as f:
+            json.dump({"extends": "oa-tc6", "registers": [{"mms": 1, "addr": "0x0000", "name": name}]}, f)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_built_in_maps_are_shared(self):
+        self.assertIs(load_register_map("lan865x"), load_register_map("lan865x"))
+
+    def test_unchanged_file_is_loaded_once(self):
+        self.write_map("MAC_NCR", 10 ** 18)
+        self.assertIs(load_register_map(self.path), load_register_map(self.path))
+
+    def test_modified_file_is_loaded_again(self):
+        self.write_map("MAC_NCR", 10 ** 18)
+        self.assertEqual(load_register_map(self.path).describe(1, 0, bytes(4)), "MAC_NCR")
+        self.write_map("MAC_NETWORK_CONTROL", 10 ** 18 + 1)
+        self.assertEqual(load_register_map(self.path).describe(1, 0, bytes(4)), "MAC_NETWORK_CONTROL")
+
+    def test_missing_file(self):
+        with self.assertRaises(RegisterMapError):
+            load_register_map(os.path.join(self.directory.name, "missing.json"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# Copyright 2024 Microchip Technology Incorporated
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Tests of the streaming decoder
+import asyncio
+import unittest
+from tc6_decoder import Tc6Decoder, Trace
+from tc6_stream import StreamDecoder, StreamMessage, Subscription
+from tc6_synth import Tc6TrafficGenerator
+
+async def events_of(events):
+    for event in events:
+        yield event
+
+async def collect(subscription):
+    return [message async for message in subscription]
+
+class SubscriptionTest(unittest.TestCase):
+    def test_full_queue_drops_oldest(self):
+        async def run():
+            subscription = Subscription(maxsize=2)
+            for i in range(5):
+                subscription.put(StreamMessage("frame", i, None))
+            subscription.put(StreamMessage("end", None, None))
+            return subscription, await collect(subscription)
+        subscription, messages = asyncio.run(run())
+        # the end message replaced the oldest frame too
+        self.assertEqual([message.data for message in messages], [4])
+        self.assertEqual(subscription.dropped, 4)
+
+    def test_kinds(self):
+        async def run():
+            subscription = Subscription(kinds=("log",))
+            subscription.put(StreamMessage("frame", 1, None))
+            subscription.put(StreamMessage("log", "message", None))
+            subscription.put(StreamMessage("end", None, None))
+            return await collect(subscription)
+        self.assertEqual([message.kind for message in asyncio.run(run())], ["log"])
+
+class StreamDecoderTest(unittest.TestCase):
+    def test_slow_subscriber_loses_oldest_frames(self):
+        events = list(Tc6TrafficGenerator(16).scenario(200))
+        decoder = Tc6Decoder(Trace.TRANSACTION, 64, False)
+        decoder.log = lambda message: None
+        expected = list(decoder.feed(events))
+
+        async def run():
+            stream = StreamDecoder(Tc6Decoder(Trace.TRANSACTION, 64, False), stats_interval=None)
+            slow = stream.subscribe(("frame",), maxsize=10)
+            fast = stream.subscribe(("frame",), maxsize=len(expected) + 1)
+            # nobody reads until the end of the input
+            await stream.ingest(events_of(events))
+            stream.end()
+            return slow, await collect(slow), await collect(fast)
+        slow, slow_messages, fast_messages = asyncio.run(run())
+        self.assertEqual([message.data for message in fast_messages], expected)
+        self.assertEqual([message.data for message in slow_messages], expected[len(expected) - 9:])
+        self.assertEqual(slow.dropped, len(expected) - 9)
+
+if __name__ == "__main__":
+    unittest.main()